@@ -2,67 +2,45 @@
 """
 Hasselblad X2D II 카메라 프로토콜 분석 스크립트
 카메라가 사용하는 네트워크 프로토콜과 API 엔드포인트를 찾습니다.
+asyncio는 탐색할 때 import합니다 (--help 시작 시간 단축).
 """
 
+import argparse
 import socket
-import requests
 import time
 import json
 from typing import Dict, List, Tuple
-import subprocess
-import sys
 
-# 카메라 IP
-CAMERA_IP = "192.168.2.1"
+from camera_discovery import CAMERA_PORTS, DEFAULT_CAMERA_IP, is_reachable, resolve_camera_ip, scan_host
 
-def scan_ports(host: str, start_port: int = 1, end_port: int = 10000) -> List[int]:
-    """열린 포트를 스캔합니다"""
-    print(f"🔍 {host}의 포트 스캔 중... (1-10000)")
-    open_ports = []
+def scan_ports(host: str, start_port: int = 1, end_port: int = 10000, full: bool = False) -> List[int]:
+    """열린 포트를 동시에 스캔합니다"""
+    import asyncio
+    print(f"🔍 {host}의 포트 스캔 중...")
     
     # 일반적인 카메라/PTP 포트부터 확인
-    common_ports = [
-        80,    # HTTP
-        443,   # HTTPS
-        8080,  # Alternative HTTP
-        8443,  # Alternative HTTPS
-        15740, # PTP/IP
-        5353,  # mDNS
-        1900,  # UPnP
-        9000,  # 일부 카메라 제어
-        554,   # RTSP
-        21,    # FTP
-        22,    # SSH
-        23,    # Telnet
-    ]
-    
     print("📌 일반적인 포트 확인 중...")
-    for port in common_ports:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(0.5)
-        result = sock.connect_ex((host, port))
-        if result == 0:
+    open_ports = asyncio.run(scan_host(host, CAMERA_PORTS))
+    for port in sorted(open_ports):
+        print(f"  ✅ 포트 {port} 열림")
+    
+    # 나머지 포트 스캔 (--full)
+    if full:
+        print(f"\n🔍 전체 포트 스캔 중... ({start_port}-{end_port})")
+        common_ports = {port for port, _ in CAMERA_PORTS}
+        rest = [(port, "") for port in range(start_port, end_port + 1) if port not in common_ports]
+        found = asyncio.run(scan_host(host, rest, timeout=0.3))
+        for port in sorted(found):
             print(f"  ✅ 포트 {port} 열림")
-            open_ports.append(port)
-        sock.close()
-    
-    # 나머지 포트 스캔 (시간이 걸리므로 선택적)
-    if len(sys.argv) > 1 and sys.argv[1] == "--full":
-        print("\n🔍 전체 포트 스캔 중...")
-        for port in range(start_port, end_port + 1):
-            if port not in common_ports:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(0.1)
-                result = sock.connect_ex((host, port))
-                if result == 0:
-                    print(f"  ✅ 포트 {port} 열림")
-                    open_ports.append(port)
-                sock.close()
+        open_ports.update(found)
     
     return sorted(open_ports)
 
 def test_http_endpoints(host: str, port: int = 80) -> Dict[str, any]:
     """HTTP API 엔드포인트를 테스트합니다"""
+    # requests는 HTTP 테스트할 때만 필요 (포트 스캔/--help는 설치 없이 동작)
+    import requests
+    
     print(f"\n🌐 HTTP 엔드포인트 테스트 (포트 {port})")
     
     base_url = f"http://{host}:{port}"
@@ -170,6 +148,8 @@ def test_ptp_protocol(host: str, port: int = 15740) -> bool:
 
 def send_gps_data(host: str, port: int, latitude: float, longitude: float):
     """GPS 데이터를 다양한 형식으로 전송 시도"""
+    import requests
+    
     print(f"\n📍 GPS 데이터 전송 테스트")
     
     # 1. JSON 형식으로 POST
@@ -198,41 +178,53 @@ def send_gps_data(host: str, port: int, latitude: float, longitude: float):
         print("  → PTP/IP GPS 명령 전송 시도...")
         # PTP 구현은 복잡하므로 생략
 
-def analyze_network_traffic():
-    """네트워크 트래픽 캡처 (tcpdump 필요)"""
+def analyze_network_traffic(capture_file: str = None, camera_ip: str = DEFAULT_CAMERA_IP):
+    """네트워크 트래픽 캡처 (tcpdump 필요) 및 분석"""
     print("\n🔍 네트워크 트래픽 분석")
-    print("  → Phocus 앱이 카메라와 통신할 때 패킷을 캡처합니다")
-    print("  → 별도 터미널에서 실행: sudo tcpdump -i en0 host 192.168.2.1 -w capture.pcap")
-    print("  → 분석: tcpdump -r capture.pcap -A")
+    if capture_file is None:
+        print("  → Phocus 앱이 카메라와 통신할 때 패킷을 캡처합니다")
+        print(f"  → 별도 터미널에서 실행: sudo tcpdump -i en0 host {camera_ip} -w capture.pcap")
+        print("  → 분석: python3 analyze_camera_traffic.py capture.pcap")
+        return None
+
+    from analyze_camera_traffic import analyze_capture, print_report
+    result = analyze_capture(capture_file, camera_ip)
+    print_report(result)
+    return result
 
 def main():
+    parser = argparse.ArgumentParser(description="Hasselblad X2D II 프로토콜 분석")
+    parser.add_argument('--ip', help="카메라 IP (생략하면 기본 주소 확인 후 네트워크 탐색)")
+    parser.add_argument('--subnet', help="탐색할 서브넷 (예: 192.168.2.0/24)")
+    parser.add_argument('--full', action='store_true', help="1-10000 전체 포트 스캔")
+    parser.add_argument('--pcap', metavar='FILE', help="캡처 파일 트래픽 분석")
+    args = parser.parse_args()
+    # asyncio는 실제로 탐색할 때만 import (--help 시작 시간 단축)
+    import asyncio
+    
     print("="*60)
     print("🎯 Hasselblad X2D II 프로토콜 분석")
     print("="*60)
     
-    # 1. 연결 확인
-    print(f"\n📡 카메라 연결 확인 ({CAMERA_IP})")
-    try:
-        response = subprocess.run(
-            ["ping", "-c", "1", "-t", "1", CAMERA_IP],
-            capture_output=True,
-            text=True
-        )
-        if response.returncode == 0:
-            print("  ✅ 카메라 연결됨")
-        else:
-            print("  ❌ 카메라 연결 안됨 - WiFi 연결을 확인하세요")
-            return
-    except:
-        print("  ⚠️ ping 실행 실패")
+    # 1. 연결 확인 (TCP 프로브, ping 권한 불필요)
+    camera_ip = resolve_camera_ip(args.ip, args.subnet)
+    if camera_ip is None:
+        print("  ❌ 카메라를 찾을 수 없음 - WiFi 연결을 확인하세요")
+        return
+    print(f"\n📡 카메라 연결 확인 ({camera_ip})")
+    if asyncio.run(is_reachable(camera_ip)):
+        print("  ✅ 카메라 연결됨")
+    else:
+        print("  ❌ 카메라 연결 안됨 - WiFi 연결을 확인하세요")
+        return
     
     # 2. 포트 스캔
-    open_ports = scan_ports(CAMERA_IP)
+    open_ports = scan_ports(camera_ip, full=args.full)
     print(f"\n📊 발견된 포트: {open_ports}")
     
     # 3. HTTP 엔드포인트 테스트
     for port in [p for p in open_ports if p in [80, 8080, 443, 8443]]:
-        results = test_http_endpoints(CAMERA_IP, port)
+        results = test_http_endpoints(camera_ip, port)
         if results:
             print(f"\n💾 HTTP 엔드포인트 결과 저장")
             with open(f"camera_http_{port}_endpoints.json", "w") as f:
@@ -240,16 +232,16 @@ def main():
     
     # 4. PTP/IP 테스트
     if 15740 in open_ports:
-        test_ptp_protocol(CAMERA_IP)
+        test_ptp_protocol(camera_ip)
     
     # 5. GPS 데이터 전송 테스트
     test_latitude = 37.5665  # 서울 예시 좌표
     test_longitude = 126.9780
     for port in open_ports:
-        send_gps_data(CAMERA_IP, port, test_latitude, test_longitude)
+        send_gps_data(camera_ip, port, test_latitude, test_longitude)
     
-    # 6. 트래픽 분석 안내
-    analyze_network_traffic()
+    # 6. 트래픽 분석 (--pcap <파일> 지정 시 캡처 분석, 없으면 안내)
+    analyze_network_traffic(args.pcap, camera_ip)
     
     print("\n" + "="*60)
     print("✅ 분석 완료")
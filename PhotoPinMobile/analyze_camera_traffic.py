@@ -0,0 +1,856 @@
+#!/usr/bin/env python3
+"""
+카메라 WiFi 트래픽 분석 도구
+tcpdump로 저장한 pcap/pcapng 파일에서 카메라와의 TCP 스트림을 재조립하고
+HTTP 요청/응답과 PTP/IP 패킷을 해석하여 엔드포인트별 요청 수, 바이트, 지연시간을 보고합니다.
+
+캡처는 패킷 단위로 스트리밍 처리되며, 플로우별 버퍼에도 상한이 있어
+수 GB 캡처도 일정한 메모리로 분석합니다. --jobs 옵션으로 플로우를 여러 프로세스에 나눠 처리합니다.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import struct
+import sys
+from collections import deque
+from queue import Empty, Full
+from typing import Dict, List, Optional, Tuple
+
+from pcap_reader import (
+    LINKTYPE_ETHERNET, LINKTYPE_IPV4, LINKTYPE_LINUX_SLL, LINKTYPE_NULL, LINKTYPE_RAW,
+    PcapError, read_packets,
+)
+from ptp_protocol import (
+    PTPIP_EVENT, PTPIP_HEADER, PTPIP_OPERATION_REQUEST, PTPIP_OPERATION_RESPONSE, PTPIP_PORT,
+    operation_name, packet_type_name, parse_ptpip_body,
+)
+
+# 카메라 IP
+CAMERA_IP = "192.168.2.1"
+
+# TCP 플래그
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+
+# 메모리 상한
+MAX_OUT_OF_ORDER_BYTES = 4 * 1024 * 1024   # 방향별 순서 어긋난 세그먼트 보관 한도
+MAX_HEADER_BYTES = 64 * 1024               # HTTP 헤더 최대 크기
+MAX_PENDING_REQUESTS = 1024                # 응답 대기 중인 요청 수 한도
+FLOW_IDLE_TIMEOUT = 300.0                  # 유휴 플로우 정리 기준 (초)
+WORKER_POLL = 1.0                          # 병렬 모드에서 워커 생존을 확인하는 간격 (초)
+LATENCY_SAMPLES = 512                      # 백분위 계산용 표본 수
+
+HTTP_METHODS = (b'GET ', b'POST ', b'PUT ', b'HEAD ', b'DELETE ', b'OPTIONS ', b'PATCH ')
+
+_SEQ_MOD = 1 << 32
+
+
+class EndpointStats:
+    """엔드포인트 하나의 누적 통계 (고정 크기 메모리)"""
+
+    def __init__(self):
+        self.count = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_min = None
+        self.latency_max = None
+        self.samples = []
+
+    def add(self, request_bytes: int, response_bytes: int, latency: Optional[float]):
+        self.count += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        if latency is None:
+            return
+        self.latency_count += 1
+        self.latency_sum += latency
+        if self.latency_min is None or latency < self.latency_min:
+            self.latency_min = latency
+        if self.latency_max is None or latency > self.latency_max:
+            self.latency_max = latency
+        # 저수지 표본 추출 (reservoir sampling)
+        if len(self.samples) < LATENCY_SAMPLES:
+            self.samples.append(latency)
+        else:
+            i = random.randrange(self.latency_count)
+            if i < LATENCY_SAMPLES:
+                self.samples[i] = latency
+
+    def merge(self, other: 'EndpointStats'):
+        self.count += other.count
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        self.latency_count += other.latency_count
+        self.latency_sum += other.latency_sum
+        for value in (other.latency_min, other.latency_max):
+            if value is None:
+                continue
+            if self.latency_min is None or value < self.latency_min:
+                self.latency_min = value
+            if self.latency_max is None or value > self.latency_max:
+                self.latency_max = value
+        samples = self.samples + other.samples
+        if len(samples) > LATENCY_SAMPLES:
+            samples = random.sample(samples, LATENCY_SAMPLES)
+        self.samples = samples
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency_avg': self.latency_sum / self.latency_count if self.latency_count else None,
+            'latency_min': self.latency_min,
+            'latency_max': self.latency_max,
+            'latency_p50': self.percentile(0.5),
+            'latency_p95': self.percentile(0.95),
+        }
+
+
+class TCPHalfStream:
+    """한 방향 TCP 바이트 스트림 재조립"""
+
+    def __init__(self):
+        self.next_seq = None
+        self.pending = {}          # seq -> (ts, payload)
+        self.pending_bytes = 0
+        self.gaps = 0
+
+    def feed(self, ts: float, seq: int, syn: bool, payload: bytes) -> List[Tuple[float, Optional[bytes]]]:
+        """
+        세그먼트 하나를 넣고 순서대로 이어진 데이터 조각 목록 반환
+        (ts, None) 항목은 데이터 유실(gap)을 뜻합니다.
+        """
+        if syn:
+            self.next_seq = (seq + 1) % _SEQ_MOD
+            seq = self.next_seq
+        if not payload:
+            return []
+        if self.next_seq is None:
+            # 캡처가 연결 중간부터 시작된 경우
+            self.next_seq = seq
+
+        out = []
+        self._accept(ts, seq, payload, out)
+        self._drain(out)
+        if self.pending_bytes > MAX_OUT_OF_ORDER_BYTES:
+            # 유실 구간 건너뛰기: 가장 앞선 보관 세그먼트부터 이어서 처리
+            self.gaps += 1
+            out.append((ts, None))
+            self.next_seq = min(self.pending, key=self._distance)
+            self._drain(out)
+        return out
+
+    def _distance(self, seq: int) -> int:
+        return (seq - self.next_seq) % _SEQ_MOD
+
+    def _accept(self, ts: float, seq: int, payload: bytes, out: list):
+        offset = (seq - self.next_seq) % _SEQ_MOD
+        if offset >= _SEQ_MOD // 2:
+            # 재전송 또는 일부 겹침
+            overlap = _SEQ_MOD - offset
+            if overlap >= len(payload):
+                return
+            payload = payload[overlap:]
+            offset = 0
+        if offset == 0:
+            out.append((ts, payload))
+            self.next_seq = (self.next_seq + len(payload)) % _SEQ_MOD
+        elif seq not in self.pending:
+            self.pending[seq] = (ts, payload)
+            self.pending_bytes += len(payload)
+
+    def _drain(self, out: list):
+        """보관 중인 세그먼트 중 이어지는 것을 순서대로 꺼냄"""
+        while self.pending:
+            seq = self.next_seq
+            if seq not in self.pending:
+                # 이미 받은 구간과 겹치는 세그먼트
+                seq = next((s for s in self.pending if self._distance(s) >= _SEQ_MOD // 2), None)
+                if seq is None:
+                    return
+            ts, payload = self.pending.pop(seq)
+            self.pending_bytes -= len(payload)
+            self._accept(ts, seq, payload, out)
+
+
+class HTTPParser:
+    """한 방향 HTTP/1.x 메시지 스트림 파서 (본문은 저장하지 않고 길이만 계산)"""
+
+    def __init__(self, is_response: bool, request_method=None):
+        self.is_response = is_response
+        self.request_method = request_method   # 응답 파서가 HEAD 요청을 구분할 때 사용
+        self.messages = []
+        self._reset()
+
+    def _reset(self):
+        self.state = 'start'
+        self.buffer = bytearray()
+        self.remaining = 0
+        self.current = None
+
+    def gap(self):
+        """데이터 유실: 진행 중인 메시지를 버리고 다음 메시지 시작부터 다시 동기화"""
+        self._reset()
+        self.state = 'resync'
+
+    def feed(self, ts: float, data: bytes):
+        pos = 0
+        while pos < len(data):
+            if self.state == 'resync':
+                if not self._looks_like_start(data[pos:]):
+                    return
+                self.state = 'start'
+            if self.state == 'start':
+                self.current = {'start': ts, 'bytes': 0}
+                self.state = 'headers'
+            if self.state == 'headers':
+                pos = self._feed_headers(ts, data, pos)
+            elif self.state == 'body':
+                n = min(self.remaining, len(data) - pos)
+                self.current['bytes'] += n
+                self.remaining -= n
+                pos += n
+                if self.remaining == 0:
+                    self._finish()
+            elif self.state == 'chunk_size':
+                pos = self._feed_line(data, pos, self._on_chunk_size)
+            elif self.state == 'chunk_data':
+                n = min(self.remaining, len(data) - pos)
+                self.current['bytes'] += n
+                self.remaining -= n
+                pos += n
+                if self.remaining == 0:
+                    self.state = 'chunk_size'
+            elif self.state == 'trailer':
+                pos = self._feed_line(data, pos, self._on_trailer)
+            elif self.state == 'until_close':
+                self.current['bytes'] += len(data) - pos
+                pos = len(data)
+
+    def close(self):
+        """연결 종료: 길이 없는 응답 본문 완료 처리"""
+        if self.state == 'until_close':
+            self._finish()
+
+    def _looks_like_start(self, data: bytes) -> bool:
+        if self.is_response:
+            return data.startswith(b'HTTP/')
+        return data.startswith(HTTP_METHODS)
+
+    def _feed_headers(self, ts: float, data: bytes, pos: int) -> int:
+        start = max(0, len(self.buffer) - 3)
+        self.buffer += data[pos:]
+        end = self.buffer.find(b'\r\n\r\n', start)
+        if end < 0:
+            if len(self.buffer) > MAX_HEADER_BYTES:
+                self.gap()
+            return len(data)
+
+        header_len = end + 4
+        consumed = header_len - (len(self.buffer) - (len(data) - pos))
+        head = bytes(self.buffer[:end])
+        self.buffer = bytearray()
+        self.current['bytes'] += header_len
+        self._parse_head(head)
+        return pos + consumed
+
+    def _parse_head(self, head: bytes):
+        lines = head.split(b'\r\n')
+        parts = lines[0].decode('latin-1').split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(b':')
+            headers[name.strip().lower().decode('latin-1')] = value.strip().decode('latin-1')
+
+        current = self.current
+        if self.is_response:
+            try:
+                current['status'] = int(parts[1])
+            except (IndexError, ValueError):
+                current['status'] = 0
+        else:
+            current['method'] = parts[0]
+            path = parts[1] if len(parts) > 1 else '/'
+            current['path'] = path.split('?', 1)[0]
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            self.state = 'chunk_size'
+            return
+        length = headers.get('content-length')
+        if self.is_response:
+            status = current['status']
+            method = self.request_method() if self.request_method else None
+            if method == 'HEAD' or 100 <= status < 200 or status in (204, 304):
+                length = '0'
+            elif length is None:
+                self.state = 'until_close'
+                return
+        try:
+            self.remaining = int(length or 0)
+        except ValueError:
+            self.remaining = 0
+        if self.remaining > 0:
+            self.state = 'body'
+        else:
+            self._finish()
+
+    def _feed_line(self, data: bytes, pos: int, handler) -> int:
+        end = data.find(b'\n', pos)
+        if end < 0:
+            self.buffer += data[pos:]
+            self.current['bytes'] += len(data) - pos
+            if len(self.buffer) > MAX_HEADER_BYTES:
+                self.gap()
+            return len(data)
+        self.buffer += data[pos:end + 1]
+        self.current['bytes'] += end + 1 - pos
+        line = bytes(self.buffer).strip()
+        self.buffer = bytearray()
+        handler(line)
+        return end + 1
+
+    def _on_chunk_size(self, line: bytes):
+        if not line:
+            return
+        try:
+            size = int(line.split(b';', 1)[0], 16)
+        except ValueError:
+            self.gap()
+            return
+        if size == 0:
+            self.state = 'trailer'
+        else:
+            self.remaining = size + 2  # 청크 뒤 CRLF 포함
+            self.state = 'chunk_data'
+
+    def _on_trailer(self, line: bytes):
+        if not line:
+            self._finish()
+
+    def _finish(self):
+        self.messages.append(self.current)
+        self._reset()
+
+
+class PTPIPParser:
+    """한 방향 PTP/IP 패킷 스트림 파서 (데이터 페이로드는 건너뜀)"""
+
+    FIELD_BYTES = 16  # 필드 해석에 필요한 본문 앞부분 크기
+
+    def __init__(self):
+        self.packets = []
+        self._reset()
+
+    def _reset(self):
+        self.buffer = bytearray()
+        self.header = None
+        self.skip = 0
+
+    def gap(self):
+        # PTP/IP는 재동기화 지점이 없으므로 이후 데이터는 패킷 경계를 알 수 없음
+        self._reset()
+        self.skip = -1
+
+    def feed(self, ts: float, data: bytes):
+        if self.skip < 0:
+            return
+        pos = 0
+        while pos < len(data):
+            if self.skip:
+                n = min(self.skip, len(data) - pos)
+                self.skip -= n
+                pos += n
+                continue
+            need = 8 if self.header is None else min(self.FIELD_BYTES, self.header[0] - 8)
+            take = min(need - len(self.buffer), len(data) - pos)
+            if self.header is None and not self.buffer:
+                self.start = ts
+            self.buffer += data[pos:pos + take]
+            pos += take
+            if len(self.buffer) < need:
+                continue
+
+            if self.header is None:
+                length, packet_type = PTPIP_HEADER.unpack(self.buffer)
+                if length < 8:
+                    self.gap()
+                    return
+                self.header = (length, packet_type)
+                self.buffer = bytearray()
+                if length > 8:
+                    continue
+            length, packet_type = self.header
+            body = bytes(self.buffer)
+            self.packets.append({
+                'start': self.start,
+                'type': packet_type,
+                'length': length,
+                'fields': parse_ptpip_body(packet_type, body),
+                'transaction_id': struct.unpack('<I', body[:4])[0] if len(body) >= 4 else None,
+            })
+            self._reset()
+            self.skip = length - 8 - len(body)
+
+    def close(self):
+        pass
+
+
+class Flow:
+    """카메라와의 TCP 연결 하나"""
+
+    def __init__(self, server_port: int, stats: Dict[Tuple[str, str], EndpointStats]):
+        self.stats = stats
+        self.streams = (TCPHalfStream(), TCPHalfStream())
+        self.parsers = None
+        self.server_port = server_port
+        self.last_ts = 0.0
+        self.closed = [False, False]
+        self.pending_requests = deque()
+        self.ptp_transactions = {}
+
+    def _choose_protocol(self, first: bytes, direction: int):
+        if self.server_port == PTPIP_PORT:
+            self.protocol = 'ptpip'
+            self.parsers = (PTPIPParser(), PTPIPParser())
+        elif first.startswith(HTTP_METHODS) or first.startswith(b'HTTP/'):
+            self.protocol = 'http'
+            self.parsers = (
+                HTTPParser(False),
+                HTTPParser(True, lambda: self.pending_requests[0]['method'] if self.pending_requests else None),
+            )
+        else:
+            self.protocol = 'tcp'
+            self.parsers = ()
+            self._add(('TCP', f'port {self.server_port}'), 0, 0, None)
+
+    def feed(self, ts: float, direction: int, seq: int, flags: int, payload: bytes):
+        self.last_ts = ts
+        chunks = self.streams[direction].feed(ts, seq, bool(flags & TCP_SYN), payload)
+        for chunk_ts, data in chunks:
+            if self.parsers is None:
+                if data is None:
+                    continue
+                self._choose_protocol(data, direction)
+            if self.protocol == 'tcp':
+                if data is not None:
+                    self._add_bytes(('TCP', f'port {self.server_port}'),
+                                    len(data) if direction == 0 else 0,
+                                    len(data) if direction == 1 else 0)
+                continue
+            parser = self.parsers[direction]
+            if data is None:
+                parser.gap()
+            else:
+                parser.feed(chunk_ts, data)
+            self._collect()
+        if flags & (TCP_FIN | TCP_RST):
+            self.closed[direction] = True
+            if flags & TCP_RST:
+                self.closed = [True, True]
+
+    @property
+    def finished(self) -> bool:
+        return all(self.closed)
+
+    def close(self):
+        if self.parsers:
+            for parser in self.parsers:
+                parser.close()
+            self._collect()
+        # 응답을 받지 못한 요청
+        for request in self.pending_requests:
+            self._add(('HTTP', f"{request['method']} {request['path']}"), request['bytes'], 0, None)
+        self.pending_requests.clear()
+        for op in self.ptp_transactions.values():
+            self._add(('PTP/IP', op['label']), op['bytes'], op['data'], None)
+        self.ptp_transactions.clear()
+
+    def _add(self, key: Tuple[str, str], request_bytes: int, response_bytes: int, latency: Optional[float]):
+        self._get(key).add(request_bytes, response_bytes, latency)
+
+    def _add_bytes(self, key: Tuple[str, str], request_bytes: int, response_bytes: int):
+        """요청 단위가 없는 데이터는 바이트만 누적"""
+        stats = self._get(key)
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+
+    def _get(self, key: Tuple[str, str]) -> EndpointStats:
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = EndpointStats()
+        return stats
+
+    def _collect(self):
+        if self.protocol == 'http':
+            self._collect_http()
+        elif self.protocol == 'ptpip':
+            self._collect_ptpip()
+
+    def _collect_http(self):
+        requests, responses = self.parsers
+        for message in requests.messages:
+            self.pending_requests.append(message)
+            if len(self.pending_requests) > MAX_PENDING_REQUESTS:
+                dropped = self.pending_requests.popleft()
+                self._add(('HTTP', f"{dropped['method']} {dropped['path']}"), dropped['bytes'], 0, None)
+        requests.messages.clear()
+        for message in responses.messages:
+            if self.pending_requests:
+                request = self.pending_requests.popleft()
+                key = ('HTTP', f"{request['method']} {request['path']}")
+                self._add(key, request['bytes'], message['bytes'], message['start'] - request['start'])
+            else:
+                self._add(('HTTP', '(응답만 캡처됨)'), 0, message['bytes'], None)
+        responses.messages.clear()
+
+    def _collect_ptpip(self):
+        for direction, parser in enumerate(self.parsers):
+            for packet in parser.packets:
+                self._on_ptpip_packet(direction, packet)
+            parser.packets.clear()
+
+    def _on_ptpip_packet(self, direction: int, packet: Dict):
+        packet_type = packet['type']
+        fields = packet['fields']
+        if packet_type == PTPIP_OPERATION_REQUEST and fields:
+            label = operation_name(fields['code'])
+            self.ptp_transactions[fields['transaction_id']] = {
+                'label': label, 'start': packet['start'], 'bytes': packet['length'], 'data': 0,
+            }
+            if len(self.ptp_transactions) > MAX_PENDING_REQUESTS:
+                oldest = next(iter(self.ptp_transactions))
+                op = self.ptp_transactions.pop(oldest)
+                self._add(('PTP/IP', op['label']), op['bytes'], op['data'], None)
+        elif packet_type == PTPIP_OPERATION_RESPONSE and fields:
+            op = self.ptp_transactions.pop(fields['transaction_id'], None)
+            if op is None:
+                self._add(('PTP/IP', 'OperationResponse (요청 없음)'), 0, packet['length'], None)
+            else:
+                self._add(('PTP/IP', op['label']), op['bytes'],
+                          op['data'] + packet['length'], packet['start'] - op['start'])
+        elif packet_type == PTPIP_EVENT and fields:
+            self._add(('PTP/IP', f"Event 0x{fields['code']:04X}"), 0, packet['length'], None)
+        else:
+            op = self.ptp_transactions.get(packet['transaction_id']) if packet_type in (0x09, 0x0A, 0x0C) else None
+            if op is not None:
+                # 데이터 단계는 해당 트랜잭션에 합산
+                if direction == 0:
+                    op['bytes'] += packet['length']
+                else:
+                    op['data'] += packet['length']
+            else:
+                name = packet_type_name(packet_type)
+                self._add(('PTP/IP', name),
+                          packet['length'] if direction == 0 else 0,
+                          packet['length'] if direction == 1 else 0, None)
+
+
+class TrafficAnalyzer:
+    """TCP 세그먼트를 받아 플로우별로 재조립하고 엔드포인트 통계를 누적"""
+
+    def __init__(self):
+        self.flows = {}
+        self.stats = {}
+        self.segments = 0
+        self.flow_count = 0
+        self.gaps = 0
+
+    def feed(self, segment: Tuple):
+        ts, key, direction, seq, flags, payload = segment
+        self.segments += 1
+        flow = self.flows.get(key)
+        if flow is None:
+            if not payload and not flags & TCP_SYN:
+                # 닫힌 연결의 마지막 ACK/FIN 재전송 등은 새 플로우로 세지 않음
+                return
+            flow = self.flows[key] = Flow(key[2], self.stats)
+            self.flow_count += 1
+        flow.feed(ts, direction, seq, flags, payload)
+        if flow.finished:
+            self._close(key)
+        if self.segments % 10000 == 0:
+            self._expire(ts)
+
+    def _expire(self, now: float):
+        for key in [k for k, f in self.flows.items() if now - f.last_ts > FLOW_IDLE_TIMEOUT]:
+            self._close(key)
+
+    def _close(self, key):
+        flow = self.flows.pop(key)
+        flow.close()
+        self.gaps += sum(s.gaps for s in flow.streams)
+
+    def finish(self) -> Dict:
+        for key in list(self.flows):
+            self._close(key)
+        return {
+            'segments': self.segments,
+            'flows': self.flow_count,
+            'gaps': self.gaps,
+            'stats': self.stats,
+        }
+
+
+def decode_segment(packet, camera: bytes) -> Optional[Tuple]:
+    """
+    링크/IP/TCP 헤더를 해석해 카메라와 주고받은 TCP 세그먼트 반환
+    반환값: (ts, flow_key, direction, seq, flags, payload) - direction 0은 카메라로, 1은 카메라에서
+    """
+    data = packet.data
+    linktype = packet.linktype
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        offset = 12
+        ethertype = struct.unpack_from('!H', data, offset)[0]
+        while ethertype in (0x8100, 0x88A8) and len(data) >= offset + 6:
+            offset += 4
+            ethertype = struct.unpack_from('!H', data, offset)[0]
+        if ethertype != 0x0800:
+            return None
+        ip = offset + 2
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16 or struct.unpack_from('!H', data, 14)[0] != 0x0800:
+            return None
+        ip = 16
+    elif linktype == LINKTYPE_NULL:
+        if len(data) < 4 or data[0] not in (2, 0) or (data[0] == 0 and data[3] != 2):
+            return None
+        ip = 4
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        ip = 0
+    else:
+        return None
+
+    if len(data) < ip + 20 or data[ip] >> 4 != 4 or data[ip + 9] != 6:
+        return None
+    ihl = (data[ip] & 0x0F) * 4
+    total_length, frag = struct.unpack_from('!H2xH', data, ip + 2)
+    if frag & 0x1FFF:
+        return None  # 첫 조각이 아닌 IP 단편
+    src = data[ip + 12:ip + 16]
+    dst = data[ip + 16:ip + 20]
+    if dst == camera:
+        direction = 0
+        client = src
+    elif src == camera:
+        direction = 1
+        client = dst
+    else:
+        return None
+
+    tcp = ip + ihl
+    if len(data) < tcp + 20:
+        return None
+    sport, dport, seq = struct.unpack_from('!HHI', data, tcp)
+    tcp_len = (data[tcp + 12] >> 4) * 4
+    flags = data[tcp + 13]
+    end = ip + total_length if total_length else len(data)
+    payload = data[tcp + tcp_len:end]
+
+    if direction == 0:
+        key = (client, sport, dport)
+    else:
+        key = (client, dport, sport)
+    return (packet.timestamp, key, direction, seq, flags, payload)
+
+
+def _worker(queue, results):
+    """병렬 모드 워커: 할당된 플로우만 처리"""
+    analyzer = TrafficAnalyzer()
+    while True:
+        batch = queue.get()
+        if batch is None:
+            break
+        for segment in batch:
+            analyzer.feed(segment)
+    results.put(analyzer.finish())
+
+
+class WorkerError(RuntimeError):
+    """병렬 분석 워커가 결과 없이 종료됨 (메모리 부족, 강제 종료 등)"""
+
+
+def _put(queue, worker, item):
+    """워커 큐에 넣기 (워커가 죽어 큐가 비워지지 않으면 영원히 기다리지 않고 예외)"""
+    while True:
+        try:
+            queue.put(item, timeout=WORKER_POLL)
+            return
+        except Full:
+            if not worker.is_alive():
+                raise WorkerError(f"분석 워커가 종료되었습니다 (exit code {worker.exitcode})")
+
+
+def _collect_results(results, workers) -> List[Dict]:
+    """워커 결과를 모두 받기 (결과 없이 종료된 워커가 있으면 예외)"""
+    parts = []
+    while len(parts) < len(workers):
+        try:
+            parts.append(results.get(timeout=WORKER_POLL))
+            continue
+        except Empty:
+            pass
+        failed = [w for w in workers if w.exitcode not in (None, 0)]
+        if failed:
+            raise WorkerError(f"분석 워커가 종료되었습니다 (exit code {failed[0].exitcode})")
+        if all(w.exitcode == 0 for w in workers):
+            # 정상 종료한 워커의 결과는 이미 파이프에 있으므로 마지막으로 한 번 더 확인
+            try:
+                parts.append(results.get(timeout=WORKER_POLL))
+            except Empty:
+                raise WorkerError("분석 워커가 결과 없이 종료되었습니다")
+    return parts
+
+
+def analyze_capture(filepath: str, camera_ip: str = CAMERA_IP, jobs: int = 1) -> Dict:
+    """캡처 파일 분석 후 통계 반환"""
+    camera = socket.inet_aton(camera_ip)
+    packets = 0
+
+    if jobs <= 1:
+        analyzer = TrafficAnalyzer()
+        for packet in read_packets(filepath):
+            packets += 1
+            segment = decode_segment(packet, camera)
+            if segment is not None:
+                analyzer.feed(segment)
+        result = analyzer.finish()
+        result['packets'] = packets
+        return result
+
+    # 플로우 키 해시로 워커를 고정해 같은 연결은 항상 같은 프로세스에서 재조립
+    import multiprocessing
+    queues = [multiprocessing.Queue(maxsize=16) for _ in range(jobs)]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_worker, args=(q, results), daemon=True) for q in queues]
+    for w in workers:
+        w.start()
+
+    batches = [[] for _ in range(jobs)]
+    try:
+        for packet in read_packets(filepath):
+            packets += 1
+            segment = decode_segment(packet, camera)
+            if segment is None:
+                continue
+            i = hash(segment[1]) % jobs
+            batch = batches[i]
+            batch.append(segment)
+            if len(batch) >= 2048:
+                _put(queues[i], workers[i], batch)
+                batches[i] = []
+        for i, batch in enumerate(batches):
+            if batch:
+                _put(queues[i], workers[i], batch)
+        for q, w in zip(queues, workers):
+            _put(q, w, None)
+        parts = _collect_results(results, workers)
+    except BaseException:
+        for w in workers:
+            w.terminate()
+        # 읽을 워커가 없는 큐에 남은 배치 때문에 종료 시 멈추지 않도록
+        for q in queues:
+            q.cancel_join_thread()
+        raise
+
+    merged = {'packets': packets, 'segments': 0, 'flows': 0, 'gaps': 0, 'stats': {}}
+    for part in parts:
+        for name in ('segments', 'flows', 'gaps'):
+            merged[name] += part[name]
+        for key, stats in part['stats'].items():
+            if key in merged['stats']:
+                merged['stats'][key].merge(stats)
+            else:
+                merged['stats'][key] = stats
+    for w in workers:
+        w.join()
+    return merged
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.1f}ms"
+
+
+def print_report(result: Dict):
+    """분석 보고서 출력"""
+    print("\n" + "="*60)
+    print("📊 카메라 WiFi 트래픽 분석 보고서")
+    print("="*60)
+    print(f"\n📦 패킷: {result['packets']}개 (카메라 TCP 세그먼트 {result['segments']}개)")
+    print(f"🔗 TCP 연결: {result['flows']}개")
+    if result['gaps']:
+        print(f"⚠️ 재조립 중 유실 구간: {result['gaps']}곳")
+
+    stats = result['stats']
+    if not stats:
+        print("\n❌ 카메라와의 HTTP/PTP/IP 트래픽을 찾지 못했습니다")
+        return
+
+    for protocol in sorted({key[0] for key in stats}):
+        print(f"\n🔷 {protocol}:")
+        print(f"  {'엔드포인트':<36} {'요청':>7} {'보낸 바이트':>12} {'받은 바이트':>12} {'평균':>9} {'p95':>9}")
+        rows = sorted(((k[1], s) for k, s in stats.items() if k[0] == protocol),
+                      key=lambda item: item[1].count, reverse=True)
+        for label, s in rows:
+            avg = s.latency_sum / s.latency_count if s.latency_count else None
+            print(f"  {label[:36]:<36} {s.count:>7} {s.request_bytes:>12} {s.response_bytes:>12} "
+                  f"{_format_ms(avg):>9} {_format_ms(s.percentile(0.95)):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카메라 WiFi 트래픽(pcap/pcapng) 분석")
+    parser.add_argument('capture', help="tcpdump 캡처 파일")
+    parser.add_argument('--camera-ip', default=CAMERA_IP, help=f"카메라 IP (기본: {CAMERA_IP})")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="플로우 병렬 처리 프로세스 수 (0이면 CPU 코어 수)")
+    parser.add_argument('--json', dest='json_file', help="엔드포인트 통계를 JSON으로 저장")
+    args = parser.parse_args()
+
+    jobs = args.jobs or os.cpu_count() or 1
+
+    try:
+        print(f"📖 캡처 분석 중: {args.capture}")
+        result = analyze_capture(args.capture, args.camera_ip, jobs)
+    except FileNotFoundError:
+        print(f"❌ 파일을 찾을 수 없습니다: {args.capture}")
+        sys.exit(1)
+    except PcapError as e:
+        print(f"❌ 캡처 파일 오류: {e}")
+        sys.exit(1)
+    except WorkerError as e:
+        print(f"❌ {e} - --jobs 1로 다시 실행해 보세요")
+        sys.exit(1)
+
+    print_report(result)
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump({
+                'packets': result['packets'],
+                'segments': result['segments'],
+                'flows': result['flows'],
+                'gaps': result['gaps'],
+                'endpoints': [
+                    dict(protocol=key[0], endpoint=key[1], **stats.to_dict())
+                    for key, stats in sorted(result['stats'].items())
+                ],
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 분석 결과 저장: {args.json_file}")
+
+
+if __name__ == "__main__":
+    main()
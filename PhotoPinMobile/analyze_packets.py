@@ -7,15 +7,68 @@ PacketLogger나 Console 로그에서 BLE 통신 패턴 추출
 import re
 import sys
 import json
-from datetime import datetime
-from collections import defaultdict, OrderedDict
+import argparse
+
+from capture_io import open_capture, strip_compression_suffix
+from ndjson_export import NDJSONWriter
+from command_trie import SpecError, load_command_table
+from event_aggregate import RunCollapser, SpaceSaving, format_count
+from result_cache import add_cache_arguments, cache_from_args, cached_records
+
+# 보고서/JSON에 포함하는 명령 수
+REPORT_LIMIT = 20
+
+# 자주 사용된 명령 추적에 쓰는 카운터 수 (캡처 길이와 관계없이 메모리 고정)
+TOP_CAPACITY = 256
+
+# 파싱 결과(레코드) 형식이 바뀌면 올려서 이전 캐시를 무효화
+CACHE_VERSION = 1
 
 class BLEAnalyzer:
-    def __init__(self):
+    def __init__(self, sink=None, keep=None, collapse=False):
         self.commands = []
         self.services = set()
         self.characteristics = {}
         self.write_sequence = []
+        self.write_count = 0
+        self.command_count = 0
+        # sink: 파싱된 레코드를 즉시 넘겨받는 함수 (NDJSON 내보내기 등)
+        # keep: 메모리에 보관할 레코드 수 (None이면 전부 보관)
+        self.sink = sink
+        self.keep = keep
+        # collapse: 특성별로 연속된 같은 값을 구간(첫/마지막 라인, 횟수) 레코드 하나로 합침
+        self.write_runs = RunCollapser('line') if collapse else None
+        self.data_runs = RunCollapser('line') if collapse else None
+        self.top_commands = SpaceSaving(TOP_CAPACITY)
+    
+    def _emit(self, kind, record, target=None, sink=True, store=True):
+        """레코드를 sink로 보내고 보관 한도 안에서만 메모리에 저장"""
+        if sink and self.sink:
+            self.sink({'type': kind, **record})
+        if store and target is not None and (self.keep is None or len(target) < self.keep):
+            target.append(record)
+    
+    def _record(self, kind, record, target, runs):
+        """write/data 레코드 집계 (빈도 추적, collapse 모드면 연속 반복을 구간으로 합쳐 전달)"""
+        value = record['value'].strip()
+        self.top_commands.add(value)
+        if runs is None:
+            self._emit(kind, record, target)
+            return
+        # 보관 목록에는 시작할 때 넣어 순서를 유지하고, sink에는 구간이 끝난 뒤 전달
+        finished, started = runs.add(record.get('uuid'), value, record)
+        if started is not None:
+            self._emit(kind, started, target, sink=False)
+        if finished is not None:
+            self._emit(kind, finished, store=False)
+    
+    def finish(self):
+        """collapse 모드에서 진행 중인 구간을 내보냄 (파일 분석이 끝난 뒤 호출)"""
+        if self.write_runs is not None:
+            for run in self.write_runs.flush():
+                self._emit('write', run, store=False)
+            for run in self.data_runs.flush():
+                self._emit('data', run, store=False)
         
     def parse_packet_logger(self, line):
         """PacketLogger 형식 파싱"""
@@ -30,8 +83,9 @@ class BLEAnalyzer:
         # Service Discovery 패턴
         service_pattern = r'Service UUID:\s*([0-9A-Fa-f]{4})'
         match = re.search(service_pattern, line)
-        if match:
+        if match and match.group(1) not in self.services:
             self.services.add(match.group(1))
+            self._emit('service', {'uuid': match.group(1)})
             
         # Characteristic 패턴
         char_pattern = r'Characteristic.*UUID:\s*([0-9A-Fa-f]{4}).*Handle:\s*0x([0-9A-Fa-f]+)'
@@ -39,6 +93,8 @@ class BLEAnalyzer:
         if match:
             uuid = match.group(1)
             handle = match.group(2)
+            if self.characteristics.get(handle) != uuid:
+                self._emit('characteristic', {'handle': handle, 'uuid': uuid})
             self.characteristics[handle] = uuid
             
         return None
@@ -56,7 +112,10 @@ class BLEAnalyzer:
         fff_pattern = r'FFF([0-9A-Fa-f])'
         matches = re.findall(fff_pattern, line, re.I)
         for m in matches:
-            self.services.add(f'FFF{m}')
+            service = f'FFF{m}'
+            if service not in self.services:
+                self.services.add(service)
+                self._emit('service', {'uuid': service})
             
         return None
     
@@ -64,31 +123,87 @@ class BLEAnalyzer:
         """파일 분석"""
         print(f"📖 파일 분석 중: {filepath}")
         
-        with open(filepath, 'r', errors='ignore') as f:
+        with open_capture(filepath, 'r', errors='ignore') as f:
             for line_num, line in enumerate(f, 1):
-                # PacketLogger 형식 시도
-                result = self.parse_packet_logger(line)
-                if result and result['type'] == 'write':
-                    # Handle을 UUID로 변환
-                    handle = result['handle']
-                    uuid = self.characteristics.get(handle, f'Handle_{handle}')
-                    
-                    self.write_sequence.append({
-                        'line': line_num,
-                        'uuid': uuid,
-                        'handle': handle,
-                        'value': result['value'],
-                        'bytes': self.hex_to_bytes(result['value'])
-                    })
-                
-                # Console 로그 형식 시도
-                result = self.parse_console_log(line)
-                if result and result['type'] == 'data':
-                    self.commands.append({
-                        'line': line_num,
-                        'value': result['value'],
-                        'bytes': self.hex_to_bytes(result['value'])
-                    })
+                self.parse_line(line_num, line)
+        self.finish()
+    
+    def analyze_cached(self, filepath, cache):
+        """결과 캐시를 거쳐 파일 분석 (같은 파일을 다시 분석하면 파싱 생략)"""
+        if cache is None:
+            self.analyze_file(filepath)
+            return
+        key = cache.key(filepath, 'analyze_packets', CACHE_VERSION)
+        parsed = []
+        fresh = False
+        
+        def produce():
+            nonlocal fresh
+            fresh = True
+            print(f"📖 파일 분석 중: {filepath}")
+            parser = BLEAnalyzer(sink=parsed.append, keep=0)
+            with open_capture(filepath, 'r', errors='ignore') as f:
+                for line_num, line in enumerate(f, 1):
+                    parser.parse_line(line_num, line)
+                    for record in parsed:
+                        # 정수 목록 대신 bytes로 저장 (캐시 크기와 복원 시간 절약)
+                        if 'bytes' in record:
+                            record['bytes'] = bytes(record['bytes'])
+                        yield record
+                    parsed.clear()
+        
+        for record in cached_records(cache, key, produce):
+            self.replay(record)
+        self.finish()
+        if not fresh:
+            print(f"⚡ 캐시된 파싱 결과 사용: {filepath}")
+    
+    def replay(self, record):
+        """저장된 레코드로 분석 상태 복원 (sink와 보관 목록에도 전달)"""
+        kind = record['type']
+        fields = {k: v for k, v in record.items() if k != 'type'}
+        if kind == 'service':
+            self.services.add(record['uuid'])
+            self._emit(kind, fields)
+        elif kind == 'characteristic':
+            self.characteristics[record['handle']] = record['uuid']
+            self._emit(kind, fields)
+        elif kind == 'write':
+            self.write_count += 1
+            fields['bytes'] = list(record['bytes'])
+            self._record(kind, fields, self.write_sequence, self.write_runs)
+        elif kind == 'data':
+            self.command_count += 1
+            fields['bytes'] = list(record['bytes'])
+            self._record(kind, fields, self.commands, self.data_runs)
+    
+    def parse_line(self, line_num, line):
+        """로그 한 줄 분석 (찾은 레코드는 sink와 보관 목록으로 전달)"""
+        # PacketLogger 형식 시도
+        result = self.parse_packet_logger(line)
+        if result and result['type'] == 'write':
+            # Handle을 UUID로 변환
+            handle = result['handle']
+            uuid = self.characteristics.get(handle, f'Handle_{handle}')
+            
+            self.write_count += 1
+            self._record('write', {
+                'line': line_num,
+                'uuid': uuid,
+                'handle': handle,
+                'value': result['value'],
+                'bytes': self.hex_to_bytes(result['value'])
+            }, self.write_sequence, self.write_runs)
+        
+        # Console 로그 형식 시도
+        result = self.parse_console_log(line)
+        if result and result['type'] == 'data':
+            self.command_count += 1
+            self._record('data', {
+                'line': line_num,
+                'value': result['value'],
+                'bytes': self.hex_to_bytes(result['value'])
+            }, self.commands, self.data_runs)
     
     def hex_to_bytes(self, hex_string):
         """Hex 문자열을 바이트 배열로 변환"""
@@ -105,40 +220,14 @@ class BLEAnalyzer:
             return []
     
     def interpret_command(self, bytes_data):
-        """명령 바이트 해석"""
-        if not bytes_data:
-            return "Unknown"
-        
-        # 알려진 명령 패턴
-        known_commands = {
-            (0x01, 0x01, 0x00): "WiFi Power ON",
-            (0x02, 0x00, 0x01): "WiFi Enable",
-            (0x04, 0x01, 0x00): "AP Mode Enable",
-            (0x0A, 0x00, 0x01): "Remote Control",
-            (0x0B, 0x00, 0x01): "Broadcast ON",
-            (0x0C, 0x00, 0x01): "Server Start",
-            (0x0D, 0x01, 0x00): "SSID Broadcast",
-            (0x0E, 0x00, 0x01): "Accept Connection",
-            (0x0F, 0x01, 0x00): "Phocus Mode",
-        }
-        
-        # 첫 3바이트로 매칭
-        if len(bytes_data) >= 3:
-            key = tuple(bytes_data[:3])
-            if key in known_commands:
-                return known_commands[key]
-        
-        # 첫 바이트로 추측
-        if bytes_data[0] == 0x01:
-            return "Power/Init Command"
-        elif bytes_data[0] == 0x02:
-            return "Enable Command"
-        elif bytes_data[0] == 0x04:
-            return "Mode Command"
-        elif bytes_data[0] == 0x0D:
-            return "SSID Command"
-        
-        return f"Command 0x{bytes_data[0]:02X}"
+        """명령 바이트 해석 (protocol_commands.json 명령 정의 사용)"""
+        return load_command_table().classify(bytes_data)
+    
+    def print_params(self, bytes_data):
+        """명령 정의에 파라미터 필드가 있으면 값 출력"""
+        _, params = load_command_table().describe(bytes_data)
+        if params:
+            print(f"      파라미터: {params}")
     
     def print_report(self):
         """분석 보고서 출력"""
@@ -160,27 +249,47 @@ class BLEAnalyzer:
         
         # Write 시퀀스
         if self.write_sequence:
-            print(f"\n📝 Write 명령 시퀀스 ({len(self.write_sequence)}개):")
+            print(f"\n📝 Write 명령 시퀀스 ({self.write_count}개):")
             for i, cmd in enumerate(self.write_sequence[:20], 1):
                 interpretation = self.interpret_command(cmd['bytes'])
-                print(f"\n  [{i}] {cmd['uuid']} (Handle 0x{cmd['handle']})")
+                print(f"\n  [{i}] {cmd['uuid']} (Handle 0x{cmd['handle']}){self._repeat(cmd)}")
                 print(f"      Hex: {cmd['value'][:40]}...")
                 print(f"      Bytes: {cmd['bytes'][:10]}")
                 print(f"      해석: {interpretation}")
+                self.print_params(cmd['bytes'])
         
         # 일반 명령 데이터
         if self.commands and not self.write_sequence:
-            print(f"\n📦 발견된 데이터 패턴 ({len(self.commands)}개):")
+            print(f"\n📦 발견된 데이터 패턴 ({self.command_count}개):")
             for i, cmd in enumerate(self.commands[:10], 1):
                 interpretation = self.interpret_command(cmd['bytes'])
-                print(f"\n  [{i}] 라인 {cmd['line']}")
+                print(f"\n  [{i}] 라인 {cmd['line']}{self._repeat(cmd)}")
                 print(f"      Hex: {cmd['value'][:40]}...")
                 print(f"      Bytes: {cmd['bytes'][:10]}")
                 print(f"      해석: {interpretation}")
+                self.print_params(cmd['bytes'])
+        
+        # 자주 사용된 명령
+        top = self.top_commands.top(5)
+        if top and top[0][1] > 1:
+            print("\n🔁 자주 사용된 명령:")
+            for value, count, error in top:
+                interpretation = self.interpret_command(self.hex_to_bytes(value))
+                print(f"  • {value[:40]}: {format_count(count, error)} ({interpretation})")
         
         # Swift 코드 생성
         self.generate_swift_code()
     
+    def _repeat(self, record):
+        """구간 레코드면 반복 횟수와 마지막 라인 표시"""
+        if record.get('count', 1) > 1:
+            return f" ×{record['count']} (라인 {record['line']}~{record['last_line']})"
+        return ""
+    
+    def top_command_list(self, k=REPORT_LIMIT):
+        """[값, 횟수] 목록 (JSON/NDJSON 요약용)"""
+        return [[value, count] for value, count, _ in self.top_commands.top(k)]
+    
     def generate_swift_code(self):
         """Swift 코드 템플릿 생성"""
         print("\n" + "="*60)
@@ -213,35 +322,73 @@ class BLEAnalyzer:
             print("}")
 
 def main():
-    if len(sys.argv) < 2:
-        print("사용법: python3 analyze_packets.py <로그파일>")
-        print("예: python3 analyze_packets.py ble_capture.log")
-        sys.exit(1)
+    # 두 캡처 비교 모드: analyze_packets.py diff <캡처A> <캡처B>
+    if len(sys.argv) > 1 and sys.argv[1] == 'diff':
+        from capture_diff import main as diff_main
+        diff_main(sys.argv[2:])
+        return
     
-    filepath = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="BLE 패킷 분석 (PacketLogger / Console 로그)",
+        epilog="예: python3 analyze_packets.py ble_capture.log\n"
+               "    python3 analyze_packets.py diff our_app.log phocus.log  (두 캡처 명령 비교)",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('logfile', help="로그 파일 (.gz/.zst/.xz 압축 파일 지원)")
+    parser.add_argument('--ndjson', metavar='FILE',
+                        help="모든 레코드를 NDJSON으로 스트리밍 저장 (.gz/.zst/.xz 확장자면 압축)")
+    parser.add_argument('--collapse', action='store_true',
+                        help="특성별로 연속된 같은 값을 구간(첫/마지막 라인, 횟수)으로 합쳐 기록")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
     
-    analyzer = BLEAnalyzer()
+    filepath = args.logfile
+    cache = cache_from_args(args)
     
     try:
-        analyzer.analyze_file(filepath)
+        if args.ndjson:
+            # 레코드를 파싱 즉시 기록하고 보고서용으로는 앞부분만 보관
+            with NDJSONWriter(args.ndjson) as writer:
+                analyzer = BLEAnalyzer(sink=writer.write, keep=REPORT_LIMIT, collapse=args.collapse)
+                analyzer.analyze_cached(filepath, cache)
+                writer.close({
+                    'services': sorted(analyzer.services),
+                    'characteristics': analyzer.characteristics,
+                    'write_count': analyzer.write_count,
+                    'command_count': analyzer.command_count,
+                    'top_commands': analyzer.top_command_list()
+                })
+            analyzer.print_report()
+            print(f"\n💾 전체 레코드 저장 (NDJSON): {args.ndjson}")
+            return
+        
+        # JSON에는 앞부분만 저장하므로 보관 개수도 제한
+        analyzer = BLEAnalyzer(keep=REPORT_LIMIT, collapse=args.collapse)
+        analyzer.analyze_cached(filepath, cache)
         analyzer.print_report()
         
         # JSON 형식으로 저장
-        output_file = filepath.replace('.log', '_analysis.json')
+        output_file = strip_compression_suffix(filepath).replace('.log', '_analysis.json')
         with open(output_file, 'w') as f:
             json.dump({
                 'services': list(analyzer.services),
                 'characteristics': analyzer.characteristics,
-                'write_sequence': analyzer.write_sequence[:20],
-                'commands': analyzer.commands[:20]
+                'write_count': analyzer.write_count,
+                'command_count': analyzer.command_count,
+                'top_commands': analyzer.top_command_list(),
+                'write_sequence': analyzer.write_sequence[:REPORT_LIMIT],
+                'commands': analyzer.commands[:REPORT_LIMIT]
             }, f, indent=2)
         
         print(f"\n💾 분석 결과 저장: {output_file}")
+        if analyzer.write_count > REPORT_LIMIT or analyzer.command_count > REPORT_LIMIT:
+            print(f"   (처음 {REPORT_LIMIT}개만 저장됨 - 전체 결과는 --ndjson 옵션 사용)")
         
+    except SpecError as e:
+        print(f"❌ 명령 정의 오류: {e}")
     except FileNotFoundError:
         print(f"❌ 파일을 찾을 수 없습니다: {filepath}")
     except Exception as e:
         print(f"❌ 분석 중 오류: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,134 +1,215 @@
 #!/usr/bin/env python3
 
+import argparse
 import json
+import os
 import sys
 import re
-from datetime import datetime
+import shutil
+import tempfile
+from contextlib import ExitStack
 
-def analyze_phocus_log(log_file):
-    """Phocus BLE 로그 분석"""
-    
-    print("\n" + "="*60)
-    print("📊 Phocus BLE 프로토콜 분석 결과")
-    print("="*60)
-    
-    writes = []
-    reads = []
-    notifies = []
-    
-    try:
-        with open(log_file, 'r') as f:
-            for line in f:
-                try:
-                    if not line.strip():
-                        continue
-                        
-                    data = json.loads(line)
-                    msg = data.get('eventMessage', '')
-                    
-                    # FFF 관련 쓰기 찾기
-                    if 'write' in msg.lower() and 'fff' in msg.lower():
-                        # 데이터 추출
-                        hex_pattern = r'0x[0-9a-fA-F]+'
-                        hex_values = re.findall(hex_pattern, msg)
-                        if hex_values:
-                            writes.append({
-                                'time': data.get('timestamp', ''),
-                                'message': msg,
-                                'hex': hex_values
-                            })
+from capture_io import open_capture, strip_compression_suffix
+from event_aggregate import RunCollapser, SpaceSaving, format_count
+from ndjson_export import NDJSONWriter
+from result_cache import add_cache_arguments, cache_from_args, cached_records
+
+# 이벤트 추출 방식이 바뀌면 올려서 이전 캐시를 무효화
+CACHE_VERSION = 1
+
+# 자주 사용된 명령 추적에 쓰는 카운터 수 (캡처 길이와 관계없이 메모리 고정)
+TOP_CAPACITY = 256
+
+CHARACTERISTIC_PATTERN = re.compile(r'FFF[0-9A-F]', re.I)
+
+def iter_phocus_events(log_file):
+    """log stream NDJSON에서 FFF 특성 관련 write/read/notify 이벤트를 하나씩 반환"""
+    with open_capture(log_file, 'r') as f:
+        for line in f:
+            try:
+                if not line.strip():
+                    continue
                     
-                    # FFF 관련 읽기 찾기
-                    if 'read' in msg.lower() and 'fff' in msg.lower():
-                        reads.append({
+                data = json.loads(line)
+                msg = data.get('eventMessage', '')
+                lower = msg.lower()
+                if 'fff' not in lower:
+                    continue
+                
+                # FFF 관련 쓰기 찾기
+                if 'write' in lower:
+                    # 데이터 추출
+                    hex_pattern = r'0x[0-9a-fA-F]+'
+                    hex_values = re.findall(hex_pattern, msg)
+                    if hex_values:
+                        yield {
+                            'type': 'write',
                             'time': data.get('timestamp', ''),
-                            'message': msg
-                        })
+                            'message': msg,
+                            'hex': hex_values
+                        }
+                
+                # FFF 관련 읽기 찾기
+                if 'read' in lower:
+                    yield {
+                        'type': 'read',
+                        'time': data.get('timestamp', ''),
+                        'message': msg
+                    }
+                
+                # Notify 찾기
+                if 'notify' in lower:
+                    yield {
+                        'type': 'notify',
+                        'time': data.get('timestamp', ''),
+                        'message': msg
+                    }
                     
-                    # Notify 찾기
-                    if 'notify' in msg.lower() and 'fff' in msg.lower():
-                        notifies.append({
-                            'time': data.get('timestamp', ''),
-                            'message': msg
-                        })
-                        
-                except json.JSONDecodeError:
-                    continue
-                except Exception as e:
-                    continue
-    
-    except FileNotFoundError:
+            except json.JSONDecodeError:
+                continue
+            except Exception as e:
+                continue
+
+def _run_label(event):
+    """구간 레코드면 '첫 시간 ~ 마지막 시간 (×횟수)' 형식의 시간 표시"""
+    if event.get('count', 1) > 1:
+        return f"{event['time']} ~ {event['last_time']} (×{event['count']})"
+    return event['time']
+
+def analyze_phocus_log(log_file, ndjson_file=None, cache=None, collapse=False):
+    """Phocus BLE 로그 분석
+
+    collapse=True면 특성별로 연속된 같은 이벤트를 구간(첫/마지막 시간, 횟수)으로 합쳐 기록합니다.
+    """
+    print("\n" + "="*60)
+    print("📊 Phocus BLE 프로토콜 분석 결과")
+    print("="*60)
+
+    if not os.path.exists(log_file):
         print(f"❌ 로그 파일을 찾을 수 없습니다: {log_file}")
         return
-    
-    # 결과 출력
-    print(f"\n📝 분석된 이벤트:")
-    print(f"  - Write 명령: {len(writes)}개")
-    print(f"  - Read 명령: {len(reads)}개")
-    print(f"  - Notify 이벤트: {len(notifies)}개")
-    
-    if writes:
-        print("\n🔵 Write 명령 시퀀스:")
-        print("-" * 40)
-        for i, w in enumerate(writes[:20], 1):  # 처음 20개만
-            hex_str = ' '.join(w['hex'])
-            print(f"{i:2}. {hex_str}")
-            if 'FFF3' in w['message']:
-                print(f"    → FFF3에 전송")
-            elif 'FFF4' in w['message']:
-                print(f"    → FFF4에 전송")
-            elif 'FFF7' in w['message']:
-                print(f"    → FFF7에 전송")
-    
-    if notifies:
-        print("\n🔔 Notify 이벤트:")
+
+    with ExitStack() as stack:
+        # 보고서용으로는 앞부분만 보관하고, 상세 결과는 섹션별 임시 파일에 바로 기록
+        writes = []
+        notifies = []
+        counts = {'write': 0, 'read': 0, 'notify': 0}
+        top_commands = SpaceSaving(TOP_CAPACITY)
+        collapser = RunCollapser('time') if collapse else None
+        sections = {kind: stack.enter_context(tempfile.TemporaryFile('w+', encoding='utf-8')) for kind in counts}
+        # 중간에 실패하면 요약 footer 없이 닫혀 불완전한 결과임을 알 수 있음
+        writer = stack.enter_context(NDJSONWriter(ndjson_file)) if ndjson_file else None
+
+        def keep(event):
+            """보고서용 앞부분 보관 (구간은 시작할 때 보관되어 이후 횟수가 갱신됨)"""
+            if event['type'] == 'write' and len(writes) < 20:
+                writes.append(event)
+            elif event['type'] == 'notify' and len(notifies) < 10:
+                notifies.append(event)
+
+        def record(event):
+            """이벤트(또는 끝난 구간)를 NDJSON/섹션 파일에 기록"""
+            kind = event['type']
+            if writer:
+                writer.write(event)
+            if kind == 'write':
+                sections[kind].write(f"{_run_label(event)}: {' '.join(event['hex'])}\n")
+            else:
+                sections[kind].write(f"{_run_label(event)}: {event['message']}\n")
+
+        key = cache.key(log_file, 'analyze_phocus_log', CACHE_VERSION) if cache else None
+        for event in cached_records(cache, key, lambda: iter_phocus_events(log_file)):
+            kind = event['type']
+            counts[kind] += 1
+            value = event['message']
+            if kind == 'write':
+                value = ' '.join(event['hex'])
+                top_commands.add(value)
+
+            if collapser:
+                match = CHARACTERISTIC_PATTERN.search(event['message'])
+                characteristic = match.group(0).upper() if match else ''
+                finished, started = collapser.add((kind, characteristic), value, event)
+                if started is not None:
+                    keep(started)
+                if finished is not None:
+                    record(finished)
+                continue
+            keep(event)
+            record(event)
+
+        if collapser:
+            for run in collapser.flush():
+                record(run)
+
+        # 결과 출력
+        print(f"\n📝 분석된 이벤트:")
+        print(f"  - Write 명령: {counts['write']}개")
+        print(f"  - Read 명령: {counts['read']}개")
+        print(f"  - Notify 이벤트: {counts['notify']}개")
+        if collapser:
+            print(f"  - 연속 반복을 합친 구간: {collapser.runs}개")
+
+        if writes:
+            print("\n🔵 Write 명령 시퀀스:")
+            print("-" * 40)
+            for i, w in enumerate(writes[:20], 1):  # 처음 20개만
+                hex_str = ' '.join(w['hex'])
+                repeat = f"  (×{w['count']})" if w.get('count', 1) > 1 else ""
+                print(f"{i:2}. {hex_str}{repeat}")
+                if 'FFF3' in w['message']:
+                    print(f"    → FFF3에 전송")
+                elif 'FFF4' in w['message']:
+                    print(f"    → FFF4에 전송")
+                elif 'FFF7' in w['message']:
+                    print(f"    → FFF7에 전송")
+
+        if notifies:
+            print("\n🔔 Notify 이벤트:")
+            print("-" * 40)
+            for i, n in enumerate(notifies[:10], 1):
+                repeat = f" (×{n['count']})" if n.get('count', 1) > 1 else ""
+                print(f"{i}. {n['message'][:100]}...{repeat}")
+
+        # 패턴 분석
+        print("\n🔍 발견된 패턴:")
         print("-" * 40)
-        for i, n in enumerate(notifies[:10], 1):
-            print(f"{i}. {n['message'][:100]}...")
-    
-    # 패턴 분석
-    print("\n🔍 발견된 패턴:")
-    print("-" * 40)
-    
-    # 공통 명령 찾기
-    common_commands = {}
-    for w in writes:
-        hex_str = ' '.join(w['hex'])
-        if hex_str in common_commands:
-            common_commands[hex_str] += 1
-        else:
-            common_commands[hex_str] = 1
-    
-    # 자주 사용된 명령
-    sorted_commands = sorted(common_commands.items(), key=lambda x: x[1], reverse=True)
-    if sorted_commands:
-        print("자주 사용된 명령:")
-        for cmd, count in sorted_commands[:5]:
-            print(f"  {cmd}: {count}회")
-    
-    # 결과 저장
-    output_file = log_file.replace('.log', '_analysis.txt')
-    with open(output_file, 'w') as f:
-        f.write("Phocus BLE Protocol Analysis\n")
-        f.write("="*60 + "\n\n")
-        
-        f.write("Write Commands:\n")
-        for w in writes:
-            f.write(f"{w['time']}: {' '.join(w['hex'])}\n")
-        
-        f.write("\nRead Events:\n")
-        for r in reads:
-            f.write(f"{r['time']}: {r['message']}\n")
-        
-        f.write("\nNotify Events:\n")
-        for n in notifies:
-            f.write(f"{n['time']}: {n['message']}\n")
-    
-    print(f"\n💾 상세 분석 결과 저장: {output_file}")
-    print("="*60)
+
+        # 자주 사용된 명령
+        sorted_commands = top_commands.top(20)
+        if sorted_commands:
+            print("자주 사용된 명령:")
+            for cmd, count, error in sorted_commands[:5]:
+                print(f"  {cmd}: {format_count(count, error)}")
+
+        if writer:
+            writer.close({'top_commands': [[cmd, count] for cmd, count, _ in sorted_commands]})
+            print(f"\n💾 전체 이벤트 저장 (NDJSON): {ndjson_file}")
+
+        # 결과 저장 (섹션별 임시 파일을 이어 붙임)
+        output_file = strip_compression_suffix(log_file).replace('.log', '_analysis.txt')
+        with open(output_file, 'w') as f:
+            f.write("Phocus BLE Protocol Analysis\n")
+            f.write("="*60 + "\n\n")
+
+            for title, kind in (("Write Commands:", 'write'), ("\nRead Events:", 'read'), ("\nNotify Events:", 'notify')):
+                f.write(title + "\n")
+                sections[kind].seek(0)
+                shutil.copyfileobj(sections[kind], f)
+
+        print(f"\n💾 상세 분석 결과 저장: {output_file}")
+        print("="*60)
+
+def main():
+    parser = argparse.ArgumentParser(description="Phocus BLE 로그(log stream NDJSON) 분석")
+    parser.add_argument('log_file', help="로그 파일 (.gz/.zst/.xz 압축 파일 지원)")
+    parser.add_argument('--ndjson', metavar='FILE',
+                        help="모든 이벤트를 NDJSON으로 스트리밍 저장 (.gz/.zst/.xz 확장자면 압축)")
+    parser.add_argument('--collapse', action='store_true',
+                        help="특성별로 연속된 같은 이벤트를 구간(첫/마지막 시간, 횟수)으로 합쳐 기록")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    analyze_phocus_log(args.log_file, args.ndjson, cache_from_args(args), args.collapse)
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        analyze_phocus_log(sys.argv[1])
-    else:
-        print("사용법: python3 analyze_phocus_log.py <log_file>")
\ No newline at end of file
+    main()
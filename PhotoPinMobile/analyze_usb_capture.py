@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+USB 캡처(usbmon / USBPcap) PTP 디코더
+Linux usbmon 또는 Windows USBPcap으로 저장한 pcap에서 Still Image 인터페이스의
+bulk 전송을 추출하고 PTP 컨테이너를 재조립하여 명령별 횟수, 지연시간, 전송 속도를 보고합니다.
+
+캡처는 스트리밍으로 처리되며 컨테이너 본문은 저장하지 않습니다.
+"""
+
+import argparse
+import json
+import struct
+import sys
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from analyze_camera_traffic import EndpointStats
+from pcap_reader import (
+    LINKTYPE_USB_LINUX, LINKTYPE_USB_LINUX_MMAPPED, LINKTYPE_USBPCAP,
+    PcapError, read_packets,
+)
+from ptp_protocol import (
+    PTP_CONTAINER_COMMAND, PTP_CONTAINER_DATA, PTP_CONTAINER_EVENT, PTP_CONTAINER_HEADER,
+    PTP_CONTAINER_RESPONSE, PTP_CONTAINER_TYPES, operation_name, response_name,
+)
+
+# USB 전송 타입
+USB_TRANSFER_ISO = 0
+USB_TRANSFER_INTERRUPT = 1
+USB_TRANSFER_CONTROL = 2
+USB_TRANSFER_BULK = 3
+
+# Still Image 인터페이스 클래스 (PTP)
+USB_CLASS_STILL_IMAGE = 0x06
+
+# usbmon 헤더 (linktype 189: 48바이트, 220: 64바이트)
+USBMON_HEADER = struct.Struct('<QBBBBHbbqiiII8s')
+USBMON_MMAPPED_EXTRA = struct.Struct('<iiII')
+
+# USBPcap 헤더 (packed, 27바이트)
+USBPCAP_HEADER = struct.Struct('<HQIHBHHBBI')
+
+MAX_PENDING_TRANSACTIONS = 256
+
+
+class UsbTransfer(NamedTuple):
+    """URB 이벤트 하나"""
+    timestamp: float
+    urb_id: int
+    device: Tuple[int, int]       # (bus, device)
+    endpoint: int                 # 방향 비트 포함 주소 (0x81 = IN 1)
+    transfer_type: int
+    completion: bool              # False: 제출(submit), True: 완료(complete)
+    length: int                   # 실제 전송 바이트 수
+    data: bytes                   # 캡처된 데이터 (snaplen으로 잘렸을 수 있음)
+    setup: Optional[bytes]        # 컨트롤 전송 setup 패킷
+
+
+def decode_usbmon(packet) -> Optional[UsbTransfer]:
+    """Linux usbmon 레코드 해석"""
+    data = packet.data
+    header_len = 64 if packet.linktype == LINKTYPE_USB_LINUX_MMAPPED else 48
+    if len(data) < header_len:
+        return None
+    (urb_id, event, transfer_type, endpoint, devnum, busnum, flag_setup, _flag_data,
+     _ts_sec, _ts_usec, _status, length, _len_cap, setup) = USBMON_HEADER.unpack_from(data)
+    if event not in (ord('S'), ord('C')):
+        return None  # 'E' (에러) 이벤트
+    payload_offset = header_len
+    if header_len == 64:
+        ndesc = USBMON_MMAPPED_EXTRA.unpack_from(data, 48)[3]
+        if transfer_type == USB_TRANSFER_ISO:
+            payload_offset += ndesc * 16
+    return UsbTransfer(
+        packet.timestamp, urb_id, (busnum, devnum), endpoint, transfer_type,
+        event == ord('C'), length, data[payload_offset:],
+        setup if flag_setup == 0 else None,
+    )
+
+
+def decode_usbpcap(packet) -> Optional[UsbTransfer]:
+    """Windows USBPcap 레코드 해석"""
+    data = packet.data
+    if len(data) < USBPCAP_HEADER.size:
+        return None
+    (header_len, irp_id, _status, _function, info, bus, device, endpoint,
+     transfer_type, length) = USBPCAP_HEADER.unpack_from(data)
+    payload = data[header_len:]
+    setup = None
+    if transfer_type == USB_TRANSFER_CONTROL and header_len > USBPCAP_HEADER.size:
+        stage = data[USBPCAP_HEADER.size]
+        if stage == 0 and len(payload) >= 8:
+            setup = payload[:8]
+            payload = payload[8:]
+            length = max(0, length - 8)
+    return UsbTransfer(
+        packet.timestamp, irp_id, (bus, device), endpoint, transfer_type,
+        bool(info & 0x01), length, payload, setup,
+    )
+
+
+def decode_transfer(packet) -> Optional[UsbTransfer]:
+    """링크 타입에 맞는 USB 레코드 해석"""
+    if packet.linktype in (LINKTYPE_USB_LINUX, LINKTYPE_USB_LINUX_MMAPPED):
+        return decode_usbmon(packet)
+    if packet.linktype == LINKTYPE_USBPCAP:
+        return decode_usbpcap(packet)
+    return None
+
+
+def parse_config_descriptor(data: bytes) -> Set[int]:
+    """Configuration 디스크립터에서 Still Image 인터페이스의 엔드포인트 주소 추출"""
+    endpoints = set()
+    in_still_image = False
+    pos = 0
+    while pos + 2 <= len(data):
+        length, descriptor_type = data[pos], data[pos + 1]
+        if length < 2:
+            break
+        if descriptor_type == 0x04 and pos + 6 <= len(data):      # Interface
+            in_still_image = data[pos + 5] == USB_CLASS_STILL_IMAGE
+        elif descriptor_type == 0x05 and pos + 3 <= len(data):    # Endpoint
+            if in_still_image:
+                endpoints.add(data[pos + 2])
+        pos += length
+    return endpoints
+
+
+class ContainerStream:
+    """엔드포인트 하나의 PTP 컨테이너 재조립 (헤더만 해석하고 본문 길이를 추적)"""
+
+    def __init__(self):
+        self.remaining = 0
+
+    def feed(self, length: int, data: bytes):
+        """전송 하나를 넣고 (새 컨테이너 헤더, 이어지는 본문 바이트 수) 목록 반환"""
+        out = []
+        offset = 0
+        while offset < length:
+            if self.remaining:
+                n = min(self.remaining, length - offset)
+                self.remaining -= n
+                offset += n
+                out.append((None, n))
+                continue
+            header = data[offset:offset + PTP_CONTAINER_HEADER.size]
+            if len(header) < PTP_CONTAINER_HEADER.size:
+                break  # 헤더가 캡처되지 않았거나 컨테이너가 아님
+            c_length, c_type, code, transaction_id = PTP_CONTAINER_HEADER.unpack(header)
+            if c_type not in PTP_CONTAINER_TYPES or c_length < PTP_CONTAINER_HEADER.size:
+                break
+            n = min(c_length, length - offset)
+            self.remaining = c_length - n
+            offset += n
+            out.append(({'type': c_type, 'code': code, 'transaction_id': transaction_id,
+                         'length': c_length}, n))
+        return out
+
+
+class USBCaptureAnalyzer:
+    """USB 전송을 받아 PTP 트랜잭션별 통계를 누적"""
+
+    def __init__(self, device: Optional[Tuple[int, int]] = None):
+        self.device_filter = device
+        self.still_image_endpoints: Dict[Tuple[int, int], Set[int]] = {}
+        self.rejected_endpoints = set()
+        self.pending_setup = {}
+        self.streams: Dict[Tuple, ContainerStream] = {}
+        self.transactions: Dict[Tuple, Dict] = {}
+        self.current_data: Dict[Tuple, Tuple[Dict, str]] = {}
+        self.stats: Dict[str, EndpointStats] = {}
+        self.events: Dict[str, int] = {}
+        self.responses: Dict[str, int] = {}
+        self.transfers = 0
+        self.containers = 0
+
+    def feed(self, transfer: UsbTransfer):
+        if self.device_filter and transfer.device != self.device_filter:
+            return
+        if transfer.transfer_type == USB_TRANSFER_CONTROL:
+            self._on_control(transfer)
+            return
+        if transfer.transfer_type not in (USB_TRANSFER_BULK, USB_TRANSFER_INTERRUPT):
+            return
+
+        # OUT 데이터는 제출 시점에, IN 데이터는 완료 시점에 실림
+        is_in = bool(transfer.endpoint & 0x80)
+        if is_in != transfer.completion or transfer.length == 0:
+            return
+        if not self._is_still_image(transfer):
+            return
+
+        self.transfers += 1
+        key = (transfer.device, transfer.endpoint)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = ContainerStream()
+        for header, nbytes in stream.feed(transfer.length, transfer.data):
+            if header is None:
+                current = self.current_data.get(key)
+                if current is not None:
+                    op, direction = current
+                    op[direction] += nbytes
+                continue
+            self.containers += 1
+            self._on_container(transfer, key, header, nbytes)
+
+    def _is_still_image(self, transfer: UsbTransfer) -> bool:
+        known = self.still_image_endpoints.get(transfer.device)
+        if known is not None:
+            return transfer.endpoint in known
+        key = (transfer.device, transfer.endpoint)
+        if key in self.rejected_endpoints:
+            return False
+        if key in self.streams:
+            return True
+        # 디스크립터를 캡처하지 못한 경우: 첫 전송이 PTP 컨테이너처럼 보이면 채택
+        if len(transfer.data) >= PTP_CONTAINER_HEADER.size:
+            c_length, c_type, _, _ = PTP_CONTAINER_HEADER.unpack_from(transfer.data)
+            if c_type in PTP_CONTAINER_TYPES and c_length >= PTP_CONTAINER_HEADER.size:
+                return True
+        self.rejected_endpoints.add(key)
+        return False
+
+    def _on_control(self, transfer: UsbTransfer):
+        # GET_DESCRIPTOR(Configuration) 응답에서 Still Image 인터페이스 엔드포인트 파악
+        if not transfer.completion:
+            setup = transfer.setup
+            if setup and setup[0] == 0x80 and setup[1] == 0x06 and setup[3] == 0x02:
+                self.pending_setup[transfer.urb_id] = True
+            return
+        if self.pending_setup.pop(transfer.urb_id, None) and transfer.data:
+            endpoints = parse_config_descriptor(transfer.data)
+            if endpoints:
+                self.still_image_endpoints[transfer.device] = endpoints
+
+    def _on_container(self, transfer: UsbTransfer, key: Tuple, header: Dict, nbytes: int):
+        c_type = header['type']
+        tkey = (transfer.device, header['transaction_id'])
+        if c_type == PTP_CONTAINER_COMMAND:
+            self.transactions[tkey] = {
+                'code': header['code'],
+                'start': transfer.timestamp,
+                'out_bytes': 0,
+                'in_bytes': 0,
+            }
+            if len(self.transactions) > MAX_PENDING_TRANSACTIONS:
+                oldest = next(iter(self.transactions))
+                self._finish(self.transactions.pop(oldest), None)
+            self.current_data.pop(key, None)
+        elif c_type == PTP_CONTAINER_DATA:
+            op = self.transactions.get(tkey)
+            if op is None:
+                self.current_data.pop(key, None)
+                return
+            direction = 'in_bytes' if transfer.endpoint & 0x80 else 'out_bytes'
+            op[direction] += nbytes
+            # 이어지는 bulk 전송 바이트도 같은 트랜잭션에 합산
+            self.current_data[key] = (op, direction)
+        elif c_type == PTP_CONTAINER_RESPONSE:
+            self.current_data.pop(key, None)
+            op = self.transactions.pop(tkey, None)
+            name = response_name(header['code'])
+            self.responses[name] = self.responses.get(name, 0) + 1
+            if op is not None:
+                self._finish(op, transfer.timestamp)
+        elif c_type == PTP_CONTAINER_EVENT:
+            name = f"Event 0x{header['code']:04X}"
+            self.events[name] = self.events.get(name, 0) + 1
+
+    def _finish(self, op: Dict, end: Optional[float]):
+        name = operation_name(op['code'])
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = EndpointStats()
+        stats.add(op['out_bytes'], op['in_bytes'], None if end is None else end - op['start'])
+
+    def finish(self) -> Dict:
+        for op in self.transactions.values():
+            self._finish(op, None)
+        self.transactions.clear()
+        return {
+            'transfers': self.transfers,
+            'containers': self.containers,
+            'still_image_endpoints': {
+                f"{bus}.{dev}": sorted(eps) for (bus, dev), eps in self.still_image_endpoints.items()
+            },
+            'stats': self.stats,
+            'events': self.events,
+            'responses': self.responses,
+        }
+
+
+def analyze_capture(filepath: str, device: Optional[Tuple[int, int]] = None) -> Dict:
+    """USB 캡처 파일 분석 후 통계 반환"""
+    analyzer = USBCaptureAnalyzer(device)
+    packets = 0
+    for packet in read_packets(filepath):
+        packets += 1
+        transfer = decode_transfer(packet)
+        if transfer is not None:
+            analyzer.feed(transfer)
+    result = analyzer.finish()
+    result['packets'] = packets
+    return result
+
+
+def throughput(stats: EndpointStats) -> Optional[float]:
+    """명령 하나의 평균 전송 속도 (bytes/s)"""
+    if not stats.latency_sum:
+        return None
+    return (stats.request_bytes + stats.response_bytes) / stats.latency_sum
+
+
+def print_report(result: Dict):
+    """분석 보고서 출력"""
+    print("\n" + "="*60)
+    print("📊 USB PTP 전송 분석 보고서")
+    print("="*60)
+    print(f"\n📦 패킷: {result['packets']}개 (PTP bulk 전송 {result['transfers']}개, "
+          f"컨테이너 {result['containers']}개)")
+    for device, endpoints in result['still_image_endpoints'].items():
+        eps = ', '.join(f"0x{ep:02x}" for ep in endpoints)
+        print(f"🔌 장치 {device} Still Image 엔드포인트: {eps}")
+
+    stats = result['stats']
+    if not stats:
+        print("\n❌ PTP 트랜잭션을 찾지 못했습니다")
+    else:
+        print(f"\n🔧 명령별 통계:")
+        print(f"  {'명령':<32} {'횟수':>6} {'OUT 바이트':>12} {'IN 바이트':>12} {'평균 지연':>10} {'속도':>12}")
+        for name, s in sorted(stats.items(), key=lambda item: item[1].count, reverse=True):
+            avg = s.latency_sum / s.latency_count if s.latency_count else None
+            rate = throughput(s)
+            avg_str = "-" if avg is None else f"{avg * 1000:.1f}ms"
+            rate_str = "-" if rate is None else f"{rate / 1e6:.2f}MB/s"
+            print(f"  {name[:32]:<32} {s.count:>6} {s.request_bytes:>12} {s.response_bytes:>12} "
+                  f"{avg_str:>10} {rate_str:>12}")
+
+    if result['responses']:
+        print("\n📨 응답 코드:")
+        for name, count in sorted(result['responses'].items(), key=lambda item: -item[1]):
+            print(f"  {name}: {count}회")
+
+    if result['events']:
+        print("\n🔔 이벤트:")
+        for name, count in sorted(result['events'].items(), key=lambda item: -item[1]):
+            print(f"  {name}: {count}회")
+
+
+def _parse_device(value: str) -> Tuple[int, int]:
+    bus, _, dev = value.partition('.')
+    return int(bus), int(dev)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="USB 캡처(usbmon/USBPcap)의 PTP 전송 분석")
+    parser.add_argument('capture', help="usbmon 또는 USBPcap pcap 파일")
+    parser.add_argument('--device', type=_parse_device, help="분석할 장치 (버스.장치, 예: 1.5)")
+    parser.add_argument('--json', dest='json_file', help="명령별 통계를 JSON으로 저장")
+    args = parser.parse_args(argv)
+
+    try:
+        print(f"📖 USB 캡처 분석 중: {args.capture}")
+        result = analyze_capture(args.capture, args.device)
+    except FileNotFoundError:
+        print(f"❌ 파일을 찾을 수 없습니다: {args.capture}")
+        sys.exit(1)
+    except PcapError as e:
+        print(f"❌ 캡처 파일 오류: {e}")
+        sys.exit(1)
+
+    print_report(result)
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump({
+                'packets': result['packets'],
+                'transfers': result['transfers'],
+                'containers': result['containers'],
+                'still_image_endpoints': result['still_image_endpoints'],
+                'operations': [
+                    dict(operation=name, throughput=throughput(stats), **stats.to_dict())
+                    for name, stats in sorted(result['stats'].items())
+                ],
+                'responses': result['responses'],
+                'events': result['events'],
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 분석 결과 저장: {args.json_file}")
+
+
+if __name__ == "__main__":
+    main()
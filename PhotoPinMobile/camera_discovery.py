@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+카메라 자동 탐색 (asyncio)
+같은 네트워크에 있는 카메라를 IP 고정 없이 찾습니다.
+
+  - 서브넷 전체에 TCP 연결 프로브를 동시에 보내 살아 있는 호스트를 찾고 (RST 응답도 "살아 있음")
+  - 찾은 호스트마다 카메라 포트를 바로 스캔하며
+  - 그동안 mDNS(5353)와 SSDP(1900) 응답/광고를 함께 수신합니다.
+
+ping 같은 외부 명령이나 관리자 권한 없이 동작하며, /24 서브넷을 몇 초 안에 탐색합니다.
+asyncio는 탐색을 시작할 때 import합니다 (--help나 상수만 쓰는 스크립트의 시작 시간 단축).
+"""
+
+import argparse
+import errno
+import ipaddress
+import json
+import socket
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Phocus가 카메라 WiFi(AP 모드)에 연결했을 때의 기본 주소
+DEFAULT_CAMERA_IP = "192.168.2.1"
+
+# 카메라가 사용할 가능성이 높은 포트
+CAMERA_PORTS = [
+    (80, "HTTP"),
+    (443, "HTTPS"),
+    (8080, "Alternative HTTP"),
+    (8443, "Alternative HTTPS"),
+    (15740, "PTP/IP"),
+    (5353, "mDNS"),
+    (1900, "UPnP"),
+    (9000, "Camera Control"),
+    (554, "RTSP"),
+    (21, "FTP"),
+    (22, "SSH"),
+    (23, "Telnet"),
+    (8008, "HTTP Alt"),
+    (8888, "HTTP Alt2"),
+    (3000, "Dev Server"),
+    (5000, "Flask/Control"),
+]
+
+# 호스트 생존 확인용 포트 (연결 성공 또는 거부 응답이 오면 살아 있음)
+ALIVE_PORTS = (80, 15740)
+
+PTPIP_PORT = 15740
+DEFAULT_TIMEOUT = 0.5
+DEFAULT_LISTEN = 2.0
+DEFAULT_CONCURRENCY = 200     # 동시에 여는 소켓 수, macOS 기본 파일 디스크립터 한도(256) 안쪽
+FD_BACKOFF = 0.05             # 파일 디스크립터 부족 시 첫 재시도 대기 (초, 두 배씩 증가)
+FD_BACKOFF_MAX = 1.6          # 이보다 길게 기다려야 하면 오류로 중단
+MAX_HOSTS = 4096
+
+MDNS_GROUP = ('224.0.0.251', 5353)
+MDNS_SERVICES = ('_ptp._tcp.local', '_http._tcp.local', '_services._dns-sd._udp.local')
+SSDP_GROUP = ('239.255.255.250', 1900)
+
+_DNS_HEADER = struct.Struct('!HHHHHH')
+_DNS_RR = struct.Struct('!HHIH')
+_DNS_TYPE_A, _DNS_TYPE_PTR, _DNS_TYPE_TXT, _DNS_TYPE_SRV = 1, 12, 16, 33
+
+_CAMERA_KEYWORDS = ('hasselblad', 'camera', 'x2d', 'ptp')
+_FD_EXHAUSTED = (errno.EMFILE, errno.ENFILE)
+
+
+class Device:
+    """탐색된 장치 하나"""
+
+    def __init__(self, ip: str):
+        self.ip = ip
+        self.alive = False
+        self.open_ports: Dict[int, str] = {}
+        self.names = set()          # mDNS 이름 / SSDP USN
+        self.services = set()       # mDNS 서비스 종류
+        self.ssdp = {}              # SSDP 헤더 (SERVER, LOCATION, ST ...)
+        self.found_by = set()       # 'tcp', 'mdns', 'ssdp'
+
+    @property
+    def is_camera(self) -> bool:
+        if PTPIP_PORT in self.open_ports or '_ptp._tcp.local' in self.services:
+            return True
+        text = ' '.join(list(self.names) + list(self.ssdp.values())).lower()
+        return any(keyword in text for keyword in _CAMERA_KEYWORDS)
+
+    def to_dict(self) -> Dict:
+        return {
+            'ip': self.ip,
+            'camera': self.is_camera,
+            'open_ports': self.open_ports,
+            'names': sorted(self.names),
+            'services': sorted(self.services),
+            'ssdp': self.ssdp,
+            'found_by': sorted(self.found_by),
+        }
+
+
+def local_subnet(target: str = DEFAULT_CAMERA_IP, prefix: int = 24) -> ipaddress.IPv4Network:
+    """카메라 쪽으로 나가는 인터페이스의 서브넷 (UDP connect만 하고 패킷은 보내지 않음)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.connect((target, 9))
+        local_ip = sock.getsockname()[0]
+    except OSError:
+        local_ip = target
+    finally:
+        sock.close()
+    return ipaddress.ip_network(f"{local_ip}/{prefix}", strict=False)
+
+
+async def probe_port(host: str, port: int, timeout: float = DEFAULT_TIMEOUT) -> Optional[bool]:
+    """TCP 연결 프로브
+
+    Returns: True (열림), False (닫힘 - 연결 거부 응답), None (응답 없음)
+    로컬 파일 디스크립터가 부족하면 다른 프로브가 소켓을 닫을 때까지 기다렸다가 다시 시도하고,
+    계속 부족하면 OSError(EMFILE/ENFILE)를 그대로 올립니다 ("응답 없음"으로 세지 않음).
+    """
+    import asyncio
+    delay = FD_BACKOFF
+    while True:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            break
+        except ConnectionRefusedError:
+            return False
+        except OSError as e:
+            if e.errno in _FD_EXHAUSTED:
+                if delay > FD_BACKOFF_MAX:
+                    raise
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+            # 연결 초기화(RST)도 호스트가 살아 있다는 뜻
+            return False if e.errno in (errno.ECONNRESET, errno.ECONNREFUSED) else None
+        except asyncio.TimeoutError:
+            return None
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def is_reachable(host: str, ports: Sequence[int] = ALIVE_PORTS, timeout: float = 1.0) -> bool:
+    """호스트가 응답하는지 (ping 대신 TCP 연결 프로브, 권한 불필요)"""
+    import asyncio
+    results = await asyncio.gather(*(probe_port(host, port, timeout) for port in ports))
+    return any(result is not None for result in results)
+
+
+async def scan_host(host: str, ports: Iterable[Tuple[int, str]] = CAMERA_PORTS,
+                    timeout: float = DEFAULT_TIMEOUT, limit: Optional['asyncio.Semaphore'] = None) -> Dict[int, str]:
+    """호스트의 열린 포트 {포트: 설명}"""
+    import asyncio
+    limit = limit or asyncio.Semaphore(DEFAULT_CONCURRENCY)
+    ports = list(ports)
+
+    async def probe(port):
+        async with limit:
+            return await probe_port(host, port, timeout)
+
+    results = await asyncio.gather(*(probe(port) for port, _ in ports))
+    return {port: description for (port, description), result in zip(ports, results) if result}
+
+
+# ---------------------------------------------------------------- mDNS
+
+def _read_name(data: bytes, pos: int) -> Tuple[str, int]:
+    """DNS 이름 읽기 (압축 포인터 지원)"""
+    labels = []
+    end = None
+    for _ in range(128):  # 포인터 순환 방지
+        length = data[pos]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = pos + 2
+            pos = ((length & 0x3F) << 8) | data[pos + 1]
+            continue
+        pos += 1
+        if length == 0:
+            break
+        labels.append(data[pos:pos + length].decode('utf-8', errors='replace'))
+        pos += length
+    return '.'.join(labels), end if end is not None else pos
+
+
+def parse_mdns(data: bytes) -> List[Tuple[str, int, object]]:
+    """mDNS 응답의 (이름, 타입, 값) 목록 (PTR/SRV/A/TXT만)"""
+    records = []
+    try:
+        _, _, qdcount, ancount, nscount, arcount = _DNS_HEADER.unpack_from(data)
+        pos = _DNS_HEADER.size
+        for _ in range(qdcount):
+            _, pos = _read_name(data, pos)
+            pos += 4
+        for _ in range(ancount + nscount + arcount):
+            name, pos = _read_name(data, pos)
+            rtype, _, _, rdlength = _DNS_RR.unpack_from(data, pos)
+            pos += _DNS_RR.size
+            rdata_end = pos + rdlength
+            if rtype == _DNS_TYPE_PTR:
+                records.append((name, rtype, _read_name(data, pos)[0]))
+            elif rtype == _DNS_TYPE_SRV:
+                port = struct.unpack_from('!H', data, pos + 4)[0]
+                records.append((name, rtype, (port, _read_name(data, pos + 6)[0])))
+            elif rtype == _DNS_TYPE_A and rdlength == 4:
+                records.append((name, rtype, socket.inet_ntoa(data[pos:rdata_end])))
+            elif rtype == _DNS_TYPE_TXT:
+                strings = []
+                i = pos
+                while i < rdata_end:
+                    strings.append(data[i + 1:i + 1 + data[i]].decode('utf-8', errors='replace'))
+                    i += 1 + data[i]
+                records.append((name, rtype, strings))
+            pos = rdata_end
+    except (struct.error, IndexError):
+        pass  # 잘린 패킷은 읽은 데까지만 사용
+    return records
+
+
+def build_mdns_query(services: Sequence[str] = MDNS_SERVICES, unicast: bool = False) -> bytes:
+    """PTR 질의 패킷 (unicast=True면 QU 비트로 유니캐스트 응답 요청)"""
+    packet = bytearray(_DNS_HEADER.pack(0, 0, len(services), 0, 0, 0))
+    for service in services:
+        for label in service.split('.'):
+            encoded = label.encode('utf-8')
+            packet.append(len(encoded))
+            packet += encoded
+        packet.append(0)
+        packet += struct.pack('!HH', _DNS_TYPE_PTR, 0x8001 if unicast else 0x0001)
+    return bytes(packet)
+
+
+# ---------------------------------------------------------------- SSDP
+
+def build_ssdp_search(group: Tuple[str, int] = SSDP_GROUP, target: str = 'ssdp:all', mx: int = 1) -> bytes:
+    return (f"M-SEARCH * HTTP/1.1\r\nHOST: {group[0]}:{group[1]}\r\n"
+            f"MAN: \"ssdp:discover\"\r\nMX: {mx}\r\nST: {target}\r\n\r\n").encode('ascii')
+
+
+def parse_ssdp(data: bytes) -> Optional[Dict[str, str]]:
+    """SSDP 응답(HTTP/1.1 200) 또는 NOTIFY 광고의 헤더"""
+    lines = data.decode('utf-8', errors='replace').split('\r\n')
+    if not (lines[0].startswith('HTTP/1.1 200') or lines[0].startswith('NOTIFY')):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().upper()] = value.strip()
+    return headers
+
+
+# ---------------------------------------------------------------- 수신기
+
+def _listener_factory(handler):
+    """수신한 데이터그램을 handler(data, ip)로 넘기는 DatagramProtocol 생성 함수"""
+    import asyncio
+
+    class _Listener(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            handler(data, addr[0])
+
+        def error_received(self, exc):
+            pass
+
+    return _Listener
+
+
+def _multicast_socket(group: Tuple[str, int]) -> Tuple[socket.socket, bool]:
+    """멀티캐스트 그룹 포트에 bind (다른 프로그램이 사용 중이면 임의 포트로 대체)
+
+    Returns: (소켓, 그룹 포트에 bind했는지)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except OSError:
+            pass
+    joined = False
+    try:
+        sock.bind(('', group[1]))
+        if ipaddress.ip_address(group[0]).is_multicast:
+            membership = socket.inet_aton(group[0]) + socket.inet_aton('0.0.0.0')
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        joined = True
+    except OSError:
+        sock.close()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.bind(('', 0))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+    sock.setblocking(False)
+    return sock, joined
+
+
+class DiscoveryService:
+    """TCP 스윕 + mDNS + SSDP 동시 탐색"""
+
+    def __init__(self, ports: Iterable[Tuple[int, str]] = CAMERA_PORTS, timeout: float = DEFAULT_TIMEOUT,
+                 concurrency: int = DEFAULT_CONCURRENCY, mdns_group: Tuple[str, int] = MDNS_GROUP,
+                 ssdp_group: Tuple[str, int] = SSDP_GROUP):
+        self.ports = list(ports)
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.mdns_group = mdns_group
+        self.ssdp_group = ssdp_group
+        self.devices: Dict[str, Device] = {}
+        self._scanned = set()
+        self._limit = None
+        self._transports = []
+        self._pending = set()
+
+    def _device(self, ip: str) -> Device:
+        device = self.devices.get(ip)
+        if device is None:
+            device = self.devices[ip] = Device(ip)
+        return device
+
+    def _on_mdns(self, data: bytes, ip: str):
+        records = parse_mdns(data)
+        if not records:
+            return
+        device = self._device(ip)
+        device.found_by.add('mdns')
+        for name, rtype, value in records:
+            if rtype == _DNS_TYPE_PTR:
+                if name != '_services._dns-sd._udp.local':
+                    device.services.add(name)
+                    device.names.add(value)
+                else:
+                    device.services.add(value)
+            elif rtype == _DNS_TYPE_SRV:
+                device.names.add(name)
+                device.open_ports.setdefault(value[0], f"mDNS {name}")
+            elif rtype == _DNS_TYPE_A and value != ip:
+                self._device(value).names.add(name)
+        self._schedule_scan(ip)
+
+    def _on_ssdp(self, data: bytes, ip: str):
+        headers = parse_ssdp(data)
+        if headers is None:
+            return
+        device = self._device(ip)
+        device.found_by.add('ssdp')
+        for key in ('SERVER', 'LOCATION', 'ST', 'NT', 'USN'):
+            if key in headers:
+                device.ssdp[key] = headers[key]
+        if 'USN' in headers:
+            device.names.add(headers['USN'])
+        self._schedule_scan(ip)
+
+    async def _start_listeners(self, mdns: bool, ssdp: bool):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if mdns:
+            sock, joined = _multicast_socket(self.mdns_group)
+            transport, _ = await loop.create_datagram_endpoint(_listener_factory(self._on_mdns), sock=sock)
+            transport.sendto(build_mdns_query(unicast=not joined), self.mdns_group)
+            self._transports.append(transport)
+        if ssdp:
+            sock, _ = _multicast_socket(self.ssdp_group)
+            transport, _ = await loop.create_datagram_endpoint(_listener_factory(self._on_ssdp), sock=sock)
+            transport.sendto(build_ssdp_search(self.ssdp_group), self.ssdp_group)
+            self._transports.append(transport)
+
+    def _schedule_scan(self, ip: str):
+        """수신기에서 새로 알게 된 호스트의 포트 스캔 예약"""
+        if ip not in self._scanned and self._limit is not None:
+            import asyncio
+            task = asyncio.ensure_future(self._scan(ip))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _scan(self, ip: str):
+        if ip in self._scanned:
+            return
+        self._scanned.add(ip)
+        open_ports = await scan_host(ip, self.ports, self.timeout, self._limit)
+        device = self._device(ip)
+        device.alive = device.alive or bool(open_ports)
+        device.open_ports.update(open_ports)
+
+    async def _probe(self, ip: str, port: int) -> Optional[bool]:
+        """동시 연결 수 제한 안에서 프로브 (세마포어는 호스트가 아니라 소켓 단위)"""
+        async with self._limit:
+            return await probe_port(ip, port, self.timeout)
+
+    async def _sweep_host(self, ip: str):
+        import asyncio
+        results = await asyncio.gather(*(self._probe(ip, port) for port in ALIVE_PORTS))
+        if any(result is not None for result in results):
+            device = self._device(ip)
+            device.alive = True
+            device.found_by.add('tcp')
+            await self._scan(ip)
+
+    async def discover(self, hosts: Iterable[str], listen: float = DEFAULT_LISTEN,
+                       mdns: bool = True, ssdp: bool = True) -> List[Device]:
+        """hosts를 스윕하면서 listen초 동안 mDNS/SSDP를 수신
+
+        Returns: 응답한 장치 목록 (카메라로 보이는 장치가 앞쪽)
+        """
+        import asyncio
+        self._limit = asyncio.Semaphore(self.concurrency)
+        deadline = time.monotonic() + listen
+        await self._start_listeners(mdns, ssdp)
+        try:
+            await asyncio.gather(*(self._sweep_host(ip) for ip in hosts))
+            remaining = deadline - time.monotonic()
+            if (mdns or ssdp) and remaining > 0:
+                await asyncio.sleep(remaining)
+        finally:
+            for transport in self._transports:
+                transport.close()
+            self._transports = []
+        while self._pending:
+            await asyncio.gather(*list(self._pending))
+        devices = [d for d in self.devices.values() if d.alive or d.found_by - {'tcp'}]
+        return sorted(devices, key=lambda d: (not d.is_camera, ipaddress.ip_address(d.ip)))
+
+
+def subnet_hosts(subnet: str) -> List[str]:
+    network = ipaddress.ip_network(subnet, strict=False)
+    if network.num_addresses > MAX_HOSTS + 2:
+        raise ValueError(f"서브넷이 너무 큽니다 ({network.num_addresses}개 주소, 최대 {MAX_HOSTS}개)")
+    hosts = [str(ip) for ip in network.hosts()]
+    return hosts or [str(network.network_address)]
+
+
+def discover_cameras(subnet: Optional[str] = None, listen: float = DEFAULT_LISTEN,
+                     timeout: float = DEFAULT_TIMEOUT, concurrency: int = DEFAULT_CONCURRENCY,
+                     mdns: bool = True, ssdp: bool = True) -> List[Device]:
+    """서브넷 탐색 (동기 함수, 기본 서브넷은 카메라 쪽 인터페이스의 /24)"""
+    import asyncio
+    hosts = subnet_hosts(subnet or str(local_subnet()))
+    service = DiscoveryService(timeout=timeout, concurrency=concurrency)
+    return asyncio.run(service.discover(hosts, listen, mdns, ssdp))
+
+
+def resolve_camera_ip(ip: Optional[str] = None, subnet: Optional[str] = None) -> Optional[str]:
+    """사용할 카메라 IP
+
+    지정한 IP가 있으면 그대로 사용합니다. subnet을 지정하면 그 서브넷만 탐색하고,
+    없으면 기본 주소가 응답하는지 확인한 뒤 응답이 없을 때만 현재 서브넷을 탐색합니다.
+    Returns: 첫 번째 카메라 IP, 찾지 못하면 None
+    """
+    import asyncio
+    if ip:
+        return ip
+    if subnet:
+        print(f"🔍 {subnet}에서 카메라 탐색 중...")
+    elif asyncio.run(is_reachable(DEFAULT_CAMERA_IP)):
+        return DEFAULT_CAMERA_IP
+    else:
+        print(f"🔍 {DEFAULT_CAMERA_IP} 응답 없음 - 네트워크에서 카메라 탐색 중...")
+    cameras = [d for d in discover_cameras(subnet) if d.is_camera]
+    return cameras[0].ip if cameras else None
+
+
+def print_devices(devices: List[Device]):
+    print("\n" + "="*60)
+    print("📡 탐색 결과")
+    print("="*60)
+    if not devices:
+        print("\n❌ 응답한 장치가 없습니다")
+        return
+    for device in devices:
+        icon = '📷' if device.is_camera else '💻'
+        print(f"\n{icon} {device.ip}" + (" (카메라)" if device.is_camera else "")
+              + f"  [{', '.join(sorted(device.found_by))}]")
+        for port, description in sorted(device.open_ports.items()):
+            print(f"  ✅ 포트 {port:5} 열림 - {description}")
+        for name in sorted(device.names):
+            print(f"  • {name}")
+        for key, value in device.ssdp.items():
+            print(f"  • {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="네트워크의 카메라 탐색 (TCP 스윕 + mDNS + SSDP)",
+        epilog="예: python3 camera_discovery.py --subnet 192.168.2.0/24")
+    parser.add_argument('--subnet', help="탐색할 서브넷 (기본: 현재 인터페이스의 /24)")
+    parser.add_argument('--listen', type=float, default=DEFAULT_LISTEN,
+                        help=f"mDNS/SSDP 수신 시간 (초, 기본 {DEFAULT_LISTEN:g})")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f"TCP 프로브 타임아웃 (초, 기본 {DEFAULT_TIMEOUT:g})")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"동시에 여는 소켓 수 (기본 {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--no-mdns', action='store_true', help="mDNS 수신 안 함")
+    parser.add_argument('--no-ssdp', action='store_true', help="SSDP 수신 안 함")
+    parser.add_argument('--json', action='store_true', help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    subnet = args.subnet or str(local_subnet())
+    try:
+        hosts = subnet_hosts(subnet)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if not args.json:
+        print(f"🔍 {subnet} 탐색 중... ({len(hosts)}개 호스트, 포트 {len(CAMERA_PORTS)}개)")
+    import asyncio
+    start = time.monotonic()
+    service = DiscoveryService(timeout=args.timeout, concurrency=args.concurrency)
+    try:
+        devices = asyncio.run(service.discover(hosts, args.listen, not args.no_mdns, not args.no_ssdp))
+    except OSError as e:
+        if e.errno not in _FD_EXHAUSTED:
+            raise
+        print(f"❌ 파일 디스크립터가 부족합니다 - --concurrency를 줄이거나 ulimit -n을 늘리세요 ({e})")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps([d.to_dict() for d in devices], indent=2, ensure_ascii=False))
+        return
+    print_devices(devices)
+    print(f"\n⏱️ {time.monotonic() - start:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+두 캡처의 BLE 명령 스트림 비교
+우리 앱과 Phocus의 PacketLogger 캡처를 비교해 characteristic별로
+추가/누락/순서가 바뀐 write 명령을 보여줍니다.
+
+각 write 페이로드는 정수 토큰으로 바꾸고, 연속된 같은 명령은 (토큰, 횟수) 한 항목으로 묶은 뒤
+드문 명령(histogram 방식)을 기준점으로 나누고 나머지 구간은 선형 공간 Myers O(ND) 알고리즘으로
+가운데 snake를 찾아 재귀적으로 나눠 비교합니다.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from analyze_packets import BLEAnalyzer
+from command_trie import SpecError
+
+# 가운데 snake 한 번을 찾을 때 허용할 편집 거리
+# (넘으면 가장 멀리 간 지점에서 구간을 나눠 계속 비교하므로, 결과가 최소 편집이 아닐 수 있음)
+MAX_EDIT_DISTANCE = 2000
+
+# 큰 구간에서 기준점으로 쓸 토큰의 최대 출현 횟수 (더 흔한 토큰만 남은 구간은 Myers로 비교)
+MAX_ANCHOR_OCCURRENCES = 64
+
+# 보고서에 출력할 characteristic별 차이 항목 수
+REPORT_HUNKS = 30
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+class TokenStream:
+    """characteristic 하나의 write 토큰 스트림 (연속 반복은 한 항목으로 묶음)"""
+
+    def __init__(self):
+        self.tokens = array('I')
+        self.counts = array('I')
+        self.lines = array('I')     # 각 묶음의 첫 라인 번호
+        self.total = 0
+
+    def append(self, token: int, line: int):
+        self.total += 1
+        if self.tokens and self.tokens[-1] == token:
+            self.counts[-1] += 1
+        else:
+            self.tokens.append(token)
+            self.counts.append(1)
+            self.lines.append(line)
+
+
+class Vocabulary:
+    """페이로드 hex 문자열 ↔ 정수 토큰"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def token(self, value: str) -> int:
+        token = self.ids.get(value)
+        if token is None:
+            token = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return token
+
+
+def tokenize_capture(filepath: str, vocab: Vocabulary) -> Dict[str, TokenStream]:
+    """캡처 파일의 write 명령을 characteristic별 토큰 스트림으로 변환"""
+    streams = {}
+
+    def sink(record):
+        kind = record['type']
+        if kind == 'write':
+            key = record['uuid']
+        elif kind == 'data':
+            key = '(console)'
+        else:
+            return
+        stream = streams.get(key)
+        if stream is None:
+            stream = streams[key] = TokenStream()
+        stream.append(vocab.token(record['value'].strip()), record['line'])
+
+    # 레코드는 sink로만 받고 메모리에는 보관하지 않음
+    analyzer = BLEAnalyzer(sink=sink, keep=0)
+    analyzer.analyze_file(filepath)
+    return streams
+
+
+def _furthest(v, k: int, n: int, m: int) -> int:
+    """대각선 k에서 한 번 더 편집해 갈 수 있는 가장 먼 x (이웃 대각선에서 아래/오른쪽 이동, 격자 밖은 제외)"""
+    down = v[k + 1]
+    if down > n or down - k > m:
+        down = -1
+    right = v[k - 1] + 1 if v[k - 1] >= 0 else -1
+    if right > n or right - k > m:
+        right = -1
+    return down if down >= right else right
+
+
+def _middle_snake(a, alo: int, ahi: int, b, blo: int, bhi: int, max_d: int) -> Tuple[int, int, int, int]:
+    """
+    선형 공간 Myers: 최단 편집 경로의 가운데 snake (x, y, u, v)를 찾음 (a[x:u] == b[y:v])
+    양 끝에서 max_d만큼 탐색해도 만나지 않으면 앞쪽 탐색이 가장 멀리 간 지점에서 빈 snake로 나눔
+    (그 앞부분은 최단 경로지만 전체 결과는 최소가 아닐 수 있음)
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    limit = min(max_d, (n + m + 1) // 2)
+    # 대각선 k(= x - y)별로 가장 멀리 간 x (-1: 격자 안에서 도달 불가). 음수 k는 리스트 뒤쪽에 들어감
+    vf = [-1] * (2 * limit + 3)
+    vb = [-1] * (2 * limit + 3)
+    vf[1] = vb[1] = 0
+    for d in range(limit + 1):
+        for k in range(-d, d + 1, 2):
+            x = _furthest(vf, k, n, m)
+            if x < 0:
+                vf[k] = -1
+                continue
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            vf[k] = x
+            if odd and -d < delta - k < d and x + vb[delta - k] >= n:
+                return alo + x0, blo + y0, alo + x, blo + y
+        # 뒤에서부터 (뒤집은 좌표)
+        for k in range(-d, d + 1, 2):
+            x = _furthest(vb, k, n, m)
+            if x < 0:
+                vb[k] = -1
+                continue
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            vb[k] = x
+            if not odd and -d <= delta - k <= d and x + vf[delta - k] >= n:
+                return ahi - x, bhi - y, ahi - x0, bhi - y0
+
+    # 편집 거리가 max_d를 넘음: 앞쪽 경로 중 가장 멀리 간(x + y가 가장 큰) 지점
+    _, k = max((2 * vf[k] - k, k) for k in range(-limit, limit + 1, 2) if vf[k] >= 0)
+    x = vf[k]
+    return alo + x, blo + x - k, alo + x, blo + x - k
+
+
+def _anchors(a, alo: int, ahi: int, b, blo: int, bhi: int,
+             max_occurrences: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    기준점 (histogram 방식): 양쪽에 같은 횟수로 나오는 토큰 중 가장 드문 토큰들의 위치를
+    나온 순서대로 짝짓고, 순서가 유지되는 최장 부분열을 반환 (가장 드문 토큰이 한 번씩이면 patience와 같음)
+    가장 드문 토큰도 max_occurrences번보다 많이 나오면 빈 목록, 공통 토큰이 하나도 없으면 None
+    """
+    count_a = Counter(a[alo:ahi])
+    count_b = Counter(b[blo:bhi])
+    common = count_a.keys() & count_b.keys()
+    if not common:
+        return None
+    rarest = min((count_a[token] for token in common if count_a[token] == count_b[token]), default=0)
+    if not rarest or rarest > max_occurrences:
+        return []
+    pos_b = {token: [] for token in common if count_a[token] == rarest and count_b[token] == rarest}
+    for j in range(blo, bhi):
+        positions = pos_b.get(b[j])
+        if positions is not None:
+            positions.append(j)
+    seen = Counter()
+    pairs = []
+    for i in range(alo, ahi):
+        token = a[i]
+        positions = pos_b.get(token)
+        if positions is not None:
+            pairs.append((i, positions[seen[token]]))
+            seen[token] += 1
+
+    # b 위치 기준 최장 증가 부분열
+    tails = []
+    tails_idx = []
+    prev = [-1] * len(pairs)
+    for idx, (_, j) in enumerate(pairs):
+        p = bisect_left(tails, j)
+        if p == len(tails):
+            tails.append(j)
+            tails_idx.append(idx)
+        else:
+            tails[p] = j
+            tails_idx[p] = idx
+        prev[idx] = tails_idx[p - 1] if p else -1
+    result = []
+    idx = tails_idx[-1] if tails_idx else -1
+    while idx >= 0:
+        result.append(pairs[idx])
+        idx = prev[idx]
+    result.reverse()
+    return result
+
+
+def diff_tokens(a, b, max_d: int = MAX_EDIT_DISTANCE) -> List[Opcode]:
+    """
+    두 토큰 시퀀스 비교 (difflib.SequenceMatcher.get_opcodes()와 같은 형식)
+    태그: 'equal', 'delete'(a에만 있음), 'insert'(b에만 있음), 'replace'(공통 명령이 없는 구간 교체)
+    """
+    out = []
+    # 'region'은 기준점부터 찾고, 'myers'는 (기준점이 없던 구간의 하위 구간이라) 바로 가운데 snake로 나눔
+    stack = [('region', 0, len(a), 0, len(b))]
+    while stack:
+        item = stack.pop()
+        kind = item[0]
+        if kind != 'region' and kind != 'myers':
+            out.append(item)
+            continue
+        _, alo, ahi, blo, bhi = item
+
+        # 공통 앞/뒷부분
+        start_a, start_b = alo, blo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        head = ('equal', start_a, alo, start_b, blo) if alo > start_a else None
+        end_a, end_b = ahi, bhi
+        while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        tail = ('equal', ahi, end_a, bhi, end_b) if ahi < end_a else None
+
+        pending = []
+        if head:
+            pending.append(head)
+        if alo == ahi and blo == bhi:
+            pass
+        elif alo == ahi:
+            pending.append(('insert', alo, alo, blo, bhi))
+        elif blo == bhi:
+            pending.append(('delete', alo, ahi, blo, blo))
+        else:
+            anchors = []
+            if kind == 'region':
+                # 정확한 Myers로 끝나는 작은 구간은 고유 토큰만 기준점으로 사용
+                exact = (ahi - alo) + (bhi - blo) <= 2 * max_d
+                anchors = _anchors(a, alo, ahi, b, blo, bhi, 1 if exact else MAX_ANCHOR_OCCURRENCES)
+            if anchors is None:
+                pending.append(('replace', alo, ahi, blo, bhi))
+            elif anchors:
+                i0, j0 = alo, blo
+                for i, j in anchors:
+                    pending.append(('region', i0, i, j0, j))
+                    pending.append(('equal', i, i + 1, j, j + 1))
+                    i0, j0 = i + 1, j + 1
+                pending.append(('region', i0, ahi, j0, bhi))
+            else:
+                x, y, u, v = _middle_snake(a, alo, ahi, b, blo, bhi, max_d)
+                pending.append(('myers', alo, x, blo, y))
+                pending.append(('equal', x, u, y, v))
+                pending.append(('myers', u, ahi, v, bhi))
+        if tail:
+            pending.append(tail)
+        stack.extend(reversed(pending))
+
+    # 인접한 같은 태그 병합
+    merged = []
+    for op in out:
+        if op[1] == op[2] and op[3] == op[4]:
+            continue
+        if merged and merged[-1][0] == op[0] and merged[-1][2] == op[1] and merged[-1][4] == op[3]:
+            t, i1, _, j1, _ = merged[-1]
+            merged[-1] = (t, i1, op[2], j1, op[4])
+        else:
+            merged.append(op)
+    return merged
+
+
+class StreamDiff:
+    """characteristic 하나의 비교 결과"""
+
+    def __init__(self, name: str, a: TokenStream, b: TokenStream):
+        self.name = name
+        self.a = a
+        self.b = b
+        self.equal = 0
+        self.missing = 0       # A(첫 번째 캡처)에만 있는 명령 수
+        self.inserted = 0      # B(두 번째 캡처)에만 있는 명령 수
+        self.hunks = []        # [(태그, 토큰, 횟수, A 라인, B 라인)]
+        self.moved = Counter()
+
+    def compute(self, max_d: int = MAX_EDIT_DISTANCE):
+        a, b = self.a, self.b
+        missing_tokens = Counter()
+        inserted_tokens = Counter()
+        for tag, i1, i2, j1, j2 in diff_tokens(a.tokens, b.tokens, max_d):
+            if tag == 'equal':
+                for i, j in zip(range(i1, i2), range(j1, j2)):
+                    ca, cb = a.counts[i], b.counts[j]
+                    self.equal += min(ca, cb)
+                    # 같은 명령이지만 반복 횟수가 다른 경우
+                    if ca > cb:
+                        self._add('-', a.tokens[i], ca - cb, a.lines[i], b.lines[j], missing_tokens)
+                    elif cb > ca:
+                        self._add('+', b.tokens[j], cb - ca, a.lines[i], b.lines[j], inserted_tokens)
+                continue
+            if tag in ('delete', 'replace'):
+                for i in range(i1, i2):
+                    self._add('-', a.tokens[i], a.counts[i], a.lines[i], None, missing_tokens)
+            if tag in ('insert', 'replace'):
+                for j in range(j1, j2):
+                    self._add('+', b.tokens[j], b.counts[j], None, b.lines[j], inserted_tokens)
+        # 한쪽에서 빠지고 다른 위치에 추가된 명령은 순서 변경으로 표시
+        self.moved = missing_tokens & inserted_tokens
+        return self
+
+    def _add(self, tag: str, token: int, count: int, line_a, line_b, counter: Counter):
+        if tag == '-':
+            self.missing += count
+        else:
+            self.inserted += count
+        counter[token] += count
+        if len(self.hunks) < REPORT_HUNKS:
+            self.hunks.append((tag, token, count, line_a, line_b))
+
+
+def diff_captures(path_a: str, path_b: str, max_d: int = MAX_EDIT_DISTANCE):
+    """두 캡처 파일을 characteristic별로 비교"""
+    vocab = Vocabulary()
+    streams_a = tokenize_capture(path_a, vocab)
+    streams_b = tokenize_capture(path_b, vocab)
+    results = []
+    for name in sorted(set(streams_a) | set(streams_b)):
+        a = streams_a.get(name, TokenStream())
+        b = streams_b.get(name, TokenStream())
+        results.append(StreamDiff(name, a, b).compute(max_d))
+    return results, vocab
+
+
+def print_diff_report(results: List[StreamDiff], vocab: Vocabulary, path_a: str, path_b: str):
+    """비교 보고서 출력"""
+    parser = BLEAnalyzer(keep=0)
+    print("\n" + "="*60)
+    print("🔀 BLE 명령 스트림 비교")
+    print("="*60)
+    print(f"  A: {path_a}")
+    print(f"  B: {path_b}")
+
+    if not results:
+        print("\n❌ 비교할 write 명령이 없습니다")
+        return
+
+    for diff in results:
+        print(f"\n🔷 {diff.name}: A {diff.a.total}개 / B {diff.b.total}개")
+        print(f"  ✅ 일치 {diff.equal}  ➖ A에만 {diff.missing}  ➕ B에만 {diff.inserted}"
+              f"  🔀 순서 변경 {sum(diff.moved.values())}")
+        for tag, token, count, line_a, line_b in diff.hunks:
+            value = vocab.values[token]
+            name = parser.interpret_command(parser.hex_to_bytes(value))
+            where = f"A:{line_a}" if tag == '-' else f"B:{line_b}"
+            mark = '🔀' if token in diff.moved else ('➖' if tag == '-' else '➕')
+            times = f" ×{count}" if count > 1 else ""
+            print(f"    {mark} {where:<10} {value[:32]:<32} {name}{times}")
+        shown = len(diff.hunks)
+        total = diff.missing + diff.inserted
+        if shown and total > shown:
+            print(f"    ... (차이 항목 {shown}개만 표시)")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
+        print("사용법: python3 analyze_packets.py diff <캡처A> <캡처B>")
+        print("예: python3 analyze_packets.py diff our_app.log phocus.log")
+        sys.exit(1)
+
+    path_a, path_b = argv[0], argv[1]
+    try:
+        results, vocab = diff_captures(path_a, path_b)
+        print_diff_report(results, vocab, path_a, path_b)
+    except SpecError as e:
+        print(f"❌ 명령 정의 오류: {e}")
+        sys.exit(1)
+    except FileNotFoundError as e:
+        print(f"❌ 파일을 찾을 수 없습니다: {e.filename}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+압축된 캡처 파일 투명 읽기/쓰기
+.gz / .zst / .xz 캡처를 일반 파일처럼 열어 분석기에 전달합니다.
+
+압축 해제는 파서와 다른 코어에서 실행됩니다.
+  - pigz / zstd / xz 명령이 있으면 별도 프로세스로 해제 (xz는 -T0 멀티스레드)
+  - 없으면 백그라운드 스레드에서 해제 (zlib/lzma/zstd는 GIL을 풀고 동작)
+따라서 파싱과 압축 해제가 겹쳐 실행되어 원본 파일과 비슷한 속도로 분석됩니다.
+"""
+
+import errno
+import io
+import os
+import sys
+from typing import Optional
+
+# subprocess/threading/queue는 압축 파일을 열 때만 필요하므로 사용하는 곳에서 import
+# (압축하지 않은 파일만 다루는 명령의 시작 시간 단축)
+
+CHUNK_SIZE = 1024 * 1024      # 압축 해제 단위
+QUEUE_CHUNKS = 16             # 미리 해제해 둘 최대 청크 수 (메모리 상한)
+
+# 확장자 → 압축 형식
+COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+    '.xz': 'xz',
+}
+
+# 매직 넘버 → 압축 형식
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+
+# 외부 압축 해제 명령 (앞쪽 우선)
+EXTERNAL_DECOMPRESSORS = {
+    'gzip': (['pigz', '-dc'], ['gzip', '-dc']),
+    'zstd': (['zstd', '-dcq'],),
+    'xz': (['xz', '-dc', '-T0'],),
+}
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """확장자 또는 매직 넘버로 압축 형식 판별 (압축이 아니면 None)"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in COMPRESSION_SUFFIXES:
+        return COMPRESSION_SUFFIXES[suffix]
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def strip_compression_suffix(path: str) -> str:
+    """'capture.log.gz' → 'capture.log' (결과 파일 이름 생성용)"""
+    base, suffix = os.path.splitext(path)
+    if suffix.lower() in COMPRESSION_SUFFIXES:
+        return base
+    return path
+
+
+def _error_output(f) -> str:
+    """외부 명령의 stderr 임시 파일 내용 (실패 메시지용)"""
+    f.seek(0)
+    return f.read().decode(errors='ignore').strip()
+
+
+class _ProcessReader(io.RawIOBase):
+    """외부 압축 해제 프로세스의 표준 출력을 읽는 스트림
+
+    입력 파일은 여기서 열어 표준 입력으로 넘기므로 없는 파일은 FileNotFoundError가 됩니다.
+    stderr는 임시 파일로 받아 경고를 많이 출력해도 파이프가 막히지 않습니다.
+    """
+
+    def __init__(self, command, path: str):
+        import subprocess
+        import tempfile
+        self.command = command
+        with open(path, 'rb') as source:
+            self.stderr = tempfile.TemporaryFile()
+            self.proc = subprocess.Popen(command, stdin=source, stdout=subprocess.PIPE,
+                                         stderr=self.stderr, bufsize=CHUNK_SIZE)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.proc.stdout.readinto(b)
+        if n == 0 and self.proc.wait() != 0:
+            raise IOError(f"{self.command[0]} 압축 해제 실패: {_error_output(self.stderr)}")
+        return n
+
+    def close(self):
+        if not self.closed:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.stdout.close()
+            self.proc.wait()
+            self.stderr.close()
+        super().close()
+
+
+class _ThreadedReader(io.RawIOBase):
+    """백그라운드 스레드에서 압축을 해제해 큐로 넘겨주는 스트림"""
+
+    def __init__(self, source):
+        import queue
+        import threading
+        self.source = source
+        self.queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+        self.pending = memoryview(b'')
+        self.finished = False
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while not self.stop.is_set():
+                chunk = self.source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.queue.put(chunk)
+            self.queue.put(None)
+        except Exception as e:
+            self.queue.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.pending:
+            if self.finished:
+                return 0
+            item = self.queue.get()
+            if item is None:
+                self.finished = True
+                return 0
+            if isinstance(item, Exception):
+                self.finished = True
+                raise item
+            self.pending = memoryview(item)
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+    def close(self):
+        import queue
+        if not self.closed:
+            self.stop.set()
+            # 생산자가 큐에서 막혀 있으면 비워서 종료시킴
+            while self.thread.is_alive():
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    self.thread.join(0.05)
+            self.source.close()
+        super().close()
+
+
+def _open_in_process(path: str, compression: str):
+    """파이썬 모듈로 압축 스트림 열기"""
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(path, 'rb')
+    if compression == 'xz':
+        import lzma
+        return lzma.open(path, 'rb')
+    try:
+        import zstandard
+    except ImportError:
+        raise IOError("zstd 캡처를 읽으려면 zstd 명령 또는 zstandard 모듈이 필요합니다 "
+                      "(pip3 install zstandard)")
+    f = open(path, 'rb')
+    return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True, closefd=True)
+
+
+def _open_raw(path: str, compression: str, external: bool) -> io.RawIOBase:
+    import shutil
+    if external:
+        for command in EXTERNAL_DECOMPRESSORS[compression]:
+            if shutil.which(command[0]):
+                return _ProcessReader(command, path)
+    return _ThreadedReader(_open_in_process(path, compression))
+
+
+def open_capture(path: str, mode: str = 'rb', encoding: str = 'utf-8',
+                 errors: Optional[str] = None, external: bool = True):
+    """
+    캡처 파일 열기 (압축 여부 자동 판별)
+    mode는 'rb' 또는 'r'/'rt'. 압축되지 않은 파일은 내장 open()과 같습니다.
+    external=False이면 외부 명령 대신 항상 백그라운드 스레드로 해제합니다.
+    """
+    binary = 'b' in mode
+    compression = detect_compression(path)
+    if compression is None:
+        if binary:
+            return open(path, 'rb', buffering=CHUNK_SIZE)
+        return open(path, 'r', encoding=encoding, errors=errors)
+
+    # 확장자만으로 판별한 경우에도 없는 파일은 분석기가 기대하는 FileNotFoundError로
+    if not os.path.exists(path):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    buffered = io.BufferedReader(_open_raw(path, compression, external), buffer_size=CHUNK_SIZE)
+    if binary:
+        return buffered
+    return io.TextIOWrapper(buffered, encoding=encoding, errors=errors)
+
+
+class _ProcessWriter(io.RawIOBase):
+    """외부 압축 프로세스의 표준 입력으로 쓰는 스트림"""
+
+    def __init__(self, command, path: str):
+        import subprocess
+        import tempfile
+        self.command = command
+        self.stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(command + [path], stdin=subprocess.PIPE, stderr=self.stderr)
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.proc.stdin.write(b)
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            self.proc.stdin.close()
+            try:
+                if self.proc.wait() != 0:
+                    raise IOError(f"{self.command[0]} 압축 실패: {_error_output(self.stderr)}")
+            finally:
+                self.stderr.close()
+        super().close()
+
+
+def open_output(path: str, mode: str = 'w', encoding: str = 'utf-8'):
+    """
+    결과 파일 쓰기용 열기 (확장자가 .gz/.zst/.xz이면 압축해서 저장)
+    mode는 'w'/'wt' 또는 'wb'
+    """
+    binary = 'b' in mode
+    compression = COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+    if compression is None:
+        return open(path, 'wb' if binary else 'w', encoding=None if binary else encoding)
+
+    if compression == 'gzip':
+        import gzip
+        raw = gzip.open(path, 'wb', compresslevel=6)
+    elif compression == 'xz':
+        import lzma
+        raw = lzma.open(path, 'wb')
+    else:
+        try:
+            import zstandard
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+        except ImportError:
+            import shutil
+            if not shutil.which('zstd'):
+                raise IOError("zstd로 저장하려면 zstd 명령 또는 zstandard 모듈이 필요합니다 "
+                              "(pip3 install zstandard)")
+            raw = io.BufferedWriter(_ProcessWriter(['zstd', '-qf', '-T0', '-o'], path),
+                                    buffer_size=CHUNK_SIZE)
+    if binary:
+        return raw
+    return io.TextIOWrapper(raw, encoding=encoding)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("사용법: python3 capture_io.py <캡처파일[.gz|.zst|.xz]>")
+        sys.exit(1)
+
+    total = 0
+    with open_capture(sys.argv[1], 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+    print(f"📦 {sys.argv[1]}: {detect_compression(sys.argv[1]) or '압축 없음'}, {total} bytes")
+
+
+if __name__ == "__main__":
+    main()
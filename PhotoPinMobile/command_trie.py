@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+BLE 명령 해석 트라이
+protocol_commands.json 같은 명령 정의 파일을 한 번 읽어 바이트 prefix 트라이로 컴파일하고,
+페이로드를 가장 긴 prefix가 일치하는 명령으로 분류합니다.
+
+명령 정의는 가변 길이 prefix, 바이트 마스크('??' 또는 mask), 파라미터 필드를 지원합니다.
+classify_many()는 prefix별 결과를 캐시하므로 수백만 개 페이로드도 빠르게 분류합니다.
+"""
+
+import json
+import struct
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# 기본 명령 정의는 photopin_tools 패키지 데이터로 설치됨
+SPEC_PACKAGE = 'photopin_tools'
+SPEC_RESOURCE = 'protocol_commands.json'
+
+MAX_CACHE_ENTRIES = 1_000_000
+
+# 파라미터 타입 → (struct 형식, 크기)
+PARAM_TYPES = {
+    'u8': ('B', 1),
+    'u16le': ('<H', 2),
+    'u16be': ('>H', 2),
+    'u32le': ('<I', 4),
+    'u32be': ('>I', 4),
+    'i8': ('b', 1),
+    'i16le': ('<h', 2),
+    'i32le': ('<i', 4),
+}
+
+Payload = Union[bytes, bytearray, Sequence[int]]
+
+
+class SpecError(Exception):
+    """명령 정의 파일 오류"""
+
+
+class CommandDef:
+    """명령 정의 하나"""
+
+    __slots__ = ('name', 'values', 'masks', 'priority', 'order', 'params')
+
+    def __init__(self, name: str, values: bytes, masks: bytes, priority: int, order: int, params: List[Dict]):
+        self.name = name
+        self.values = values
+        self.masks = masks
+        self.priority = priority
+        self.order = order
+        self.params = params
+
+    def rank(self):
+        """일치 우선순위 (클수록 우선)"""
+        return (len(self.values), self.priority, -self.order)
+
+    def decode_params(self, payload: bytes) -> Dict[str, object]:
+        """페이로드에서 파라미터 필드 값 추출 (길이가 모자라면 생략)"""
+        result = {}
+        for param in self.params:
+            offset = param['offset']
+            kind = param['type']
+            if kind in PARAM_TYPES:
+                fmt, size = PARAM_TYPES[kind]
+                if len(payload) >= offset + size:
+                    result[param['name']] = struct.unpack_from(fmt, payload, offset)[0]
+                continue
+            length = param.get('length')
+            chunk = payload[offset:] if length is None else payload[offset:offset + length]
+            if not chunk:
+                continue
+            if kind == 'hex':
+                result[param['name']] = chunk.hex()
+            elif kind == 'utf8':
+                result[param['name']] = chunk.decode('utf-8', errors='replace')
+        return result
+
+
+class _Node:
+    __slots__ = ('exact', 'masked', 'command')
+
+    def __init__(self):
+        self.exact = {}        # 바이트 값 → 자식 노드
+        self.masked = []       # [(값, 마스크, 자식 노드)]
+        self.command = None    # 이 노드에서 끝나는 명령 중 우선순위가 가장 높은 것
+
+
+def _parse_pattern(prefix: str, mask: Optional[str]) -> Tuple[bytes, bytes]:
+    values = bytearray()
+    masks = bytearray()
+    for token in prefix.split():
+        if token == '??':
+            values.append(0)
+            masks.append(0)
+        else:
+            values.append(int(token, 16))
+            masks.append(0xFF)
+    if mask is not None:
+        explicit = bytes.fromhex(mask)
+        if len(explicit) != len(values):
+            raise SpecError(f"mask 길이가 prefix와 다릅니다: {prefix} / {mask}")
+        masks = bytearray(m & e for m, e in zip(masks, explicit))
+    values = bytearray(v & m for v, m in zip(values, masks))
+    return bytes(values), bytes(masks)
+
+
+class CommandTrie:
+    """명령 정의를 컴파일한 바이트 prefix 트라이"""
+
+    def __init__(self, commands: Iterable[CommandDef], unknown: str = "Unknown",
+                 fallback: Optional[str] = "Command 0x{first:02X}"):
+        self.root = _Node()
+        self.unknown = unknown
+        self.fallback = fallback
+        self.depth = 1         # 분류에 필요한 최대 prefix 길이
+        self.size = 0
+        self._cache = {}
+        for command in commands:
+            self._insert(command)
+
+    @classmethod
+    def from_spec(cls, spec: Dict) -> 'CommandTrie':
+        """파싱된 명령 정의(dict)로 트라이 생성"""
+        commands = []
+        for order, entry in enumerate(spec.get('commands', [])):
+            try:
+                values, masks = _parse_pattern(entry['prefix'], entry.get('mask'))
+                params = entry.get('params', [])
+                for param in params:
+                    if param['type'] not in PARAM_TYPES and param['type'] not in ('hex', 'utf8'):
+                        raise SpecError(f"알 수 없는 파라미터 타입: {param['type']}")
+                name = entry['name']
+            except (KeyError, ValueError) as e:
+                raise SpecError(f"명령 정의 {order}번 항목 오류: {e}")
+            commands.append(CommandDef(name, values, masks, entry.get('priority', 0), order, params))
+        return cls(commands, spec.get('unknown', "Unknown"), spec.get('fallback', "Command 0x{first:02X}"))
+
+    @classmethod
+    def load(cls, path: str) -> 'CommandTrie':
+        """명령 정의 파일(JSON) 읽기"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.parse(f.read(), path)
+
+    @classmethod
+    def parse(cls, text: str, source: str) -> 'CommandTrie':
+        """명령 정의 JSON 문자열 컴파일 (source는 오류 메시지용)"""
+        try:
+            spec = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise SpecError(f"{source}: {e}")
+        return cls.from_spec(spec)
+
+    def _insert(self, command: CommandDef):
+        node = self.root
+        for value, mask in zip(command.values, command.masks):
+            if mask == 0xFF:
+                child = node.exact.get(value)
+                if child is None:
+                    child = node.exact[value] = _Node()
+            else:
+                child = next((c for v, m, c in node.masked if v == value and m == mask), None)
+                if child is None:
+                    child = _Node()
+                    node.masked.append((value, mask, child))
+            node = child
+        if node.command is None or command.rank() > node.command.rank():
+            node.command = command
+        self.depth = max(self.depth, len(command.values))
+        self.size += 1
+        self._cache.clear()
+
+    def match(self, payload: Payload) -> Optional[CommandDef]:
+        """가장 긴 prefix가 일치하는 명령 (없으면 None)"""
+        key = bytes(payload[:self.depth])
+        return self._match_key(key)
+
+    def _match_key(self, key: bytes) -> Optional[CommandDef]:
+        best = None
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node.command is not None and (best is None or node.command.rank() > best.rank()):
+                best = node.command
+            if depth >= len(key):
+                continue
+            byte = key[depth]
+            child = node.exact.get(byte)
+            if child is not None:
+                stack.append((child, depth + 1))
+            for value, mask, child in node.masked:
+                if byte & mask == value:
+                    stack.append((child, depth + 1))
+        return best
+
+    def classify(self, payload: Payload) -> str:
+        """페이로드의 명령 이름"""
+        if not payload:
+            return self.unknown
+        key = bytes(payload[:self.depth])
+        name = self._cache.get(key)
+        if name is None:
+            command = self._match_key(key)
+            if command is not None:
+                name = command.name
+            elif self.fallback:
+                name = self.fallback.format(first=key[0])
+            else:
+                name = self.unknown
+            if len(self._cache) >= MAX_CACHE_ENTRIES:
+                self._cache.clear()
+            self._cache[key] = name
+        return name
+
+    def classify_many(self, payloads: Iterable[Payload]) -> List[str]:
+        """여러 페이로드를 한 번에 분류 (같은 prefix는 캐시된 결과 재사용)"""
+        classify = self.classify
+        return [classify(payload) for payload in payloads]
+
+    def describe(self, payload: Payload) -> Tuple[str, Dict[str, object]]:
+        """명령 이름과 파라미터 값"""
+        name = self.classify(payload)
+        command = self.match(payload) if payload else None
+        params = command.decode_params(bytes(payload)) if command is not None else {}
+        return name, params
+
+
+def _read_default_spec() -> str:
+    """패키지에 포함된 기본 명령 정의 읽기"""
+    from importlib import resources
+    source = f"{SPEC_PACKAGE}/{SPEC_RESOURCE}"
+    try:
+        if hasattr(resources, 'files'):
+            return resources.files(SPEC_PACKAGE).joinpath(SPEC_RESOURCE).read_text(encoding='utf-8')
+        return resources.read_text(SPEC_PACKAGE, SPEC_RESOURCE, encoding='utf-8')   # Python 3.8
+    except (ImportError, OSError) as e:
+        # 분석할 로그 파일이 없는 것과 구분되도록 SpecError로 보고
+        raise SpecError(f"기본 명령 정의를 읽을 수 없습니다: {source} ({e}) - photopin-tools를 다시 설치하세요")
+
+
+@lru_cache(maxsize=None)
+def load_command_table(path: Optional[str] = None) -> CommandTrie:
+    """명령 정의를 한 번만 읽어 컴파일 (프로세스 내 캐시, path가 없으면 패키지에 포함된 기본 정의)"""
+    if path is None:
+        return CommandTrie.parse(_read_default_spec(), f"{SPEC_PACKAGE}/{SPEC_RESOURCE}")
+    return CommandTrie.load(path)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("사용법: python3 command_trie.py <명령정의.json> [hex 페이로드 ...]")
+        print("예: python3 command_trie.py photopin_tools/protocol_commands.json 010100 0D4142")
+        sys.exit(1)
+
+    try:
+        trie = CommandTrie.load(sys.argv[1])
+    except FileNotFoundError:
+        print(f"❌ 파일을 찾을 수 없습니다: {sys.argv[1]}")
+        sys.exit(1)
+    except SpecError as e:
+        print(f"❌ 명령 정의 오류: {e}")
+        sys.exit(1)
+
+    print(f"✅ 명령 {trie.size}개 컴파일 (최대 prefix {trie.depth}바이트)")
+    for hex_payload in sys.argv[2:]:
+        payload = bytes.fromhex(hex_payload)
+        name, params = trie.describe(payload)
+        print(f"  {hex_payload}: {name}" + (f" {params}" if params else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+반복 이벤트 집계 (메모리 상한 고정)
+카메라 상태 Notify처럼 같은 페이로드가 수천 번 반복되는 캡처를 위한 도구입니다.
+
+- RunCollapser: 특성(키)별로 연속된 동일 이벤트를 하나의 구간(run)으로 합침
+  (첫/마지막 위치와 반복 횟수). 키마다 진행 중인 구간 하나만 보관합니다.
+  구간은 시작할 때(보고서 목록은 시작 순서 유지)와 끝날 때(스트리밍 출력) 각각 반환됩니다.
+- SpaceSaving: 가장 자주 나온 항목(heavy hitters)을 고정된 개수의 카운터로 추적.
+  capacity보다 많은 종류가 들어오면 가장 작은 카운터를 새 항목에 넘겨주며,
+  실제 횟수는 [count - error, count] 범위입니다 (전체 N의 1/capacity보다 자주 나온 항목은 반드시 포함).
+"""
+
+import heapq
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_CAPACITY = 256
+
+
+class RunCollapser:
+    """키별로 연속된 동일 값을 구간으로 합침
+
+    add()는 (끝난 구간, 새로 시작된 구간)을 반환하고(없으면 None), 남은 구간은 flush()로 받습니다.
+    구간 레코드는 첫 이벤트 레코드에 'count'와 'last_<field>'(마지막 이벤트의 field 값)를 더한 것이며,
+    시작 때 받은 dict는 이후 반복에 따라 제자리에서 갱신됩니다.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.last_field = f'last_{field}'
+        self.current: Dict[Hashable, Tuple[Any, Dict]] = {}
+        self.events = 0
+        self.runs = 0
+
+    def add(self, key: Hashable, value: Any, record: Dict) -> Tuple[Optional[Dict], Optional[Dict]]:
+        self.events += 1
+        current = self.current.get(key)
+        if current is not None and current[0] == value:
+            run = current[1]
+            run['count'] += 1
+            run[self.last_field] = record.get(self.field)
+            return None, None
+        self.runs += 1
+        run = {**record, 'count': 1, self.last_field: record.get(self.field)}
+        self.current[key] = (value, run)
+        return (current[1] if current is not None else None), run
+
+    def flush(self) -> List[Dict]:
+        """진행 중인 구간을 시작 위치 순서로 반환하고 비움"""
+        runs = [run for _, run in self.current.values()]
+        self.current.clear()
+        runs.sort(key=lambda run: (run.get(self.field) is None, run.get(self.field)))
+        return runs
+
+
+class SpaceSaving:
+    """Space-Saving 빈도 상위 항목 추적 (카운터 capacity개 고정)"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity는 1 이상이어야 합니다")
+        self.capacity = capacity
+        self.counters: Dict[Hashable, List[int]] = {}   # 항목 → [count, error]
+        # (count, 순번, 항목) 최소 힙. 카운터가 늘면 새 항목을 넣고 이전 것은 꺼낼 때 무시
+        self.heap: List[Tuple[int, int, Hashable]] = []
+        self.seq = 0
+        self.total = 0
+
+    def _push(self, item: Hashable, count: int):
+        self.seq += 1
+        heapq.heappush(self.heap, (count, self.seq, item))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(c, i, key) for i, (key, (c, _)) in enumerate(self.counters.items())]
+            heapq.heapify(self.heap)
+            self.seq = len(self.heap)
+
+    def add(self, item: Hashable, n: int = 1):
+        self.total += n
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += n
+            self._push(item, counter[0])
+            return
+        error = 0
+        if len(self.counters) >= self.capacity:
+            # 최신 값인 가장 작은 카운터를 찾아 새 항목에 넘김
+            while True:
+                count, _, victim = heapq.heappop(self.heap)
+                current = self.counters.get(victim)
+                if current is not None and current[0] == count:
+                    break
+            del self.counters[victim]
+            error = count
+        self.counters[item] = [error + n, error]
+        self._push(item, error + n)
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[Hashable, int, int]]:
+        """(항목, count, error) 목록을 count 내림차순으로 반환"""
+        ranked = sorted(((item, c, e) for item, (c, e) in self.counters.items()),
+                        key=lambda x: x[1], reverse=True)
+        return ranked if k is None else ranked[:k]
+
+    def __len__(self) -> int:
+        return len(self.counters)
+
+
+def format_count(count: int, error: int) -> str:
+    """보고서용 횟수 표시 (추정치면 범위)"""
+    return f"{count}회" if not error else f"{count - error}~{count}회"
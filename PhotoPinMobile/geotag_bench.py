@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+지오태깅 경로 벤치마크
+합성 GPX 트랙(1만~1000만 점)과 EXIF 촬영 시간만 담은 작은 JPEG/TIFF(RAW 대용) 폴더를 만들고
+단계별 처리 속도(초당 개수)와 최대 메모리를 측정합니다.
+
+단계:
+  gpx_parse    GPX 읽기 + 병합 트랙 구성 (gpx_track.TrackStore)
+  interpolate  사진 시간 → 위치 조회 (보간)
+  walk         폴더 탐색 (photo_pipeline.FolderWalker)
+  extract      EXIF 촬영 시간 읽기 (photo_metadata.read_capture_time)
+  write_xmp    XMP 사이드카 기록
+  pipeline     탐색 → 시간 추출 → 태깅 전체 (photo_pipeline.run_pipeline)
+
+각 단계는 새 프로세스에서 실행해 시간과 최대 RSS가 다른 단계의 영향을 받지 않게 합니다.
+결과는 JSON Lines 파일에 누적되어 `compare`로 버전 간 성능 변화를 확인할 수 있습니다.
+
+    python3 geotag_bench.py run --points 10000,1000000 --files 1000,10000 --label v1.2
+    python3 geotag_bench.py compare
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+DEFAULT_POINTS = [10_000, 100_000, 1_000_000]
+DEFAULT_FILES = [1_000, 10_000]
+DEFAULT_LOOKUPS = 100_000
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), 'photopin-bench')
+DEFAULT_RESULTS = 'bench_results.jsonl'
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.15      # 이보다 느려지면 성능 저하로 표시 (15%)
+
+TRACK_START = 1_736_200_000   # 2025-01-06T21:46:40Z
+FILES_PER_FOLDER = 500        # 카메라 폴더(100HASBL 등) 하나에 들어가는 파일 수
+RAW_PADDING = 2048            # RAW 대용 파일 크기 (EXIF 뒤에 채우는 바이트)
+JPEG_PADDING = 1024
+
+TRACK_STAGES = ('gpx_parse', 'interpolate')
+FOLDER_STAGES = ('walk', 'extract', 'write_xmp', 'pipeline')
+
+
+# ---------------------------------------------------------------- 데이터 생성
+
+def generate_gpx(path: str, points: int, seed: int = 1):
+    """1초 간격 랜덤 워크 트랙 (HDOP 포함)"""
+    rng = random.Random(seed)
+    lat, lon = 37.5665, 126.9780
+    day = None
+    with open(path + '.tmp', 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<gpx version="1.1" creator="geotag_bench" xmlns="http://www.topografix.com/GPX/1/1">\n'
+                '<trk><trkseg>\n')
+        lines = []
+        for i in range(points):
+            t = TRACK_START + i
+            if day is None or t >= day_end:
+                day = datetime.fromtimestamp(t - t % 86400, timezone.utc).strftime('%Y-%m-%dT')
+                day_end = t - t % 86400 + 86400
+            s = t % 86400
+            lat += rng.uniform(-5e-5, 5e-5)
+            lon += rng.uniform(-5e-5, 5e-5)
+            lines.append(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><ele>{20 + i % 50}</ele>'
+                         f'<time>{day}{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}Z</time>'
+                         f'<hdop>{1 + i % 3 * 0.5:.1f}</hdop></trkpt>\n')
+            if len(lines) >= 10_000:
+                f.writelines(lines)
+                lines.clear()
+        f.writelines(lines)
+        f.write('</trkseg></trk>\n</gpx>\n')
+    os.replace(path + '.tmp', path)
+
+
+def generate_photos(folder: str, files: int, track_seconds: int):
+    """카메라 폴더 구조의 JPEG/3FR 대용 파일 (촬영 시간은 트랙 구간에 고르게 분포)"""
+    from photo_metadata import build_exif_jpeg, build_exif_tiff
+
+    tmp = folder + '.tmp'
+    step = max(track_seconds - 1, 1) / max(files, 1)
+    for i in range(files):
+        subdir = os.path.join(tmp, 'DCIM', f'{100 + i // FILES_PER_FOLDER}HASBL')
+        if i % FILES_PER_FOLDER == 0:
+            os.makedirs(subdir, exist_ok=True)
+        stamp = datetime.fromtimestamp(TRACK_START + i * step, timezone.utc)
+        exif_time = stamp.strftime('%Y:%m:%d %H:%M:%S')
+        if i % 2:
+            name, data = f'B{i:07d}.3FR', build_exif_tiff(exif_time, offset='+00:00', padding=RAW_PADDING)
+        else:
+            name, data = f'B{i:07d}.JPG', build_exif_jpeg(exif_time, offset='+00:00', padding=JPEG_PADDING)
+        with open(os.path.join(subdir, name), 'wb') as f:
+            f.write(data)
+    os.replace(tmp, folder)
+
+
+def prepare_data(workdir: str, points: List[int], files: List[int]) -> Dict[str, str]:
+    """필요한 합성 데이터를 만들거나 기존 것을 재사용"""
+    os.makedirs(workdir, exist_ok=True)
+    paths = {}
+    for n in points:
+        path = os.path.join(workdir, f'track_{n}.gpx')
+        if not os.path.exists(path):
+            print(f"  🛠️ GPX {n:,}점 생성 중...")
+            generate_gpx(path, n)
+        paths[f'track_{n}'] = path
+    # 사진 촬영 시간은 가장 짧은 트랙 구간 안에 들어가도록 분포
+    track_seconds = min(points) if points else 3600
+    for n in files:
+        path = os.path.join(workdir, f'photos_{n}_{track_seconds}')
+        if not os.path.exists(path):
+            print(f"  🛠️ 사진 {n:,}개 생성 중...")
+            generate_photos(path, n, track_seconds)
+        paths[f'photos_{n}'] = path
+    paths['track_seconds'] = track_seconds
+    return paths
+
+
+# ---------------------------------------------------------------- 단계
+
+def _photo_paths(folder: str) -> List[str]:
+    paths = []
+    for root, _, names in os.walk(folder):
+        paths.extend(os.path.join(root, name) for name in names if not name.endswith('.xmp'))
+    return paths
+
+
+def _remove_sidecars(folder: str):
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if name.endswith('.xmp'):
+                os.remove(os.path.join(root, name))
+
+
+def stage_gpx_parse(gpx: str, **_) -> Dict:
+    from gpx_track import TrackStore
+    start = time.perf_counter()
+    store = TrackStore.from_files([gpx])
+    return {'items': store.read, 'seconds': time.perf_counter() - start}
+
+
+def stage_interpolate(gpx: str, lookups: int = DEFAULT_LOOKUPS, **_) -> Dict:
+    from gpx_track import TrackStore
+    store = TrackStore.from_files([gpx])
+    rng = random.Random(2)
+    span = store.end - store.start
+    times = [store.start + rng.random() * span for _ in range(lookups)]
+    lookup = store.lookup
+    start = time.perf_counter()
+    found = sum(1 for t in times if lookup(t) is not None)
+    seconds = time.perf_counter() - start
+    if found != lookups:
+        raise RuntimeError(f"보간 실패: {lookups - found}개")
+    return {'items': lookups, 'seconds': seconds}
+
+
+def stage_walk(folder: str, **_) -> Dict:
+    import queue
+    from photo_pipeline import _DONE, FolderWalker, PipelineStats
+
+    found = queue.Queue(maxsize=1024)
+    start = time.perf_counter()
+    walker = FolderWalker([folder], found, PipelineStats(), skip_existing=False)
+    walker.start()
+    items = 0
+    while found.get() is not _DONE:
+        items += 1
+    return {'items': items, 'seconds': time.perf_counter() - start}
+
+
+def stage_extract(folder: str, **_) -> Dict:
+    from photo_metadata import read_capture_time
+
+    paths = _photo_paths(folder)
+    start = time.perf_counter()
+    missing = sum(1 for path in paths if read_capture_time(path, timezone.utc) is None)
+    seconds = time.perf_counter() - start
+    if missing:
+        raise RuntimeError(f"촬영 시간 읽기 실패: {missing}개")
+    return {'items': len(paths), 'seconds': seconds}
+
+
+def stage_write_xmp(folder: str, **_) -> Dict:
+    from photo_metadata import write_xmp_sidecar
+
+    paths = _photo_paths(folder)
+    _remove_sidecars(folder)
+    start = time.perf_counter()
+    for i, path in enumerate(paths):
+        write_xmp_sidecar(path, 37.5 + i * 1e-6, 127.0, 12.0, TRACK_START + i, overwrite=True)
+    seconds = time.perf_counter() - start
+    _remove_sidecars(folder)
+    return {'items': len(paths), 'seconds': seconds}
+
+
+def stage_pipeline(folder: str, gpx: str, **_) -> Dict:
+    from gpx_track import TrackStore
+    from photo_pipeline import run_pipeline
+
+    store = TrackStore.from_files([gpx])
+    _remove_sidecars(folder)
+    start = time.perf_counter()
+    stats = run_pipeline([folder], store.lookup, timezone.utc, progress=False)
+    seconds = time.perf_counter() - start
+    _remove_sidecars(folder)
+    if stats['tagged'] != stats['found']:
+        raise RuntimeError(f"태깅 누락: {stats['found'] - stats['tagged']}개")
+    return {'items': stats['tagged'], 'seconds': seconds}
+
+
+STAGES = {
+    'gpx_parse': stage_gpx_parse,
+    'interpolate': stage_interpolate,
+    'walk': stage_walk,
+    'extract': stage_extract,
+    'write_xmp': stage_write_xmp,
+    'pipeline': stage_pipeline,
+}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_stage_child(name: str, params: Dict) -> Dict:
+    """단계를 새 프로세스에서 실행 (시간과 최대 RSS 측정)"""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '_stage', name, json.dumps(params)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "실패")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _stage_main(name: str, params: str):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    result = STAGES[name](**json.loads(params))
+    result['peak_mb'] = _peak_rss_mb()
+    print(json.dumps(result))
+
+
+# ---------------------------------------------------------------- 결과 저장/비교
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def load_runs(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(path: str, run: Dict):
+    with open(path, 'a') as f:
+        f.write(json.dumps(run, ensure_ascii=False) + '\n')
+
+
+def _key(result: Dict) -> str:
+    return f"{result['stage']}/{result['size']}"
+
+
+def compare_runs(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """같은 단계/크기 결과의 처리 속도 변화 (rate가 threshold 이상 떨어지면 regression)"""
+    before = {_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = before.get(_key(result))
+        if old is None or not old['rate']:
+            continue
+        change = result['rate'] / old['rate'] - 1
+        rows.append({'key': _key(result), 'before': old['rate'], 'after': result['rate'],
+                     'change': change, 'regression': change < -threshold,
+                     'peak_before': old.get('peak_mb'), 'peak_after': result.get('peak_mb')})
+    return rows
+
+
+def print_results(results: List[Dict]):
+    print(f"\n  {'단계':<12} {'크기':>12} {'개수':>12} {'시간(초)':>9} {'초당 처리':>14} {'최대 RSS':>10}")
+    print("  " + "-" * 74)
+    for r in results:
+        peak = f"{r['peak_mb']:.0f}MB" if r.get('peak_mb') else '-'
+        print(f"  {r['stage']:<12} {r['size']:>12,} {r['items']:>12,} {r['seconds']:>9.3f} "
+              f"{r['rate']:>14,.0f} {peak:>10}")
+
+
+def print_comparison(rows: List[Dict], baseline: Dict, current: Dict) -> bool:
+    print(f"\n📈 비교: {baseline.get('label') or baseline['time']} → {current.get('label') or current['time']}")
+    regressions = 0
+    for row in rows:
+        mark = "⚠️" if row['regression'] else ("✅" if row['change'] > 0 else "  ")
+        regressions += row['regression']
+        print(f"  {mark} {row['key']:<24} {row['before']:>14,.0f} → {row['after']:>14,.0f}/초 "
+              f"({row['change'] * 100:+.1f}%)")
+    if not rows:
+        print("  비교할 공통 항목이 없습니다")
+    elif regressions:
+        print(f"\n⚠️ 성능 저하 {regressions}개")
+    else:
+        print("\n✅ 성능 저하 없음")
+    return regressions > 0
+
+
+def _parse_sizes(value: str) -> List[int]:
+    return [int(float(v)) for v in value.replace('_', '').split(',') if v]
+
+
+def cmd_run(args):
+    stages = args.stages.split(',') if args.stages else list(STAGES)
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        print(f"❌ 알 수 없는 단계: {', '.join(unknown)} (가능: {', '.join(STAGES)})")
+        sys.exit(1)
+
+    print("="*60)
+    print("⏱️ 지오태깅 벤치마크")
+    print("="*60)
+    print(f"📁 데이터: {args.workdir}")
+    data = prepare_data(args.workdir, args.points, args.files)
+    pipeline_track = data[f'track_{min(args.points)}']
+
+    results = []
+    jobs = []
+    for stage in stages:
+        if stage in TRACK_STAGES:
+            jobs += [(stage, n, {'gpx': data[f'track_{n}'], 'lookups': args.lookups}) for n in args.points]
+        else:
+            jobs += [(stage, n, {'folder': data[f'photos_{n}'], 'gpx': pipeline_track}) for n in args.files]
+    for stage, size, params in jobs:
+        if stage != 'interpolate':
+            params.pop('lookups', None)
+        print(f"  ▶ {stage} ({size:,})...", flush=True)
+        try:
+            # 반복 실행 중 가장 빠른 시간 (다른 프로세스/디스크 캐시 영향 최소화)
+            runs = [run_stage_child(stage, params) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"    ❌ 실패: {e}")
+            continue
+        result = min(runs, key=lambda r: r['seconds'])
+        result.update(stage=stage, size=size,
+                      rate=result['items'] / result['seconds'] if result['seconds'] else 0.0)
+        results.append(result)
+
+    print_results(results)
+
+    run = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    previous = load_runs(args.results)
+    save_run(args.results, run)
+    print(f"\n💾 결과 저장: {args.results}")
+
+    if previous:
+        rows = compare_runs(previous[-1], run, args.threshold)
+        if print_comparison(rows, previous[-1], run) and args.fail_on_regression:
+            sys.exit(1)
+
+
+def cmd_compare(args):
+    runs = load_runs(args.results)
+    if len(runs) < 2:
+        print(f"⚠️ 비교하려면 결과가 2개 이상 필요합니다: {args.results}")
+        return
+    current = runs[-1]
+    baseline = runs[-2]
+    if args.baseline:
+        matches = [r for r in runs[:-1] if r.get('label') == args.baseline or r.get('git') == args.baseline]
+        if not matches:
+            print(f"❌ 기준 결과를 찾을 수 없습니다: {args.baseline}")
+            sys.exit(1)
+        baseline = matches[-1]
+    rows = compare_runs(baseline, current, args.threshold)
+    if print_comparison(rows, baseline, current) and args.fail_on_regression:
+        sys.exit(1)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '_stage':
+        _stage_main(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="지오태깅 단계별 처리 속도/메모리 벤치마크",
+        epilog="예: python3 geotag_bench.py run --points 10000,10000000 --files 100000 --label v1.3\n"
+               "    python3 geotag_bench.py compare --baseline v1.2",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="벤치마크 실행 후 결과 저장 (직전 결과와 비교)")
+    run.add_argument('--points', type=_parse_sizes, default=DEFAULT_POINTS,
+                     help="GPX 점 수 목록 (기본 10000,100000,1000000, 최대 10000000 권장)")
+    run.add_argument('--files', type=_parse_sizes, default=DEFAULT_FILES,
+                     help="사진 파일 수 목록 (기본 1000,10000)")
+    run.add_argument('--lookups', type=int, default=DEFAULT_LOOKUPS,
+                     help=f"interpolate 단계 조회 횟수 (기본 {DEFAULT_LOOKUPS})")
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                     help=f"단계별 반복 횟수, 가장 빠른 결과 사용 (기본 {DEFAULT_REPEAT})")
+    run.add_argument('--stages', help=f"실행할 단계 (쉼표 구분, 기본 전체: {','.join(STAGES)})")
+    run.add_argument('--workdir', default=DEFAULT_WORKDIR, help="합성 데이터 폴더 (재사용됨)")
+    run.add_argument('--label', help="결과 이름 (예: 버전)")
+
+    compare = sub.add_parser('compare', help="저장된 마지막 결과를 이전 결과와 비교")
+    compare.add_argument('--baseline', help="비교 기준 label 또는 git 리비전 (기본: 직전 결과)")
+
+    for p in (run, compare):
+        p.add_argument('--results', default=DEFAULT_RESULTS, help=f"결과 파일 (기본 {DEFAULT_RESULTS})")
+        p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                       help=f"성능 저하로 볼 처리 속도 감소 비율 (기본 {DEFAULT_THRESHOLD})")
+        p.add_argument('--fail-on-regression', action='store_true', help="성능 저하가 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        if not args.points or not args.files:
+            parser.error("--points와 --files에 하나 이상의 크기가 필요합니다")
+        if args.repeat < 1:
+            parser.error("--repeat는 1 이상이어야 합니다")
+        cmd_run(args)
+    else:
+        cmd_compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+여러 GPX 트랙 통합 저장소
+GPS 로거 여러 대와 휴대폰 트랙을 하나의 시간순 트랙으로 합치고 사진 시간의 위치를 찾습니다.
+
+- 각 GPX 파일은 expat으로 스트리밍해서 읽고 (.gpx.gz 등 압축 파일 지원)
+  heap 기반 k-way 병합으로 시간순으로 합칩니다.
+- 같은 시간대를 여러 로거가 기록했으면 정확도(accuracy 또는 HDOP)로 정리합니다: 더 정확한 로거가
+  덮는 구간(연속한 두 점 간격이 보간 한도 이내)에서는 덜 정확한 로거의 점을 버리므로
+  기록 주기가 다른 로거가 섞여도 트랙이 지그재그가 되지 않습니다.
+- 점은 시간/위도/경도 배열로 보관하고 이진 탐색으로 위치를 찾습니다 (사진 1장당 O(log n)).
+- 점 사이 간격이 보간 한도(--max-interp)를 넘으면 공백 구간으로 보고,
+  공백 안이나 트랙 밖의 사진은 가장 가까운 점에서 외삽 한도(--max-extrap) 안일 때만 위치를 줍니다.
+
+한도 기본값은 PhotoPin 앱의 exiftool 설정(GeoMaxIntSecs / GeoMaxExtSecs)과 같습니다.
+"""
+
+import argparse
+import heapq
+import math
+import sys
+from array import array
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from xml.parsers import expat
+
+from capture_io import CHUNK_SIZE, open_capture, open_output
+
+DEFAULT_MAX_INTERPOLATION = 1800.0   # 초 (앱 기본값과 동일)
+DEFAULT_MAX_EXTRAPOLATION = 18000.0  # 초
+DEFAULT_OVERLAP = 1.0                # 이 시간 안의 다른 로거 점은 같은 위치를 두고 경쟁 (점 하나도 구간으로 봄)
+UERE = 5.0                           # HDOP → 오차(m) 환산 계수
+UNKNOWN_ERROR = 30.0                 # 정확도 정보가 없는 점의 오차(m)
+
+# 소스 안에서 시간이 조금씩 뒤섞여 있어도 바로잡을 수 있는 버퍼 크기
+REORDER_WINDOW = 1024
+
+_POINT_TAGS = {'trkpt', 'rtept'}
+# 로거/앱 확장 필드 중 수평 정확도(m)로 쓰는 태그
+_ACCURACY_TAGS = {'accuracy', 'hacc', 'horizontalaccuracy', 'horizontal_accuracy'}
+
+# 병합 스트림의 점: (시간, 오차, 위도, 경도, 고도, 소스 번호, 오차가 파일/--accuracy 값인지)
+Point = Tuple[float, float, float, float, float, int, bool]
+
+
+class Fix(NamedTuple):
+    """사진 시간에 대한 위치"""
+    lat: float
+    lon: float
+    ele: Optional[float]
+    error: float          # 추정 오차 (m)
+    source: str           # 점을 기록한 GPX 파일
+    kind: str             # 'exact' | 'interpolated' | 'extrapolated'
+    offset: float         # 가장 가까운 점과의 시간 차 (초)
+
+
+def parse_gpx_time(text: str) -> float:
+    """GPX <time> (ISO 8601, 시간대 없으면 UTC) → epoch 초
+
+    Python 3.11 이전의 fromisoformat은 소수 초가 3자리나 6자리일 때만, 시간대는 +HH:MM
+    형식만 받으므로 소수 초를 6자리로 맞추고 +HHMM에는 ':'를 넣습니다.
+    """
+    text = text.strip()
+    if text[-1:] in ('Z', 'z'):
+        text = text[:-1] + '+00:00'
+    elif len(text) > 5 and text[-5] in '+-' and text[-4:].isdigit():
+        text = text[:-2] + ':' + text[-2:]
+    dot = text.find('.')
+    if dot != -1:
+        end = dot + 1
+        while end < len(text) and text[end].isdigit():
+            end += 1
+        if end - dot - 1 != 6:
+            text = text[:dot + 1] + (text[dot + 1:end] + '000000')[:6] + text[end:]
+    dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class _GPXHandler:
+    """expat 이벤트로 트랙 점을 모으는 핸들러 (트리를 만들지 않음)"""
+
+    def __init__(self, source: int, accuracy: Optional[float],
+                 on_invalid: Optional[Callable[[], None]] = None):
+        self.source = source
+        self.accuracy = accuracy
+        self.on_invalid = on_invalid
+        self.points: List[Point] = []
+        self.in_point = False
+        self.invalid = False
+        self.text: List[str] = []
+
+    def start(self, name: str, attrs: Dict[str, str]):
+        if ':' in name:
+            name = name.rpartition(':')[2]
+        if name in _POINT_TAGS:
+            self.in_point = True
+            try:
+                self.lat = float(attrs['lat'])
+                self.lon = float(attrs['lon'])
+                self.invalid = False
+            except (KeyError, ValueError):
+                self.invalid = True
+            self.t = None
+            self.ele = math.nan
+            self.error = self.accuracy
+        self.text.clear()
+
+    def data(self, text: str):
+        if self.in_point:
+            self.text.append(text)
+
+    def end(self, name: str):
+        if not self.in_point:
+            return
+        if ':' in name:
+            name = name.rpartition(':')[2]
+        if name in _POINT_TAGS:
+            self.in_point = False
+            if self.invalid:
+                # 좌표나 시간 형식이 잘못된 점은 건너뛰고 개수만 셈 (병합 전체를 중단하지 않음)
+                if self.on_invalid:
+                    self.on_invalid()
+            elif self.t is not None:
+                if self.error is None:
+                    self.points.append((self.t, UNKNOWN_ERROR, self.lat, self.lon, self.ele, self.source, False))
+                else:
+                    self.points.append((self.t, self.error, self.lat, self.lon, self.ele, self.source, True))
+            return
+        text = ''.join(self.text)
+        if not text:
+            return
+        try:
+            if name == 'time':
+                self.t = parse_gpx_time(text)
+            elif name == 'ele':
+                self.ele = float(text)
+            elif self.error is None:
+                lname = name.lower()
+                if lname == 'hdop':
+                    self.error = float(text) * UERE
+                elif lname in _ACCURACY_TAGS:
+                    self.error = float(text)
+        except ValueError:
+            # 시간이 잘못되면 점을 버리고, 고도/정확도가 잘못되면 그 값만 무시
+            if name == 'time':
+                self.invalid = True
+
+
+def iter_gpx(path: str, source: int = 0, accuracy: Optional[float] = None,
+             on_invalid: Optional[Callable[[], None]] = None) -> Iterator[Point]:
+    """GPX 파일의 트랙/경로 점을 파일 순서대로 반환 (시간 없는 점은 건너뜀)
+
+    accuracy를 주면 파일 안의 정확도 정보 대신 이 값(m)을 모든 점의 오차로 사용합니다.
+    좌표나 시간 형식이 잘못된 점은 건너뛰고 on_invalid()를 호출합니다.
+    """
+    handler = _GPXHandler(source, accuracy, on_invalid)
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.data
+
+    points = handler.points
+    with open_capture(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            yield from points
+            points.clear()
+            if not chunk:
+                break
+
+
+def _reorder(points: Iterator[Point], window: int = REORDER_WINDOW) -> Iterator[Point]:
+    """약간 뒤섞인 점을 고정 크기 heap으로 정렬 (window 이상 떨어진 역전은 보정하지 않음)"""
+    heap = []
+    for point in points:
+        heapq.heappush(heap, point)
+        if len(heap) > window:
+            yield heapq.heappop(heap)
+    while heap:
+        yield heapq.heappop(heap)
+
+
+class TrackStore:
+    """시간순으로 병합된 트랙과 시간 → 위치 조회"""
+
+    def __init__(self, max_interpolation: float = DEFAULT_MAX_INTERPOLATION,
+                 max_extrapolation: float = DEFAULT_MAX_EXTRAPOLATION,
+                 overlap: float = DEFAULT_OVERLAP):
+        self.max_interpolation = max_interpolation
+        self.max_extrapolation = max_extrapolation
+        self.overlap = overlap
+
+        self.times = array('d')
+        self.lats = array('d')
+        self.lons = array('d')
+        self.eles = array('d')
+        self.errors = array('d')
+        self.sources = array('H')
+        # 오차가 파일(HDOP/accuracy)이나 --accuracy에서 온 점이면 1 (아니면 UNKNOWN_ERROR 추정값)
+        self.measured = array('B')
+        self.source_names: List[str] = []
+        # 공백 구간으로 나뉜 세그먼트의 시작 인덱스
+        self.segments = array('L')
+
+        self.read = 0          # 읽은 점 수
+        self.replaced = 0      # 겹치는 구간에서 더 정확한 점으로 교체/제외된 점 수
+        self.out_of_order = 0  # 재정렬 버퍼로도 맞추지 못해 버린 점 수
+        self.invalid = 0       # 좌표/시간 형식 오류로 건너뛴 점 수
+
+    @classmethod
+    def from_files(cls, paths: Sequence[str], accuracy: Optional[Dict[str, float]] = None,
+                   **options) -> 'TrackStore':
+        """GPX 파일 여러 개를 스트리밍으로 읽어 병합"""
+        store = cls(**options)
+        accuracy = accuracy or {}
+        store.source_names = list(paths)
+        streams = [_reorder(iter_gpx(path, i, accuracy.get(path), store._count_invalid))
+                   for i, path in enumerate(paths)]
+        store.build(heapq.merge(*streams))
+        return store
+
+    def _count_invalid(self):
+        self.invalid += 1
+
+    def build(self, points: Iterator[Point]):
+        """시간순 점 스트림으로 트랙 구성 (겹침 해소 + 세그먼트 분할)
+
+        로거마다 연속한 두 점 사이(간격이 보간 한도 이내)를 그 로거가 덮는 구간으로 보고,
+        구간의 오차는 두 끝점 중 큰 값입니다. 다른 로거의 점이 더 정확한 구간 안에 있거나
+        더 정확한 점과 overlap초 안이면 버립니다. 점은 보간 한도만큼 늦게 확정되므로
+        그동안만 대기열에 두고, 나머지는 스트리밍으로 처리합니다.
+        """
+        overlap = self.overlap
+        max_interpolation = self.max_interpolation
+        horizon = max_interpolation + overlap
+        pending = deque()     # [시간, 오차, 소스, 남길지, 점] - 아직 확정되지 않은 점
+        last: Dict[int, Point] = {}   # 소스별 마지막 점
+        last_t = -math.inf
+        append = self._append
+
+        for point in points:
+            self.read += 1
+            t = point[0]
+            error = point[1]
+            source = point[5]
+            if t < last_t:
+                self.out_of_order += 1
+                continue
+            last_t = t
+
+            keep = True
+            previous = last.get(source)
+            if len(last) > (previous is not None):
+                for other, p in last.items():
+                    # 다른 로거의 점과 거의 같은 시간: 정확도가 같으면 먼저 온 점을 남김
+                    if other != source and t - p[0] < overlap and p[1] <= error:
+                        keep = False
+                        break
+                # 이 점과 이 로거의 이전 점 사이 구간 안에서 덜 정확한 다른 로거의 점을 버림
+                lo = t - overlap
+                start, covered = t, math.inf
+                if previous is not None and t - previous[0] <= max_interpolation:
+                    start = previous[0]
+                    covered = previous[1] if previous[1] > error else error
+                    if start < lo:
+                        lo = start
+                for entry in reversed(pending):
+                    pt = entry[0]
+                    if pt < lo:
+                        break
+                    if entry[3] and entry[2] != source and (
+                            (entry[1] > error and t - pt < overlap) or (entry[1] > covered and pt > start)):
+                        entry[3] = False
+            last[source] = point
+            pending.append([t, error, source, keep, point])
+
+            while pending[0][0] < t - horizon:
+                append(pending.popleft())
+        while pending:
+            append(pending.popleft())
+
+        self._build_segments()
+
+    def _append(self, entry: list):
+        if not entry[3]:
+            self.replaced += 1
+            return
+        t, error, lat, lon, ele, source, known = entry[4]
+        self.times.append(t)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.eles.append(ele)
+        self.errors.append(error)
+        self.sources.append(source)
+        self.measured.append(known)
+
+    def _build_segments(self):
+        times = self.times
+        limit = self.max_interpolation
+        self.segments = array('L', [0] if len(times) else [])
+        for i in range(1, len(times)):
+            if times[i] - times[i - 1] > limit:
+                self.segments.append(i)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def start(self) -> Optional[float]:
+        return self.times[0] if self.times else None
+
+    @property
+    def end(self) -> Optional[float]:
+        return self.times[-1] if self.times else None
+
+    def gaps(self) -> List[Tuple[float, float]]:
+        """보간 한도보다 긴 공백 구간 (시작, 끝) 목록"""
+        return [(self.times[i - 1], self.times[i]) for i in self.segments[1:]]
+
+    def segment_of(self, t: float) -> Optional[int]:
+        """시간이 속한 세그먼트 번호 (트랙 범위 밖이거나 공백 구간이면 None)"""
+        times = self.times
+        i = bisect_right(times, t)
+        if i == 0:
+            return None
+        if t != times[i - 1] and (i == len(times) or times[i] - times[i - 1] > self.max_interpolation):
+            return None
+        return bisect_right(self.segments, i - 1) - 1
+
+    def _fix(self, i: int, kind: str, offset: float) -> Fix:
+        ele = self.eles[i]
+        return Fix(self.lats[i], self.lons[i], None if math.isnan(ele) else ele,
+                   self.errors[i], self.source_names[self.sources[i]] if self.source_names else '',
+                   kind, offset)
+
+    def lookup(self, t: float) -> Optional[Fix]:
+        """epoch 초 시간의 위치 (한도를 벗어나면 None)"""
+        times = self.times
+        n = len(times)
+        if not n:
+            return None
+        i = bisect_right(times, t)
+
+        if i and times[i - 1] == t:
+            return self._fix(i - 1, 'exact', 0.0)
+
+        if 0 < i < n:
+            t0, t1 = times[i - 1], times[i]
+            if t1 - t0 <= self.max_interpolation:
+                r = (t - t0) / (t1 - t0)
+                lon0, lon1 = self.lons[i - 1], self.lons[i]
+                if abs(lon1 - lon0) > 180:  # 날짜 변경선을 넘는 구간
+                    lon1 += 360 if lon1 < lon0 else -360
+                lon = lon0 + (lon1 - lon0) * r
+                if lon > 180:
+                    lon -= 360
+                elif lon < -180:
+                    lon += 360
+                e0, e1 = self.eles[i - 1], self.eles[i]
+                ele = None if math.isnan(e0) or math.isnan(e1) else e0 + (e1 - e0) * r
+                nearest = i - 1 if r <= 0.5 else i
+                return Fix(self.lats[i - 1] + (self.lats[i] - self.lats[i - 1]) * r, lon, ele,
+                           max(self.errors[i - 1], self.errors[i]),
+                           self.source_names[self.sources[nearest]] if self.source_names else '',
+                           'interpolated', min(t - t0, t1 - t))
+
+        # 트랙 밖이거나 공백 구간: 가장 가까운 점으로 외삽
+        before = t - times[i - 1] if i else math.inf
+        after = times[i] - t if i < n else math.inf
+        j, offset = (i - 1, before) if before <= after else (i, after)
+        if offset > self.max_extrapolation:
+            return None
+        return self._fix(j, 'extrapolated', offset)
+
+    def source_counts(self) -> Dict[str, int]:
+        """소스별 남은 점 수"""
+        counts = [0] * len(self.source_names)
+        for source in self.sources:
+            counts[source] += 1
+        return dict(zip(self.source_names, counts))
+
+    def write_gpx(self, path: str):
+        """병합된 트랙을 GPX로 저장 (세그먼트마다 <trkseg>, 앱/exiftool -geotag에 그대로 사용)
+
+        <hdop>는 정확도 정보가 있던 점에만 기록합니다 (추정 오차로 HDOP를 만들지 않음).
+        """
+        bounds = list(self.segments) + [len(self.times)]
+        with open_output(path, 'w') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<gpx version="1.1" creator="PhotoPin gpx_track.py" '
+                    'xmlns="http://www.topografix.com/GPX/1/1">\n<trk><name>merged</name>\n')
+            for start, end in zip(bounds, bounds[1:]):
+                f.write('<trkseg>\n')
+                for i in range(start, end):
+                    time = datetime.fromtimestamp(self.times[i], timezone.utc).isoformat(
+                        timespec='milliseconds').replace('+00:00', 'Z')
+                    ele = self.eles[i]
+                    hdop = f'<hdop>{self.errors[i] / UERE:.1f}</hdop>' if self.measured[i] else ''
+                    f.write(f'<trkpt lat="{self.lats[i]:.7f}" lon="{self.lons[i]:.7f}">'
+                            + ('' if math.isnan(ele) else f'<ele>{ele:.1f}</ele>')
+                            + f'<time>{time}</time>{hdop}</trkpt>\n')
+                f.write('</trkseg>\n')
+            f.write('</trk>\n</gpx>\n')
+
+
+def _parse_accuracy(values: Optional[List[str]]) -> Dict[str, float]:
+    result = {}
+    for value in values or []:
+        path, sep, meters = value.rpartition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"FILE=METERS 형식이어야 합니다: {value}")
+        result[path] = float(meters)
+    return result
+
+
+def _format_time(t: float) -> str:
+    return datetime.fromtimestamp(t).isoformat(timespec='seconds')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="여러 GPX 트랙 병합 및 사진 시간 위치 조회",
+        epilog="예: python3 gpx_track.py logger1.gpx logger2.gpx phone.gpx -o merged.gpx "
+               "--lookup 2025-01-07T10:15:30 --tz +09:00")
+    parser.add_argument('gpx', nargs='+', help="GPX 파일 (.gz/.zst/.xz 압축 파일 지원)")
+    parser.add_argument('--max-interp', type=float, default=DEFAULT_MAX_INTERPOLATION,
+                        help=f"보간 최대 간격 (초, 기본 {DEFAULT_MAX_INTERPOLATION:g})")
+    parser.add_argument('--max-extrap', type=float, default=DEFAULT_MAX_EXTRAPOLATION,
+                        help=f"외삽 최대 시간 (초, 기본 {DEFAULT_MAX_EXTRAPOLATION:g})")
+    parser.add_argument('--overlap', type=float, default=DEFAULT_OVERLAP,
+                        help=f"다른 로거의 점을 겹침으로 볼 시간 (초, 기본 {DEFAULT_OVERLAP:g})")
+    parser.add_argument('--accuracy', action='append', metavar='FILE=METERS',
+                        help="파일의 정확도 지정 (정확도 정보가 없는 휴대폰 트랙 등)")
+    parser.add_argument('--lookup', action='append', default=[], metavar='TIME',
+                        help="위치를 찾을 시간 (ISO 8601, 여러 번 지정 가능)")
+    parser.add_argument('--tz', help="시간대가 없는 --lookup 시간의 시간대 (예: +09:00, 기본: 시스템)")
+    parser.add_argument('-o', '--output', metavar='FILE', help="병합된 트랙을 GPX로 저장")
+    args = parser.parse_args()
+
+    try:
+        accuracy = _parse_accuracy(args.accuracy)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    print(f"📖 GPX {len(args.gpx)}개 병합 중...")
+    try:
+        store = TrackStore.from_files(args.gpx, accuracy, max_interpolation=args.max_interp,
+                                      max_extrapolation=args.max_extrap, overlap=args.overlap)
+    except FileNotFoundError as e:
+        print(f"❌ 파일을 찾을 수 없습니다: {e.filename}")
+        sys.exit(1)
+    except (expat.ExpatError, ValueError, KeyError) as e:
+        print(f"❌ GPX 파일 오류: {e}")
+        sys.exit(1)
+
+    print("\n" + "="*60)
+    print("🛰️ GPS 트랙 병합 결과")
+    print("="*60)
+    print(f"\n📍 점: {store.read}개 읽음 → {len(store)}개")
+    for name, count in store.source_counts().items():
+        print(f"  • {name}: {count}개")
+    if store.replaced:
+        print(f"  겹치는 구간에서 정확도로 정리: {store.replaced}개")
+    if store.out_of_order:
+        print(f"  ⚠️ 시간 순서가 크게 어긋나 제외: {store.out_of_order}개")
+    if store.invalid:
+        print(f"  ⚠️ 좌표/시간 형식 오류로 제외: {store.invalid}개")
+    if not len(store):
+        print("  ⚠️ 시간 정보가 있는 점이 없습니다")
+        return
+    print(f"  구간: {_format_time(store.start)} ~ {_format_time(store.end)}")
+
+    gaps = store.gaps()
+    print(f"\n⏸️ 공백 구간 ({args.max_interp:g}초 초과): {len(gaps)}개")
+    for start, end in gaps[:10]:
+        print(f"  {_format_time(start)} ~ {_format_time(end)} ({end - start:.0f}초)")
+    if len(gaps) > 10:
+        print(f"  ... 외 {len(gaps) - 10}개")
+
+    if args.lookup:
+        tz = None
+        if args.tz:
+            from timeline_merge import parse_tz
+            tz = parse_tz(args.tz)
+        print("\n🔎 위치 조회:")
+        for value in args.lookup:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=tz) if tz else dt.astimezone()
+            fix = store.lookup(dt.timestamp())
+            if fix is None:
+                print(f"  {value}: ❌ 트랙 범위 밖 (외삽 한도 초과)")
+                continue
+            ele = f", 고도 {fix.ele:.1f}m" if fix.ele is not None else ""
+            print(f"  {value}: {fix.lat:.6f}, {fix.lon:.6f}{ele} "
+                  f"[{fix.kind}, ±{fix.error:.0f}m, {fix.offset:.0f}초, {fix.source}]")
+
+    if args.output:
+        store.write_gpx(args.output)
+        print(f"\n💾 병합된 트랙 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
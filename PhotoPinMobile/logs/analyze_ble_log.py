@@ -3,11 +3,16 @@
 Phocus BLE 로그 상세 분석 도구
 """
 
+import os
 import re
 import sys
 from collections import defaultdict
 from datetime import datetime
 
+# 상위 폴더의 공통 모듈 사용 (압축 캡처 지원)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from capture_io import open_capture
+
 def analyze_log(log_file):
     """BLE 로그 파일 분석"""
     
@@ -25,7 +30,7 @@ def analyze_log(log_file):
     
     print("📖 로그 파일 분석 중...")
     
-    with open(log_file, 'r', errors='ignore') as f:
+    with open_capture(log_file, 'r', errors='ignore') as f:
         for line_num, line in enumerate(f, 1):
             # 타임스탬프 추출
             ts_match = patterns['timestamp'].search(line)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+NDJSON 결과 내보내기
+분석기가 파싱한 레코드를 한 줄에 하나씩 바로 기록하고, 마지막 줄에 요약을 붙입니다.
+결과 전체를 메모리에 올리지 않으며 .gz/.zst/.xz 확장자면 압축해서 저장합니다.
+
+파일 형식:
+  {"type": "write", ...}
+  {"type": "notify", ...}
+  ...
+  {"type": "summary", "records": 12345, ...}
+"""
+
+import json
+from typing import Dict, Optional
+
+from capture_io import open_capture, open_output
+
+
+class NDJSONWriter:
+    """레코드 스트리밍 기록기"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open_output(path, 'w')
+        self.records = 0
+        self.counts = {}
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+
+    def write(self, record: Dict):
+        """레코드 한 줄 기록 ('type' 키로 종류별 개수 집계)"""
+        self.f.write(self._encode(record))
+        self.f.write('\n')
+        self.records += 1
+        kind = record.get('type')
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def tell(self) -> int:
+        """다음 레코드가 기록될 위치 (압축하지 않은 파일에서만 바이트 오프셋)"""
+        return self.f.tell()
+
+    def close(self, summary: Optional[Dict] = None):
+        """요약 footer를 기록하고 파일 닫기"""
+        if self.f is None:
+            return
+        footer = {'type': 'summary', 'records': self.records, 'counts': self.counts}
+        if summary:
+            footer.update(summary)
+        self.f.write(self._encode(footer))
+        self.f.write('\n')
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.f is not None:
+            # 실패한 경우 요약 없이 닫아 불완전한 결과임을 알 수 있게 함
+            self.f.close()
+            self.f = None
+
+
+def read_ndjson(path: str):
+    """NDJSON 결과 파일 읽기 (레코드 dict를 하나씩 반환, 요약 footer 포함)"""
+    with open_capture(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
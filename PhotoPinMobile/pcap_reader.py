@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+pcap / pcapng 스트리밍 리더
+tcpdump, Wireshark로 저장한 캡처 파일을 패킷 단위로 읽습니다.
+파일 전체를 메모리에 올리지 않으므로 수 GB 캡처도 일정한 메모리로 처리합니다.
+"""
+
+import struct
+import sys
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from capture_io import open_capture
+
+# 링크 타입 (https://www.tcpdump.org/linktypes.html)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_USB_LINUX = 189
+LINKTYPE_USB_LINUX_MMAPPED = 220
+LINKTYPE_IPV4 = 228
+LINKTYPE_USBPCAP = 249
+
+# 클래식 pcap 매직 넘버
+PCAP_MAGIC_USEC = 0xA1B2C3D4
+PCAP_MAGIC_NSEC = 0xA1B23C4D
+
+# pcapng 블록 타입
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_OPB = 0x00000002
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+
+# pcapng 옵션
+PCAPNG_OPT_ENDOFOPT = 0
+PCAPNG_OPT_IF_TSRESOL = 9
+
+
+class PcapError(Exception):
+    """캡처 파일 형식 오류"""
+
+
+class Packet(NamedTuple):
+    """캡처된 패킷 하나"""
+    timestamp: float     # epoch 초
+    linktype: int
+    data: bytes          # 캡처된 바이트 (snaplen으로 잘렸을 수 있음)
+    orig_len: int        # 원래 패킷 길이
+
+
+def _read_exact(f: BinaryIO, size: int) -> Optional[bytes]:
+    """정확히 size 바이트 읽기. 파일 끝이면 None"""
+    data = f.read(size)
+    if not data:
+        return None
+    if len(data) < size:
+        # 캡처 도중 중단된 파일은 마지막 레코드가 잘려 있을 수 있음
+        return None
+    return data
+
+
+def _iter_pcap(f: BinaryIO, header: bytes) -> Iterator[Packet]:
+    """클래식 pcap 레코드 순회"""
+    magic_le = struct.unpack('<I', header[:4])[0]
+    if magic_le in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+        endian = '<'
+        magic = magic_le
+    else:
+        endian = '>'
+        magic = struct.unpack('>I', header[:4])[0]
+
+    rest = _read_exact(f, 20)
+    if rest is None:
+        raise PcapError("pcap 헤더가 잘렸습니다")
+    _, _, _, _, _, linktype = struct.unpack(endian + 'HHiIII', rest)
+    linktype &= 0x0FFFFFFF
+
+    divisor = 1e9 if magic == PCAP_MAGIC_NSEC else 1e6
+    record = struct.Struct(endian + 'IIII')
+
+    while True:
+        rec = _read_exact(f, 16)
+        if rec is None:
+            return
+        ts_sec, ts_frac, incl_len, orig_len = record.unpack(rec)
+        data = _read_exact(f, incl_len) if incl_len else b''
+        if data is None:
+            return
+        yield Packet(ts_sec + ts_frac / divisor, linktype, data, orig_len)
+
+
+def _parse_tsresol(options: bytes, endian: str) -> float:
+    """IDB 옵션에서 if_tsresol을 찾아 초 단위 배수 반환 (기본 마이크로초)"""
+    pos = 0
+    while pos + 4 <= len(options):
+        code, length = struct.unpack(endian + 'HH', options[pos:pos + 4])
+        if code == PCAPNG_OPT_ENDOFOPT:
+            break
+        value = options[pos + 4:pos + 4 + length]
+        if code == PCAPNG_OPT_IF_TSRESOL and length >= 1:
+            res = value[0]
+            if res & 0x80:
+                return 2.0 ** -(res & 0x7F)
+            return 10.0 ** -res
+        pos += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+def _iter_pcapng(f: BinaryIO, first: bytes) -> Iterator[Packet]:
+    """pcapng 블록 순회"""
+    endian = '<'
+    interfaces = []  # [(linktype, 초 단위 배수)]
+    pending = first  # 이미 읽은 블록 앞부분 (4바이트)
+
+    while True:
+        if pending is not None:
+            head = pending + (f.read(4) or b'')
+            pending = None
+        else:
+            head = f.read(8)
+        if len(head) < 8:
+            return
+
+        block_type_raw = head[:4]
+        if struct.unpack('<I', block_type_raw)[0] == PCAPNG_SHB:
+            # 섹션마다 엔디안이 바뀔 수 있으므로 byte-order magic으로 판별
+            bom = _read_exact(f, 4)
+            if bom is None:
+                return
+            endian = '<' if struct.unpack('<I', bom)[0] == 0x1A2B3C4D else '>'
+            block_len = struct.unpack(endian + 'I', head[4:8])[0]
+            if block_len < 16:
+                raise PcapError(f"잘못된 SHB 길이: {block_len}")
+            body = _read_exact(f, block_len - 12)
+            if body is None:
+                return
+            interfaces = []
+            continue
+
+        block_type, block_len = struct.unpack(endian + 'II', head)
+        if block_len < 12:
+            raise PcapError(f"잘못된 블록 길이: {block_len}")
+        body = _read_exact(f, block_len - 8)
+        if body is None:
+            return
+        body = body[:-4]  # 뒤쪽 block total length 제거
+
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack(endian + 'H', body[:2])[0]
+            interfaces.append((linktype, _parse_tsresol(body[8:], endian)))
+
+        elif block_type == PCAPNG_EPB:
+            if_id, ts_high, ts_low, cap_len, orig_len = struct.unpack(endian + 'IIIII', body[:20])
+            if if_id >= len(interfaces):
+                continue
+            linktype, scale = interfaces[if_id]
+            ts = ((ts_high << 32) | ts_low) * scale
+            yield Packet(ts, linktype, body[20:20 + cap_len], orig_len)
+
+        elif block_type == PCAPNG_SPB:
+            if not interfaces:
+                continue
+            orig_len = struct.unpack(endian + 'I', body[:4])[0]
+            linktype, _ = interfaces[0]
+            yield Packet(0.0, linktype, body[4:4 + orig_len], orig_len)
+
+        elif block_type == PCAPNG_OPB:
+            if_id, _, ts_high, ts_low, cap_len, orig_len = struct.unpack(endian + 'HHIIII', body[:20])
+            if if_id >= len(interfaces):
+                continue
+            linktype, scale = interfaces[if_id]
+            ts = ((ts_high << 32) | ts_low) * scale
+            yield Packet(ts, linktype, body[20:20 + cap_len], orig_len)
+
+        # 그 외 블록(NRB, ISB 등)은 무시
+
+
+def iter_packets(f: BinaryIO) -> Iterator[Packet]:
+    """열린 바이너리 파일에서 패킷을 하나씩 반환 (pcap/pcapng 자동 판별)"""
+    magic = f.read(4)
+    if len(magic) < 4:
+        return
+
+    value = struct.unpack('<I', magic)[0]
+    if value == PCAPNG_SHB:
+        yield from _iter_pcapng(f, magic)
+    elif value in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC) or \
+            struct.unpack('>I', magic)[0] in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+        yield from _iter_pcap(f, magic)
+    else:
+        raise PcapError(f"pcap/pcapng 파일이 아닙니다 (magic: {magic.hex()})")
+
+
+def read_packets(filepath: str) -> Iterator[Packet]:
+    """캡처 파일 경로에서 패킷을 스트리밍으로 읽기 (.gz/.zst/.xz 압축 파일도 지원)"""
+    with open_capture(filepath, 'rb') as f:
+        yield from iter_packets(f)
+
+
+class PcapWriter:
+    """클래식 pcap 파일 작성 (테스트용 합성 캡처, 플로우 추출 등에 사용)"""
+
+    def __init__(self, f: BinaryIO, linktype: int = LINKTYPE_ETHERNET, snaplen: int = 262144):
+        self.f = f
+        self.f.write(struct.pack('<IHHiIII', PCAP_MAGIC_USEC, 2, 4, 0, 0, snaplen, linktype))
+
+    def write(self, timestamp: float, data: bytes, orig_len: Optional[int] = None):
+        """패킷 하나 기록"""
+        ts_sec = int(timestamp)
+        ts_usec = int(round((timestamp - ts_sec) * 1e6))
+        if ts_usec >= 1000000:
+            ts_sec += 1
+            ts_usec -= 1000000
+        self.f.write(struct.pack('<IIII', ts_sec, ts_usec, len(data),
+                                 len(data) if orig_len is None else orig_len))
+        self.f.write(data)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("사용법: python3 pcap_reader.py <캡처파일.pcap|.pcapng[.gz|.zst|.xz]>")
+        sys.exit(1)
+
+    count = 0
+    total = 0
+    linktypes = {}
+    first_ts = last_ts = None
+
+    try:
+        for packet in read_packets(sys.argv[1]):
+            count += 1
+            total += packet.orig_len
+            linktypes[packet.linktype] = linktypes.get(packet.linktype, 0) + 1
+            if first_ts is None:
+                first_ts = packet.timestamp
+            last_ts = packet.timestamp
+    except FileNotFoundError:
+        print(f"❌ 파일을 찾을 수 없습니다: {sys.argv[1]}")
+        sys.exit(1)
+    except PcapError as e:
+        print(f"❌ 캡처 파일 오류: {e}")
+        sys.exit(1)
+
+    print(f"📦 패킷: {count}개, {total} bytes")
+    for linktype, n in sorted(linktypes.items()):
+        print(f"  • linktype {linktype}: {n}개")
+    if first_ts is not None:
+        print(f"⏱️ 캡처 구간: {last_ts - first_ts:.3f}초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+사진 메타데이터 읽기/쓰기
+파일 앞부분의 EXIF만 읽어 촬영 시간(DateTimeOriginal)을 찾고, GPS 위치를 XMP 사이드카로 기록합니다.
+
+exiftool 없이 JPEG와 TIFF 기반 RAW(3FR/FFF, DNG, NEF, CR2, ARW, ORF, RW2, PEF 등),
+Fujifilm RAF(내장 JPEG)를 처리합니다. 픽셀 데이터는 읽지 않으므로 파일당 수 KB만 읽습니다.
+CR3/HEIC 같은 ISO BMFF 형식은 지원하지 않습니다 (None 반환).
+
+확장자 목록은 PhotoPin 앱(PhotoPinApp.swift)의 rawExtensions / imageExtensions와 같습니다.
+"""
+
+import io
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Optional, Tuple
+
+# RAW 파일 확장자 (Lightroom 호환을 위해 XMP 사이드카 필요)
+RAW_EXTENSIONS = frozenset([
+    "3fr", "fff",  # Hasselblad
+    "dng",         # Adobe DNG
+    "arw", "sr2", "srf",  # Sony
+    "cr2", "cr3", "crw",  # Canon
+    "nef", "nrw",  # Nikon
+    "raf",         # Fujifilm
+    "orf",         # Olympus
+    "rw2",         # Panasonic
+    "pef", "ptx",  # Pentax
+    "srw",         # Samsung
+    "x3f",         # Sigma
+    "iiq",         # Phase One
+    "rwl", "raw",  # Leica
+    "gpr",         # GoPro
+    "ari",         # ARRI
+    "bay", "cap", "erf", "k25", "kdc", "mef", "mos", "mrw", "pxn",  # 기타
+])
+
+# 일반 이미지 확장자
+IMAGE_EXTENSIONS = frozenset([
+    "jpg", "jpeg", "png", "gif", "bmp", "webp",
+    "heic", "heif", "avif", "jxl",
+    "tiff", "tif",
+])
+
+PHOTO_EXTENSIONS = RAW_EXTENSIONS | IMAGE_EXTENSIONS
+
+# TIFF/EXIF 태그
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+TAG_SUBSEC_TIME_ORIGINAL = 0x9291
+
+# TIFF 헤더 매직 (일반 TIFF 42, Olympus ORF 'RO'/'SR', Panasonic RW2 'U')
+_TIFF_MAGICS = {42, 0x4F52, 0x5352, 0x55}
+_MAX_IFD_ENTRIES = 1024
+
+
+def photo_extension(path: str) -> str:
+    """소문자 확장자 (점 제외)"""
+    return os.path.splitext(path)[1][1:].lower()
+
+
+def _read_at(f: BinaryIO, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    data = f.read(size)
+    if len(data) < size:
+        raise EOFError
+    return data
+
+
+def _read_ifd(f: BinaryIO, base: int, offset: int, endian: str) -> Dict[int, Tuple[int, int, bytes]]:
+    """IFD 항목 {태그: (타입, 개수, 값 또는 오프셋 4바이트)}"""
+    count, = struct.unpack(endian + 'H', _read_at(f, base + offset, 2))
+    if count > _MAX_IFD_ENTRIES:
+        raise ValueError("IFD 항목 수가 비정상적입니다")
+    data = _read_at(f, base + offset + 2, count * 12)
+    entries = {}
+    for i in range(0, len(data), 12):
+        tag, kind, n = struct.unpack_from(endian + 'HHI', data, i)
+        entries[tag] = (kind, n, data[i + 8:i + 12])
+    return entries
+
+
+def _ascii(f: BinaryIO, base: int, endian: str, entry: Optional[Tuple[int, int, bytes]]) -> Optional[str]:
+    if entry is None:
+        return None
+    kind, n, raw = entry
+    if kind not in (2, 7) or n == 0 or n > 64:
+        return None
+    if n <= 4:
+        data = raw[:n]
+    else:
+        data = _read_at(f, base + struct.unpack(endian + 'I', raw)[0], n)
+    return data.split(b'\0', 1)[0].decode('ascii', 'ignore').strip() or None
+
+
+def _tiff_datetime(f: BinaryIO, base: int) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+    """TIFF 헤더(base 위치)에서 (DateTimeOriginal, SubSec, OffsetTime)"""
+    header = _read_at(f, base, 8)
+    if header[:2] == b'II':
+        endian = '<'
+    elif header[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+    magic, ifd0 = struct.unpack(endian + 'HI', header[2:])
+    if magic not in _TIFF_MAGICS:
+        return None
+
+    entries = _read_ifd(f, base, ifd0, endian)
+    fallback = _ascii(f, base, endian, entries.get(TAG_DATETIME))
+    exif = entries.get(TAG_EXIF_IFD)
+    if exif is not None:
+        exif_entries = _read_ifd(f, base, struct.unpack(endian + 'I', exif[2])[0], endian)
+        original = _ascii(f, base, endian, exif_entries.get(TAG_DATETIME_ORIGINAL))
+        if original:
+            return (original,
+                    _ascii(f, base, endian, exif_entries.get(TAG_SUBSEC_TIME_ORIGINAL)),
+                    _ascii(f, base, endian, exif_entries.get(TAG_OFFSET_TIME_ORIGINAL)))
+    return (fallback, None, None) if fallback else None
+
+
+def _jpeg_datetime(f: BinaryIO, start: int = 0):
+    """JPEG APP1 Exif 세그먼트의 TIFF 헤더에서 촬영 시간 찾기"""
+    pos = start + 2
+    while True:
+        marker = _read_at(f, pos, 4)
+        if marker[0] != 0xFF:
+            return None
+        kind, length = marker[1], struct.unpack('>H', marker[2:])[0]
+        if kind == 0xDA or kind == 0xD9:  # 이미지 데이터 시작 / 끝
+            return None
+        if kind == 0xE1 and _read_at(f, pos + 4, 6) == b'Exif\0\0':
+            return _tiff_datetime(f, pos + 10)
+        pos += 2 + length
+
+
+def _parse_exif_time(value: str, subsec: Optional[str], offset: Optional[str],
+                     tz: Optional[timezone]) -> Optional[float]:
+    try:
+        dt = datetime.strptime(value[:19], '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+    if offset:
+        try:
+            dt = dt.replace(tzinfo=datetime.strptime(offset, '%z').tzinfo)
+        except ValueError:
+            pass
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz) if tz else dt.astimezone()  # 시스템 시간대로 해석
+    fraction = float('0.' + subsec) if subsec and subsec.isdigit() else 0.0
+    return dt.timestamp() + fraction
+
+
+def capture_time_from_stream(f: BinaryIO, tz: Optional[timezone] = None) -> Optional[float]:
+    """열린 파일(또는 BytesIO)에서 촬영 시간 epoch 초 (없거나 지원하지 않는 형식이면 None)
+
+    시간대는 OffsetTimeOriginal → tz → 시스템 시간대 순으로 적용합니다.
+    """
+    try:
+        head = _read_at(f, 0, 16)
+        if head[:2] == b'\xff\xd8':
+            found = _jpeg_datetime(f)
+        elif head[:2] in (b'II', b'MM'):
+            found = _tiff_datetime(f, 0)
+        elif head.startswith(b'FUJIFILMCCD-RAW'):
+            jpeg_offset, = struct.unpack('>I', _read_at(f, 84, 4))
+            found = _jpeg_datetime(f, jpeg_offset)
+        else:
+            return None
+    except (EOFError, ValueError, struct.error):
+        return None
+    if not found:
+        return None
+    return _parse_exif_time(*found, tz)
+
+
+def capture_time_from_bytes(data: bytes, tz: Optional[timezone] = None) -> Optional[float]:
+    """파일 앞부분 바이트에서 촬영 시간 (PTP GetPartialObject로 받은 헤더 등)"""
+    return capture_time_from_stream(io.BytesIO(data), tz)
+
+
+def read_capture_time(path: str, tz: Optional[timezone] = None) -> Optional[float]:
+    """사진 파일의 촬영 시간 epoch 초"""
+    with open(path, 'rb', buffering=16 * 1024) as f:
+        return capture_time_from_stream(f, tz)
+
+
+def build_exif_tiff(datetime_original: str, subsec: Optional[str] = None,
+                    offset: Optional[str] = None, endian: str = '<', padding: int = 0) -> bytes:
+    """DateTimeOriginal만 담은 최소 TIFF (TIFF 기반 RAW 대용, 테스트/벤치마크용)
+
+    datetime_original은 EXIF 형식 'YYYY:MM:DD HH:MM:SS', padding은 뒤에 붙일 0 바이트 수.
+    """
+    exif = [(TAG_DATETIME_ORIGINAL, datetime_original)]
+    if offset:
+        exif.append((TAG_OFFSET_TIME_ORIGINAL, offset))
+    if subsec:
+        exif.append((TAG_SUBSEC_TIME_ORIGINAL, subsec))
+    exif_offset = 8 + 2 + 12 + 4
+    data_offset = exif_offset + 2 + 12 * len(exif) + 4
+
+    out = (b'II' if endian == '<' else b'MM') + struct.pack(endian + 'HI', 42, 8)
+    out += struct.pack(endian + 'HHHII', 1, TAG_EXIF_IFD, 4, 1, exif_offset) + struct.pack(endian + 'I', 0)
+    entries, blob = b'', b''
+    for tag, text in exif:
+        value = text.encode('ascii') + b'\0'
+        if len(value) <= 4:
+            entries += struct.pack(endian + 'HHI', tag, 2, len(value)) + value.ljust(4, b'\0')
+        else:
+            entries += struct.pack(endian + 'HHII', tag, 2, len(value), data_offset + len(blob))
+            blob += value
+    out += struct.pack(endian + 'H', len(exif)) + entries + struct.pack(endian + 'I', 0) + blob
+    return out + bytes(padding)
+
+
+def build_exif_jpeg(datetime_original: str, subsec: Optional[str] = None,
+                    offset: Optional[str] = None, padding: int = 0) -> bytes:
+    """EXIF APP1만 담은 최소 JPEG (테스트/벤치마크용, 이미지 데이터 없음)"""
+    app1 = b'Exif\0\0' + build_exif_tiff(datetime_original, subsec, offset, '>')
+    return (b'\xff\xd8\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1
+            + b'\xff\xda\x00\x02' + bytes(padding) + b'\xff\xd9')
+
+
+def xmp_sidecar_path(path: str) -> str:
+    """사이드카 경로 (exiftool -o %d%f.xmp와 같음: 같은 파일명의 다른 확장자는 XMP 하나를 공유)"""
+    return os.path.splitext(path)[0] + '.xmp'
+
+
+def _xmp_coordinate(value: float, positive: str, negative: str) -> str:
+    """XMP GPS 좌표 형식 'DDD,MM.mmmmmmR'"""
+    ref = positive if value >= 0 else negative
+    value = abs(value)
+    degrees = int(value)
+    return f"{degrees},{(value - degrees) * 60:.6f}{ref}"
+
+
+XMP_TEMPLATE = """<?xpacket begin='\ufeff' id='W5M0MpCehiHzreSzNTczkc9d'?>
+<x:xmpmeta xmlns:x='adobe:ns:meta/' x:xmptk='PhotoPin'>
+<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>
+ <rdf:Description rdf:about=''
+  xmlns:exif='http://ns.adobe.com/exif/1.0/'>
+  <exif:GPSVersionID>2.3.0.0</exif:GPSVersionID>
+  <exif:GPSLatitude>{lat}</exif:GPSLatitude>
+  <exif:GPSLongitude>{lon}</exif:GPSLongitude>
+{extra} </rdf:Description>
+</rdf:RDF>
+</x:xmpmeta>
+<?xpacket end='w'?>
+"""
+
+
+def build_xmp(lat: float, lon: float, ele: Optional[float] = None,
+              timestamp: Optional[float] = None) -> str:
+    """GPS 위치 XMP 패킷"""
+    extra = ''
+    if ele is not None:
+        extra += f"  <exif:GPSAltitude>{round(abs(ele) * 10)}/10</exif:GPSAltitude>\n"
+        extra += f"  <exif:GPSAltitudeRef>{0 if ele >= 0 else 1}</exif:GPSAltitudeRef>\n"
+    if timestamp is not None:
+        stamp = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        extra += f"  <exif:GPSTimeStamp>{stamp}</exif:GPSTimeStamp>\n"
+    return XMP_TEMPLATE.format(lat=_xmp_coordinate(lat, 'N', 'S'),
+                               lon=_xmp_coordinate(lon, 'E', 'W'), extra=extra)
+
+
+def write_xmp_sidecar(path: str, lat: float, lon: float, ele: Optional[float] = None,
+                      timestamp: Optional[float] = None, overwrite: bool = False) -> str:
+    """사진 옆에 GPS XMP 사이드카 기록 (이미 있으면 FileExistsError, 앱과 같이 기존 파일 보호)"""
+    sidecar = xmp_sidecar_path(path)
+    with open(sidecar, 'w' if overwrite else 'x', encoding='utf-8') as f:
+        f.write(build_xmp(lat, lon, ele, timestamp))
+    return sidecar
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("사용법: python3 photo_metadata.py <사진 파일>...")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        try:
+            t = read_capture_time(path)
+        except FileNotFoundError:
+            print(f"❌ 파일을 찾을 수 없습니다: {path}")
+            continue
+        if t is None:
+            print(f"  {path}: ⚠️ 촬영 시간 없음 (지원하지 않는 형식)")
+        else:
+            print(f"  {path}: {datetime.fromtimestamp(t).isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
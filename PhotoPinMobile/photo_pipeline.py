@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+사진 폴더 지오태깅 파이프라인
+폴더 탐색 → 촬영 시간 추출 → 위치 조회/XMP 기록을 단계별 스레드로 동시에 처리합니다.
+
+    탐색 스레드 (os.scandir) ─▶ [파일 큐] ─▶ 시간 추출 스레드 ─▶ [태깅 큐] ─▶ 태깅 (GPX 조회 + XMP)
+
+폴더 전체를 먼저 세지 않고 찾는 즉시 다음 단계로 넘기므로 10만 장짜리 카드 덤프도
+첫 파일부터 바로 태깅이 시작되고 진행 상황이 실시간으로 표시됩니다.
+큐 크기가 정해져 있어 뒤 단계가 느리면 앞 단계가 기다리므로 메모리 사용량이 일정합니다.
+
+GPX 트랙은 gpx_track.TrackStore (여러 파일 병합), 촬영 시간/XMP는 photo_metadata를 사용합니다.
+이미 XMP 사이드카가 있는 사진은 앱과 같이 건너뜁니다.
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Set
+
+from photo_metadata import (PHOTO_EXTENSIONS, RAW_EXTENSIONS, read_capture_time,
+                            write_xmp_sidecar)
+
+DEFAULT_WALKERS = 4
+DEFAULT_READERS = 4
+QUEUE_SIZE = 1024            # 단계 사이 큐 크기 (메모리 상한)
+PROGRESS_INTERVAL = 0.2      # 진행 상황 표시 간격 (초)
+
+# 단계 사이 종료 신호
+_DONE = object()
+
+
+class PipelineStats:
+    """단계별 처리 개수 (스레드에서 += 하므로 Counter 대신 잠금 사용)"""
+
+    FIELDS = ('found', 'raw', 'read', 'tagged', 'existing', 'no_time', 'no_fix', 'errors')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.started = time.perf_counter()
+        self.first_tagged = None
+
+    def add(self, field: str, n: int = 1):
+        with self.lock:
+            self.counts[field] += n
+
+    def __getitem__(self, field: str) -> int:
+        return self.counts[field]
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class FolderWalker:
+    """여러 스레드가 디렉터리를 나눠 os.scandir로 탐색하며 사진 경로를 출력 큐로 넘김"""
+
+    def __init__(self, roots: Iterable[str], output: queue.Queue, stats: PipelineStats,
+                 extensions: Set[str] = PHOTO_EXTENSIONS, threads: int = DEFAULT_WALKERS,
+                 skip_existing: bool = True):
+        self.output = output
+        self.stats = stats
+        self.extensions = extensions
+        self.skip_existing = skip_existing
+        self.dirs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        for root in roots:
+            self._push(root)
+        if not self.pending:
+            self.output.put(_DONE)
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _push(self, path: str):
+        with self.lock:
+            self.pending += 1
+        self.dirs.put(path)
+
+    def _finish_dir(self):
+        with self.lock:
+            self.pending -= 1
+            done = self.pending == 0
+        if done:
+            # 남은 디렉터리가 없으면 탐색 스레드 종료 후 다음 단계에 알림
+            for _ in self.threads:
+                self.dirs.put(None)
+            self.output.put(_DONE)
+
+    def _run(self):
+        extensions = self.extensions
+        while True:
+            path = self.dirs.get()
+            if path is None:
+                return
+            try:
+                self._scan(path, extensions)
+            except OSError:
+                self.stats.add('errors')
+            finally:
+                self._finish_dir()
+
+    def _scan(self, path: str, extensions: Set[str]):
+        photos = []
+        sidecars = set()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    self._push(entry.path)
+                    continue
+                base, dot, ext = name.rpartition('.')
+                if not dot:
+                    continue
+                ext = ext.lower()
+                if ext == 'xmp':
+                    sidecars.add(base)
+                elif ext in extensions:
+                    photos.append((entry.path, base, ext))
+
+        for photo, base, ext in photos:
+            self.stats.add('found')
+            if ext in RAW_EXTENSIONS:
+                self.stats.add('raw')
+            if self.skip_existing and base in sidecars:
+                self.stats.add('existing')
+                continue
+            self.output.put(photo)
+
+
+class Stage:
+    """입력 큐의 항목을 func로 처리해 출력 큐로 넘기는 작업 스레드 묶음 (None 결과는 버림)"""
+
+    def __init__(self, func: Callable, inbox: queue.Queue, outbox: queue.Queue, threads: int):
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.lock = threading.Lock()
+        self.remaining = threads
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self):
+        func, inbox, outbox = self.func, self.inbox, self.outbox
+        try:
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    inbox.put(_DONE)  # 같은 단계의 다른 스레드도 종료하도록 되돌려 놓음
+                    break
+                result = func(item)
+                if result is not None:
+                    outbox.put(result)
+        finally:
+            # 예외로 스레드가 끝나도 다음 단계가 종료 신호를 받도록 함
+            with self.lock:
+                self.remaining -= 1
+                last = self.remaining == 0
+            if last:
+                outbox.put(_DONE)
+
+
+def _print_progress(stats: PipelineStats, walking: bool, final: bool = False):
+    elapsed = stats.elapsed()
+    done = stats['tagged'] + stats['no_time'] + stats['no_fix'] + stats['existing']
+    rate = stats['tagged'] / elapsed if elapsed > 0 else 0.0
+    total = f"{stats['found']}" + ("+ (탐색 중)" if walking else "")
+    sys.stdout.write(f"\r  📸 {done}/{total} 처리 | 태깅 {stats['tagged']} | "
+                     f"{rate:,.0f}장/초 | {elapsed:.1f}초   ")
+    if final:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def run_pipeline(roots: List[str], lookup: Optional[Callable], tz=None,
+                 walkers: int = DEFAULT_WALKERS, readers: int = DEFAULT_READERS,
+                 queue_size: int = QUEUE_SIZE, dry_run: bool = False, overwrite: bool = False,
+                 progress: bool = True, prepare: Optional[Callable] = None) -> PipelineStats:
+    """폴더 지오태깅 실행
+
+    lookup(epoch) → Fix 또는 None. prepare가 있으면 탐색/시간 추출을 시작한 뒤 호출해
+    그 결과를 lookup으로 사용합니다 (GPX를 읽는 동안 앞 단계가 미리 진행됨).
+    """
+    stats = PipelineStats()
+    files = queue.Queue(maxsize=queue_size)
+    timed = queue.Queue(maxsize=queue_size)
+
+    def extract(path):
+        try:
+            t = read_capture_time(path, tz)
+        except OSError:
+            stats.add('errors')
+            return None
+        stats.add('read')
+        return (path, t)
+
+    walker = FolderWalker(roots, files, stats, threads=walkers, skip_existing=not overwrite)
+    reader = Stage(extract, files, timed, readers)
+    walker.start()
+    reader.start()
+
+    if prepare is not None:
+        lookup = prepare()
+
+    last_report = 0.0
+    while True:
+        try:
+            item = timed.get(timeout=PROGRESS_INTERVAL)
+        except queue.Empty:
+            item = None
+        if item is _DONE:
+            break
+        if item is not None:
+            path, t = item
+            fix = lookup(t) if t is not None else None
+            if t is None:
+                stats.add('no_time')
+            elif fix is None:
+                stats.add('no_fix')
+            elif dry_run:
+                stats.add('tagged')
+            else:
+                try:
+                    write_xmp_sidecar(path, fix.lat, fix.lon, fix.ele, t, overwrite=overwrite)
+                    stats.add('tagged')
+                except FileExistsError:
+                    # 같은 파일명의 다른 확장자가 먼저 사이드카를 만든 경우
+                    stats.add('existing')
+                except OSError:
+                    stats.add('errors')
+            if stats.first_tagged is None and stats['tagged']:
+                stats.first_tagged = stats.elapsed()
+
+        if progress:
+            now = stats.elapsed()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                _print_progress(stats, any(t.is_alive() for t in walker.threads))
+
+    if progress:
+        _print_progress(stats, False, final=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="사진 폴더 지오태깅 (폴더 탐색/시간 추출/XMP 기록 동시 진행)",
+        epilog="예: python3 photo_pipeline.py /Volumes/CARD/DCIM --gpx logger1.gpx --gpx phone.gpx --tz +09:00")
+    parser.add_argument('folders', nargs='+', help="사진 폴더 (하위 폴더 포함)")
+    parser.add_argument('--gpx', action='append', default=[], help="GPX 트랙 (여러 개 지정 시 병합)")
+    parser.add_argument('--tz', help="촬영 시간대 (EXIF에 시간대가 없을 때, 예: +09:00, 기본: 시스템)")
+    parser.add_argument('--max-interp', type=float, help="보간 최대 간격 (초, 기본 1800)")
+    parser.add_argument('--max-extrap', type=float, help="외삽 최대 시간 (초, 기본 18000)")
+    parser.add_argument('--walkers', type=int, default=DEFAULT_WALKERS,
+                        help=f"폴더 탐색 스레드 수 (기본 {DEFAULT_WALKERS})")
+    parser.add_argument('--readers', type=int, default=DEFAULT_READERS,
+                        help=f"촬영 시간 추출 스레드 수 (기본 {DEFAULT_READERS})")
+    parser.add_argument('--dry-run', action='store_true', help="XMP를 쓰지 않고 결과만 확인")
+    parser.add_argument('--overwrite', action='store_true', help="기존 XMP 사이드카 덮어쓰기")
+    args = parser.parse_args()
+
+    if not args.gpx:
+        parser.error("--gpx가 필요합니다")
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            print(f"❌ 폴더를 찾을 수 없습니다: {folder}")
+            sys.exit(1)
+
+    tz = None
+    if args.tz:
+        from timeline_merge import parse_tz
+        tz = parse_tz(args.tz)
+
+    from gpx_track import TrackStore
+
+    options = {}
+    if args.max_interp is not None:
+        options['max_interpolation'] = args.max_interp
+    if args.max_extrap is not None:
+        options['max_extrapolation'] = args.max_extrap
+
+    def load_track():
+        store = TrackStore.from_files(args.gpx, **options)
+        print(f"🛰️ GPS 트랙: {len(store)}개 점 ({len(args.gpx)}개 파일), 공백 구간 {len(store.gaps())}개")
+        return store.lookup
+
+    print("="*60)
+    print("📍 사진 지오태깅" + (" (dry-run)" if args.dry_run else ""))
+    print("="*60)
+    try:
+        stats = run_pipeline(args.folders, None, tz, args.walkers, args.readers,
+                             dry_run=args.dry_run, overwrite=args.overwrite, prepare=load_track)
+    except FileNotFoundError as e:
+        print(f"❌ 파일을 찾을 수 없습니다: {e.filename}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⏹️ 중단됨")
+        sys.exit(130)
+
+    print(f"\n📊 사진 {stats['found']}개 (RAW {stats['raw']}개)")
+    print(f"  ✅ XMP 기록: {stats['tagged']}개")
+    if stats['existing']:
+        print(f"  ⏭️ XMP 이미 있음: {stats['existing']}개")
+    if stats['no_time']:
+        print(f"  ⚠️ 촬영 시간 없음 (CR3/HEIC 등 미지원 형식 포함): {stats['no_time']}개")
+    if stats['no_fix']:
+        print(f"  ⚠️ GPS 트랙 범위 밖: {stats['no_fix']}개")
+    if stats['errors']:
+        print(f"  ❌ 읽기/쓰기 오류: {stats['errors']}개")
+    if stats.first_tagged is not None:
+        print(f"  첫 태깅까지: {stats.first_tagged * 1000:.0f}ms")
+    print(f"  소요 시간: {stats.elapsed():.1f}초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+PhotoPin 분석 도구 패키지
+PhotoPinMobile/의 분석 스크립트들을 하나의 import 경로와 `photopin-tools` 명령으로 묶습니다.
+
+각 기능은 처음 사용할 때 해당 모듈을 불러옵니다 (PEP 562 모듈 __getattr__).
+`import photopin_tools`만으로는 분석 모듈을 하나도 읽지 않으므로 시작이 빠릅니다.
+
+    from photopin_tools import BLEAnalyzer, read_packets
+"""
+
+__version__ = "1.0.0"
+
+# 공개 이름 → 정의된 모듈
+_EXPORTS = {
+    # 캡처 입출력
+    'open_capture': 'capture_io',
+    'open_output': 'capture_io',
+    'read_packets': 'pcap_reader',
+    'PcapWriter': 'pcap_reader',
+    'PcapError': 'pcap_reader',
+    'NDJSONWriter': 'ndjson_export',
+    'read_ndjson': 'ndjson_export',
+    # BLE / PTP 분석
+    'BLEAnalyzer': 'analyze_packets',
+    'analyze_phocus_log': 'analyze_phocus_log',
+    'load_command_table': 'command_trie',
+    'operation_name': 'ptp_protocol',
+    'parse_ptpip_body': 'ptp_protocol',
+    'analyze_capture': 'analyze_usb_capture',
+    'RunCollapser': 'event_aggregate',
+    'SpaceSaving': 'event_aggregate',
+    # 타임라인 / 통계
+    'merge_sources': 'timeline_merge',
+    'iter_timeline': 'timeline_merge',
+    'analyze_series': 'traffic_timeseries',
+    'ResultCache': 'result_cache',
+    # 지오태깅
+    'TrackStore': 'gpx_track',
+    'iter_gpx': 'gpx_track',
+    'read_capture_time': 'photo_metadata',
+    'write_xmp_sidecar': 'photo_metadata',
+    'run_pipeline': 'photo_pipeline',
+    'PTPIPClient': 'ptpip_live',
+    'LiveGeotagger': 'ptpip_live',
+    'PTPIPResponder': 'ptpip_live',
+    # 카메라 탐색
+    'discover_cameras': 'camera_discovery',
+    'resolve_camera_ip': 'camera_discovery',
+    'DiscoveryService': 'camera_discovery',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(__import__(module), name)
+    globals()[name] = value   # 다음 접근부터는 일반 속성으로 조회
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,5 @@
+"""python3 -m photopin_tools 진입점"""
+
+from photopin_tools.cli import main
+
+main()
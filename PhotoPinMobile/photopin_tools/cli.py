@@ -0,0 +1,70 @@
+"""
+photopin-tools 명령줄 진입점
+하위 명령을 해당 분석 스크립트의 main()으로 넘깁니다.
+
+    photopin-tools analyze ble_capture.log
+    photopin-tools phocus phocus_logs.ndjson
+    photopin-tools scan --subnet 192.168.2.0/24
+    photopin-tools probe --ip 192.168.2.1
+    photopin-tools ptp camera_wifi.pcap
+    photopin-tools usb capture hasselblad_usb.pcap
+
+시작 시간을 줄이기 위해 argparse도 쓰지 않고 sys만 import합니다.
+하위 명령의 모듈은 실행할 때 처음 불러오므로 `--help`나 가벼운 명령은
+asyncio, numpy, requests 같은 무거운 모듈을 읽지 않습니다.
+"""
+
+import sys
+
+import photopin_tools
+
+PROG = "photopin-tools"
+
+# 하위 명령 → (모듈, 설명)  - 각 모듈의 main()이 sys.argv를 직접 파싱
+COMMANDS = {
+    'analyze': ('analyze_packets', "BLE 패킷 로그 분석 (diff: 두 캡처 명령 비교)"),
+    'phocus': ('analyze_phocus_log', "Phocus BLE 로그(log stream NDJSON) 분석"),
+    'scan': ('camera_discovery', "네트워크에서 카메라 탐색 (TCP/mDNS/SSDP)"),
+    'probe': ('analyze_camera_protocol', "카메라 포트/HTTP/PTP-IP 프로토콜 확인"),
+    'ptp': ('analyze_camera_traffic', "WiFi 캡처(pcap)의 HTTP/PTP-IP 트래픽 분석"),
+    'usb': ('usb_camera_analyze', "USB 카메라 분석 (capture: USB 캡처 파일 분석)"),
+    'timeline': ('timeline_merge', "BLE/Console/pcap 캡처를 하나의 타임라인으로 병합"),
+    'gpx': ('gpx_track', "여러 GPX 트랙 병합, 공백 구간 검출, 사진 시간 위치 조회"),
+    'tag': ('photo_pipeline', "사진 폴더 지오태깅 (탐색/시간 추출/XMP 기록 동시 진행)"),
+    'live': ('ptpip_live', "PTP/IP 이벤트로 촬영 즉시 XMP 기록 (실시간 지오태깅)"),
+    'bench': ('geotag_bench', "지오태깅 단계별 처리 속도/메모리 벤치마크, 버전 간 비교"),
+    'rates': ('traffic_timeseries', "트래픽 시계열, 버스트/유휴 구간 검출 (numpy 필요)"),
+    'cache': ('result_cache', "파싱 결과 캐시 관리 (stats/clear/evict)"),
+}
+
+
+def print_help(out=sys.stdout):
+    out.write(f"사용법: {PROG} <명령> [옵션...]\n\n")
+    out.write("PhotoPin 카메라 프로토콜 분석 도구\n\n")
+    out.write("명령:\n")
+    for name, (_, description) in COMMANDS.items():
+        out.write(f"  {name:<10} {description}\n")
+    out.write(f"\n명령별 도움말: {PROG} <명령> --help\n")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else list(argv)
+
+    if not args or args[0] in ('-h', '--help', 'help'):
+        print_help()
+        return
+    if args[0] == '--version':
+        print(f"{PROG} {photopin_tools.__version__}")
+        return
+
+    name, rest = args[0], args[1:]
+    if name not in COMMANDS:
+        sys.stderr.write(f"❌ 알 수 없는 명령: {name}\n\n")
+        print_help(sys.stderr)
+        sys.exit(2)
+
+    module, _ = COMMANDS[name]
+    # 하위 명령의 argparse가 사용법에 'photopin-tools <명령>'을 표시하도록 argv 교체
+    sys.argv = [f"{PROG} {name}"] + rest
+    __import__(module).main()
+
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+PTP / PTP-IP 프로토콜 상수와 패킷 해석
+카메라 WiFi(15740 포트) 트래픽 분석에서 공통으로 사용합니다.
+"""
+
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+# PTP/IP 기본 포트
+PTPIP_PORT = 15740
+
+# PTP 명령 코드
+PTP_COMMANDS = {
+    0x1001: "GetDeviceInfo",
+    0x1002: "OpenSession",
+    0x1003: "CloseSession",
+    0x1004: "GetStorageIDs",
+    0x1008: "GetObjectInfo",
+    0x1009: "GetObject",
+    0x101B: "GetPartialObject",
+    0x9201: "GetObjectPropsSupported",  # 카메라 특정
+    0x9202: "GetObjectPropDesc",
+    0x9801: "GetDevicePropDesc",  # WiFi 설정 관련
+}
+
+PTP_OPEN_SESSION = 0x1002
+PTP_CLOSE_SESSION = 0x1003
+PTP_GET_OBJECT_INFO = 0x1008
+PTP_GET_PARTIAL_OBJECT = 0x101B
+
+# PTP 응답 코드 (주요 항목)
+PTP_RESPONSES = {
+    0x2001: "OK",
+    0x2002: "GeneralError",
+    0x2003: "SessionNotOpen",
+    0x2005: "OperationNotSupported",
+    0x2019: "DeviceBusy",
+    0x201E: "SessionAlreadyOpen",
+}
+
+PTP_RESPONSE_OK = 0x2001
+PTP_RESPONSE_NOT_SUPPORTED = 0x2005
+
+# PTP 이벤트 코드
+PTP_EVENTS = {
+    0x4002: "ObjectAdded",
+    0x4003: "ObjectRemoved",
+    0x4006: "DevicePropChanged",
+    0x400A: "StorageInfoChanged",
+    0x400D: "CaptureComplete",
+}
+
+PTP_EVENT_OBJECT_ADDED = 0x4002
+
+# PTP USB 컨테이너 타입
+PTP_CONTAINER_TYPES = {
+    0x0001: "Command",
+    0x0002: "Data",
+    0x0003: "Response",
+    0x0004: "Event",
+}
+
+PTP_CONTAINER_COMMAND = 0x0001
+PTP_CONTAINER_DATA = 0x0002
+PTP_CONTAINER_RESPONSE = 0x0003
+PTP_CONTAINER_EVENT = 0x0004
+
+# 길이(4) + 타입(2) + 코드(2) + 트랜잭션 ID(4)
+PTP_CONTAINER_HEADER = struct.Struct('<IHHI')
+
+# PTP/IP 패킷 타입
+PTPIP_PACKET_TYPES = {
+    0x01: "InitCommandRequest",
+    0x02: "InitCommandAck",
+    0x03: "InitEventRequest",
+    0x04: "InitEventAck",
+    0x05: "InitFail",
+    0x06: "OperationRequest",
+    0x07: "OperationResponse",
+    0x08: "Event",
+    0x09: "StartData",
+    0x0A: "Data",
+    0x0B: "Cancel",
+    0x0C: "EndData",
+    0x0D: "ProbeRequest",
+    0x0E: "ProbeResponse",
+}
+
+PTPIP_INIT_COMMAND_REQUEST = 0x01
+PTPIP_INIT_COMMAND_ACK = 0x02
+PTPIP_INIT_EVENT_REQUEST = 0x03
+PTPIP_INIT_EVENT_ACK = 0x04
+PTPIP_INIT_FAIL = 0x05
+PTPIP_OPERATION_REQUEST = 0x06
+PTPIP_OPERATION_RESPONSE = 0x07
+PTPIP_EVENT = 0x08
+PTPIP_START_DATA = 0x09
+PTPIP_DATA = 0x0A
+PTPIP_END_DATA = 0x0C
+PTPIP_PROBE_REQUEST = 0x0D
+PTPIP_PROBE_RESPONSE = 0x0E
+
+PTPIP_VERSION = 0x00010000
+
+# 길이(4) + 타입(4)
+PTPIP_HEADER = struct.Struct('<II')
+
+
+def operation_name(code: int) -> str:
+    """PTP 명령 코드 이름 (모르는 코드는 16진수 표기)"""
+    name = PTP_COMMANDS.get(code)
+    return f"{name} (0x{code:04X})" if name else f"Operation 0x{code:04X}"
+
+
+def response_name(code: int) -> str:
+    """PTP 응답 코드 이름"""
+    return PTP_RESPONSES.get(code, f"0x{code:04X}")
+
+
+def event_name(code: int) -> str:
+    """PTP 이벤트 코드 이름"""
+    name = PTP_EVENTS.get(code)
+    return f"{name} (0x{code:04X})" if name else f"Event 0x{code:04X}"
+
+
+def packet_type_name(packet_type: int) -> str:
+    """PTP/IP 패킷 타입 이름"""
+    return PTPIP_PACKET_TYPES.get(packet_type, f"Type 0x{packet_type:02X}")
+
+
+def parse_ptpip_body(packet_type: int, body: bytes) -> Dict[str, int]:
+    """
+    PTP/IP 패킷 본문(헤더 8바이트 이후)의 주요 필드 해석
+    OperationRequest/Response/Event만 필드를 추출하고 나머지는 빈 dict
+    """
+    if packet_type == PTPIP_OPERATION_REQUEST and len(body) >= 10:
+        data_phase, code, transaction_id = struct.unpack('<IHI', body[:10])
+        return {'data_phase': data_phase, 'code': code, 'transaction_id': transaction_id}
+    if packet_type in (PTPIP_OPERATION_RESPONSE, PTPIP_EVENT) and len(body) >= 6:
+        code, transaction_id = struct.unpack('<HI', body[:6])
+        return {'code': code, 'transaction_id': transaction_id}
+    return {}
+
+
+
+def pack_ptp_string(text: str) -> bytes:
+    """PTP 문자열 (글자 수 1바이트 + NUL 포함 UTF-16LE)"""
+    if not text:
+        return b'\0'
+    encoded = (text + '\0').encode('utf-16le')
+    return bytes([len(encoded) // 2]) + encoded
+
+
+def unpack_ptp_string(data: bytes, pos: int) -> Tuple[str, int]:
+    """pos 위치의 PTP 문자열과 다음 위치"""
+    count = data[pos]
+    end = pos + 1 + count * 2
+    text = data[pos + 1:end].decode('utf-16le', 'ignore').rstrip('\0')
+    return text, end
+
+
+# ObjectInfo 데이터셋의 고정 길이 앞부분 (StorageID ~ SequenceNumber)
+OBJECT_INFO_HEADER = struct.Struct('<IHHIHIIIIIIIHII')
+
+
+def parse_object_info(data: bytes) -> Dict:
+    """GetObjectInfo 데이터셋 해석 (파일명, 크기, 촬영 시간 문자열 등)"""
+    fields = OBJECT_INFO_HEADER.unpack_from(data)
+    pos = OBJECT_INFO_HEADER.size
+    filename, pos = unpack_ptp_string(data, pos)
+    capture_date, pos = unpack_ptp_string(data, pos)
+    return {
+        'storage_id': fields[0],
+        'format': fields[1],
+        'size': fields[3],
+        'parent': fields[11],
+        'filename': filename,
+        'capture_date': capture_date,
+    }
+
+
+def build_object_info(filename: str, size: int, capture_date: str = '',
+                      object_format: int = 0x3801, storage_id: int = 0x00010001) -> bytes:
+    """ObjectInfo 데이터셋 생성 (응답기/테스트용)"""
+    return (OBJECT_INFO_HEADER.pack(storage_id, object_format, 0, size, 0, 0, 0, 0,
+                                    0, 0, 0, 0, 0, 0, 0)
+            + pack_ptp_string(filename) + pack_ptp_string(capture_date)
+            + pack_ptp_string(capture_date) + pack_ptp_string(''))
+
+
+def parse_ptp_datetime(text: str) -> Optional[datetime]:
+    """PTP DateTime 문자열 'YYYYMMDDThhmmss[.s][Z|+hhmm]' (시간대 없으면 naive)"""
+    if len(text) < 15:
+        return None
+    try:
+        dt = datetime.strptime(text[:15], '%Y%m%dT%H%M%S')
+    except ValueError:
+        return None
+    rest = text[15:]
+    if rest.startswith('.'):
+        digits = rest[1:].split('Z')[0].split('+')[0].split('-')[0]
+        if digits.isdigit():
+            dt = dt.replace(microsecond=int(float('0.' + digits) * 1_000_000))
+        rest = rest[1 + len(digits):]
+    if rest == 'Z':
+        dt = dt.replace(tzinfo=timezone.utc)
+    elif rest[:1] in ('+', '-') and len(rest) >= 5:
+        sign = -1 if rest[0] == '-' else 1
+        dt = dt.replace(tzinfo=timezone(sign * timedelta(hours=int(rest[1:3]), minutes=int(rest[3:5]))))
+    return dt
@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+"""
+PTP/IP 실시간 지오태깅
+카메라와 PTP/IP 명령/이벤트 채널을 연결해 두고, 사진이 찍혀 ObjectAdded 이벤트가 오면
+바로 그 시점의 GPS 위치로 XMP 사이드카를 만듭니다 (촬영 후 1초 이내 목표).
+
+    이벤트 채널 ─▶ ObjectAdded (도착 시각/위치 즉시 기록) ─▶ [대기열] ─▶ ObjectInfo + 파일 앞부분만 받기 ─▶ XMP
+
+- 사진 전체가 아니라 GetPartialObject로 앞부분(EXIF 헤더)만 받아 촬영 시간을 읽습니다.
+- 이벤트 채널은 항상 바로 읽습니다 (도착 시각이 정확하고 Probe 요청에도 즉시 응답).
+  위치는 이벤트를 받은 순간에 기록해 두므로 처리가 밀려도 촬영 시점 위치가 들어갑니다.
+- 연사로 처리가 밀리면 명령 채널 작업만 줄입니다: 대기열이 --queue장 이상 쌓이면 앞부분 받기를 생략하고
+  ObjectInfo의 촬영 시간만 써서 사진당 왕복 한 번으로 처리합니다. 사진은 하나도 건너뛰지 않습니다.
+- --simulate N: 로컬 PTP/IP 응답기(카메라 흉내)를 띄워 N장 연사를 재현합니다.
+
+위치 소스: --position LAT,LON (고정), --gpx (트랙에서 촬영 시간으로 조회), --gpsd (gpsd 실시간)
+asyncio는 연결할 때 import합니다 (--help 시작 시간 단축).
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from camera_discovery import DEFAULT_CAMERA_IP
+from gpx_track import Fix
+from photo_metadata import build_exif_jpeg, build_exif_tiff, build_xmp, capture_time_from_bytes
+from ptp_protocol import (PTP_CLOSE_SESSION, PTP_EVENT_OBJECT_ADDED, PTP_GET_OBJECT_INFO,
+                          PTP_GET_PARTIAL_OBJECT, PTP_OPEN_SESSION, PTP_RESPONSE_NOT_SUPPORTED,
+                          PTP_RESPONSE_OK, PTPIP_DATA, PTPIP_END_DATA, PTPIP_EVENT, PTPIP_HEADER,
+                          PTPIP_INIT_COMMAND_ACK, PTPIP_INIT_COMMAND_REQUEST, PTPIP_INIT_EVENT_ACK,
+                          PTPIP_INIT_EVENT_REQUEST, PTPIP_INIT_FAIL, PTPIP_OPERATION_REQUEST,
+                          PTPIP_OPERATION_RESPONSE, PTPIP_PORT, PTPIP_PROBE_REQUEST,
+                          PTPIP_PROBE_RESPONSE, PTPIP_START_DATA, PTPIP_VERSION, build_object_info,
+                          event_name, operation_name, packet_type_name, parse_object_info,
+                          parse_ptp_datetime, response_name)
+
+CLIENT_GUID = b'PhotoPinMobile__'
+CLIENT_NAME = "PhotoPin"
+HEADER_BYTES = 64 * 1024       # EXIF를 찾기 위해 받을 파일 앞부분 크기
+DEFAULT_QUEUE = 32             # 이만큼 밀리면 앞부분 받기 생략 (ObjectInfo만 받음)
+MAX_PACKET = 64 * 1024 * 1024  # 비정상 길이 방어
+GPSD_ADDRESS = ('127.0.0.1', 2947)
+GPSD_MAX_AGE = 10.0            # 이보다 오래된 gpsd 위치는 사용하지 않음 (초)
+
+
+class PTPIPError(Exception):
+    """PTP/IP 연결/프로토콜 오류"""
+
+
+class GpsdError(Exception):
+    """gpsd 연결 실패"""
+
+
+def _packet(packet_type: int, body: bytes = b'') -> bytes:
+    return PTPIP_HEADER.pack(PTPIP_HEADER.size + len(body), packet_type) + body
+
+
+async def _read_packet(reader: 'asyncio.StreamReader') -> Tuple[int, bytes]:
+    header = await reader.readexactly(PTPIP_HEADER.size)
+    length, packet_type = PTPIP_HEADER.unpack(header)
+    if length < PTPIP_HEADER.size or length > MAX_PACKET:
+        raise PTPIPError(f"잘못된 패킷 길이: {length}")
+    return packet_type, await reader.readexactly(length - PTPIP_HEADER.size)
+
+
+def _operation(code: int, transaction_id: int, params: Tuple[int, ...] = ()) -> bytes:
+    # 데이터 단계 1 = 호스트 → 카메라 데이터 없음
+    return _packet(PTPIP_OPERATION_REQUEST,
+                   struct.pack(f'<IHI{len(params)}I', 1, code, transaction_id, *params))
+
+
+def _unpack_params(body: bytes, start: int) -> Tuple[int, ...]:
+    count = (len(body) - start) // 4
+    return struct.unpack_from(f'<{count}I', body, start)
+
+
+class PTPIPClient:
+    """PTP/IP 호스트 (명령 채널 + 이벤트 채널)"""
+
+    def __init__(self, host: str, port: int = PTPIP_PORT, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.transaction_id = 0
+        self.command = None
+        self.event = None
+        self.camera_name = ''
+        # 트랜잭션 ID → 받은 패킷 큐 (명령 채널은 _dispatch 태스크 하나만 읽음)
+        self.inbox: Dict[int, 'asyncio.Queue'] = {}
+        self.dispatcher = None
+        self.broken: Optional[PTPIPError] = None
+
+    async def connect(self):
+        """Init Command/Event 교환 후 세션 열기"""
+        import asyncio
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        writer.write(_packet(PTPIP_INIT_COMMAND_REQUEST, CLIENT_GUID
+                             + (CLIENT_NAME + '\0').encode('utf-16le')
+                             + struct.pack('<I', PTPIP_VERSION)))
+        packet_type, body = await asyncio.wait_for(_read_packet(reader), self.timeout)
+        if packet_type == PTPIP_INIT_FAIL:
+            writer.close()
+            raise PTPIPError("카메라가 연결을 거부했습니다 (InitFail) - 카메라에서 페어링 허용 필요")
+        if packet_type != PTPIP_INIT_COMMAND_ACK:
+            writer.close()
+            raise PTPIPError(f"예상하지 못한 응답: {packet_type_name(packet_type)}")
+        connection_number, = struct.unpack_from('<I', body)
+        self.camera_name = body[20:-4].decode('utf-16le', 'ignore').rstrip('\0')
+        self.command = (reader, writer)
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        writer.write(_packet(PTPIP_INIT_EVENT_REQUEST, struct.pack('<I', connection_number)))
+        packet_type, _ = await asyncio.wait_for(_read_packet(reader), self.timeout)
+        if packet_type != PTPIP_INIT_EVENT_ACK:
+            writer.close()
+            raise PTPIPError(f"이벤트 채널 연결 실패: {packet_type_name(packet_type)}")
+        self.event = (reader, writer)
+        self.dispatcher = asyncio.ensure_future(self._dispatch(self.command[0]))
+
+        # OpenSession의 트랜잭션 ID는 0
+        code, _, _ = await self.transaction(PTP_OPEN_SESSION, (1,))
+        if code != PTP_RESPONSE_OK:
+            raise PTPIPError(f"OpenSession 실패: {response_name(code)}")
+
+    async def _dispatch(self, reader: 'asyncio.StreamReader'):
+        """명령 채널 수신: 패킷을 트랜잭션 ID로 나눠 전달 (시간 초과로 포기한 트랜잭션의 늦은 패킷은 버림)"""
+        import asyncio
+        try:
+            while True:
+                packet_type, body = await _read_packet(reader)
+                if packet_type == PTPIP_OPERATION_RESPONSE:
+                    offset = 2    # 응답 코드 다음이 트랜잭션 ID
+                elif packet_type in (PTPIP_START_DATA, PTPIP_DATA, PTPIP_END_DATA):
+                    offset = 0
+                else:
+                    print(f"  · 명령 채널 패킷 무시: {packet_type_name(packet_type)}")
+                    continue
+                if len(body) < offset + 4:
+                    continue
+                transaction_id, = struct.unpack_from('<I', body, offset)
+                inbox = self.inbox.get(transaction_id)
+                if inbox is not None:
+                    inbox.put_nowait((packet_type, body))
+        except (asyncio.IncompleteReadError, OSError, PTPIPError) as e:
+            self.broken = e if isinstance(e, PTPIPError) else PTPIPError(f"명령 채널 연결 끊김: {e!r}")
+            for inbox in self.inbox.values():
+                inbox.put_nowait((None, b''))
+
+    async def transaction(self, code: int, params: Tuple[int, ...] = ()) -> Tuple[int, Tuple[int, ...], bytes]:
+        """명령 하나 실행 → (응답 코드, 응답 파라미터, 카메라가 보낸 데이터)
+
+        응답이 timeout 안에 오지 않으면 PTPIPError. 연결은 그대로 쓸 수 있으며
+        그 트랜잭션의 늦은 응답은 _dispatch가 버립니다.
+        """
+        import asyncio
+        if self.broken is not None:
+            raise self.broken
+        _, writer = self.command
+        transaction_id = self.transaction_id
+        self.transaction_id += 1
+        inbox = self.inbox[transaction_id] = asyncio.Queue()
+        try:
+            writer.write(_operation(code, transaction_id, params))
+            await writer.drain()
+
+            chunks = []
+            while True:
+                try:
+                    packet_type, body = await asyncio.wait_for(inbox.get(), self.timeout)
+                except asyncio.TimeoutError:
+                    raise PTPIPError(f"{operation_name(code)} 응답 시간 초과 ({self.timeout:g}초)")
+                if packet_type is None:
+                    raise self.broken
+                if packet_type in (PTPIP_DATA, PTPIP_END_DATA):
+                    chunks.append(body[4:])  # 트랜잭션 ID 이후가 데이터
+                elif packet_type == PTPIP_OPERATION_RESPONSE:
+                    response, _ = struct.unpack_from('<HI', body)
+                    return response, _unpack_params(body, 6), b''.join(chunks)
+        finally:
+            del self.inbox[transaction_id]
+
+    async def get_object_info(self, handle: int) -> Dict:
+        code, _, data = await self.transaction(PTP_GET_OBJECT_INFO, (handle,))
+        if code != PTP_RESPONSE_OK:
+            raise PTPIPError(f"GetObjectInfo 실패: {response_name(code)}")
+        return parse_object_info(data)
+
+    async def get_partial_object(self, handle: int, offset: int, size: int) -> bytes:
+        code, _, data = await self.transaction(PTP_GET_PARTIAL_OBJECT, (handle, offset, size))
+        if code != PTP_RESPONSE_OK:
+            raise PTPIPError(f"GetPartialObject 실패: {response_name(code)}")
+        return data
+
+    async def events(self):
+        """이벤트 채널의 (이벤트 코드, 파라미터) 비동기 반복 (Probe 요청에는 자동 응답)"""
+        import asyncio
+        reader, writer = self.event
+        while True:
+            try:
+                packet_type, body = await _read_packet(reader)
+            except asyncio.IncompleteReadError:
+                return
+            if packet_type == PTPIP_PROBE_REQUEST:
+                writer.write(_packet(PTPIP_PROBE_RESPONSE))
+                continue
+            if packet_type == PTPIP_EVENT and len(body) >= 6:
+                code, _ = struct.unpack_from('<HI', body)
+                yield code, _unpack_params(body, 6)
+
+    async def close(self):
+        import asyncio
+        if self.command is not None:
+            try:
+                await asyncio.wait_for(self.transaction(PTP_CLOSE_SESSION), 1.0)
+            except (OSError, PTPIPError, asyncio.TimeoutError):
+                pass
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            self.dispatcher = None
+        for channel in (self.command, self.event):
+            if channel is not None:
+                channel[1].close()
+        self.command = self.event = None
+
+
+class FixedPosition:
+    """고정 위치 (삼각대 촬영 등)"""
+
+    by_capture_time = False
+
+    def __init__(self, lat: float, lon: float, ele: Optional[float] = None):
+        self.fix = Fix(lat, lon, ele, 0.0, 'fixed', 'exact', 0.0)
+
+    def current(self, t: float) -> Optional[Fix]:
+        return self.fix
+
+
+class TrackPosition:
+    """GPX 트랙에서 시간으로 조회 (로거가 기록 중인 트랙 또는 재현)"""
+
+    by_capture_time = True
+
+    def __init__(self, store):
+        self.store = store
+
+    def current(self, t: float) -> Optional[Fix]:
+        return self.store.lookup(t)
+
+
+class GpsdPosition:
+    """gpsd JSON 스트림의 최신 위치"""
+
+    by_capture_time = False
+
+    def __init__(self, address: Tuple[str, int] = GPSD_ADDRESS, max_age: float = GPSD_MAX_AGE):
+        self.address = address
+        self.max_age = max_age
+        self.last = None
+        self.received = None
+        self.stream = None
+
+    async def connect(self, timeout: float = 5.0):
+        """gpsd에 연결하고 위치 보고 요청 (카메라 연결 전에 호출해 gpsd가 없으면 바로 실패)"""
+        import asyncio
+        host, port = self.address
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise GpsdError(f"{host}:{port}에 연결할 수 없습니다 ({e or '시간 초과'})")
+        writer.write(b'?WATCH={"enable":true,"json":true};\n')
+        self.stream = (reader, writer)
+
+    async def run(self):
+        """connect() 후 위치 보고를 계속 읽음 (연결이 끊기면 알리고 종료)"""
+        reader, writer = self.stream
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    print(f"  ⚠️ gpsd 연결이 끊겼습니다 - 마지막 위치는 {self.max_age:g}초까지만 사용합니다")
+                    return
+                try:
+                    report = json.loads(line)
+                except ValueError:
+                    continue
+                if report.get('class') == 'TPV' and report.get('mode', 0) >= 2 and 'lat' in report:
+                    error = max(report.get('epx', 0.0), report.get('epy', 0.0)) or 0.0
+                    self.last = Fix(report['lat'], report['lon'], report.get('altMSL', report.get('alt')),
+                                    error, 'gpsd', 'exact', 0.0)
+                    self.received = time.monotonic()
+        except (OSError, ValueError) as e:
+            # ValueError: 한 줄이 스트림 버퍼 한도를 넘음
+            print(f"  ⚠️ gpsd 읽기 오류: {e} - 마지막 위치는 {self.max_age:g}초까지만 사용합니다")
+        finally:
+            writer.close()
+
+    def current(self, t: float) -> Optional[Fix]:
+        if self.last is None or time.monotonic() - self.received > self.max_age:
+            return None
+        return self.last._replace(offset=time.monotonic() - self.received)
+
+
+class LiveGeotagger:
+    """ObjectAdded 이벤트마다 XMP 사이드카 기록"""
+
+    def __init__(self, client: PTPIPClient, position, output_dir: str,
+                 queue_size: int = DEFAULT_QUEUE, header_bytes: int = HEADER_BYTES, tz=None):
+        import asyncio
+        self.client = client
+        self.position = position
+        self.output_dir = output_dir
+        self.header_bytes = header_bytes
+        self.tz = tz
+        self.queue_size = max(1, queue_size)
+        # (핸들, 도착 monotonic, 도착 시각, 도착 시점 위치) - 명령 채널 작업 대기열 (상한 없음)
+        self.pending = deque()
+        self.wakeup = asyncio.Event()
+        self.latencies: List[float] = []
+        self.max_backlog = 0
+        self.tagged = 0
+        self.skipped = 0
+        self.no_fix = 0
+        self.quick = 0
+
+    async def _receive(self, limit: Optional[int]):
+        """이벤트 읽기: 대기열과 상관없이 계속 읽고, 도착 즉시 시각과 위치를 기록"""
+        received = 0
+        try:
+            async for code, params in self.client.events():
+                if code != PTP_EVENT_OBJECT_ADDED or not params:
+                    print(f"  · {event_name(code)}")
+                    continue
+                arrived = time.monotonic()
+                now = time.time()
+                self._enqueue((params[0], arrived, now, self.position.current(now)))
+                received += 1
+                if limit is not None and received >= limit:
+                    break
+        finally:
+            self.wakeup.set()
+
+    def _enqueue(self, item: Tuple):
+        # 밀려도 버리지 않음: 항목은 작고, 처리 속도는 run()의 빠른 경로로 맞춤
+        self.pending.append(item)
+        self.max_backlog = max(self.max_backlog, len(self.pending))
+        self.wakeup.set()
+
+    def _capture_time(self, header: bytes, info: Dict, fallback: float) -> float:
+        t = capture_time_from_bytes(header, self.tz)
+        if t is not None:
+            return t
+        dt = parse_ptp_datetime(info.get('capture_date', ''))
+        if dt is not None:
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=self.tz) if self.tz else dt.astimezone()
+            return dt.timestamp()
+        return fallback
+
+    async def _process(self, handle: int, arrived: float, wallclock: float, event_fix: Optional[Fix],
+                       quick: bool = False):
+        info = await self.client.get_object_info(handle)
+        if quick:
+            # 밀려 있을 때는 앞부분 받기를 생략하고 ObjectInfo의 촬영 시간 사용
+            header = b''
+            self.quick += 1
+        else:
+            header = await self.client.get_partial_object(handle, 0, min(self.header_bytes, info['size'] or self.header_bytes))
+        t = self._capture_time(header, info, wallclock)
+
+        # 트랙은 촬영 시간으로 조회, 실시간 소스는 이벤트 도착 시점 위치 (처리가 밀려도 촬영 시점 위치)
+        fix = self.position.current(t) if self.position.by_capture_time else event_fix
+        name = os.path.splitext(info['filename'] or f"OBJ_{handle:08X}")[0] + '.xmp'
+        if fix is None:
+            self.no_fix += 1
+            print(f"  ⚠️ {info['filename']}: 위치 없음")
+            return
+        try:
+            with open(os.path.join(self.output_dir, name), 'x', encoding='utf-8') as f:
+                f.write(build_xmp(fix.lat, fix.lon, fix.ele, t))
+        except FileExistsError:
+            self.skipped += 1
+            return
+        latency = time.monotonic() - arrived
+        self.latencies.append(latency)
+        self.tagged += 1
+        print(f"  📍 {info['filename']} → {name} ({fix.lat:.6f}, {fix.lon:.6f}) "
+              f"{latency * 1000:.0f}ms, 대기 {len(self.pending)}")
+
+    async def run(self, limit: Optional[int] = None):
+        """이벤트를 받아 처리 (limit장 받은 뒤 또는 연결이 끊기면 남은 대기열까지 처리하고 종료)"""
+        import asyncio
+        os.makedirs(self.output_dir, exist_ok=True)
+        receiver = asyncio.ensure_future(self._receive(limit))
+        try:
+            while True:
+                if not self.pending:
+                    if receiver.done():
+                        break
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                item = self.pending.popleft()
+                # 밀려 있으면 ObjectInfo만 받아 사진당 왕복을 줄임 (백프레셔)
+                quick = len(self.pending) >= self.queue_size
+                try:
+                    await self._process(*item, quick)
+                except (PTPIPError, OSError, asyncio.TimeoutError, struct.error) as e:
+                    # struct.error: 잘린 ObjectInfo 등 카메라가 보낸 데이터 오류
+                    print(f"  ❌ 오브젝트 0x{item[0]:08X} 처리 실패: {e}")
+        finally:
+            receiver.cancel()
+        receiver.result()  # 이벤트 채널 오류 전달
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        return {
+            'tagged': self.tagged,
+            'skipped': self.skipped,
+            'no_fix': self.no_fix,
+            'quick': self.quick,
+            'max_backlog': self.max_backlog,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else None,
+            'latency_p95': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+            'latency_max': latencies[-1] if latencies else None,
+        }
+
+
+class PTPIPResponder:
+    """테스트용 로컬 PTP/IP 응답기 (카메라 흉내)
+
+    add_object()로 사진을 추가하면 이벤트 채널로 ObjectAdded를 보냅니다.
+    delay를 주면 명령마다 그만큼 늦게 응답합니다 (느린 카메라/WiFi 재현).
+    """
+
+    def __init__(self, name: str = "X2D II 100C (simulated)", delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.objects: Dict[int, Tuple[str, bytes, str]] = {}
+        self.next_handle = 1
+        self.event_writers = []
+        self.handlers = set()
+        self.server = None
+        self.operations = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        import asyncio
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        import asyncio
+        if self.server is not None:
+            self.server.close()
+        for writer in self.event_writers:
+            writer.close()
+        # 연결 처리 태스크가 끝날 때까지 대기 (루프 종료 시 취소되지 않도록)
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    def add_object(self, filename: str, data: bytes, capture_date: str = '') -> int:
+        handle = self.next_handle
+        self.next_handle += 1
+        self.objects[handle] = (filename, data, capture_date)
+        event = _packet(PTPIP_EVENT, struct.pack('<HII', PTP_EVENT_OBJECT_ADDED, 0xFFFFFFFF, handle))
+        for writer in self.event_writers:
+            writer.write(event)
+        return handle
+
+    def _send_data(self, writer, transaction_id: int, data: bytes):
+        writer.write(_packet(PTPIP_START_DATA, struct.pack('<IQ', transaction_id, len(data))))
+        writer.write(_packet(PTPIP_END_DATA, struct.pack('<I', transaction_id) + data))
+
+    async def _handle(self, reader, writer):
+        import asyncio
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            packet_type, body = await _read_packet(reader)
+            if packet_type == PTPIP_INIT_EVENT_REQUEST:
+                writer.write(_packet(PTPIP_INIT_EVENT_ACK))
+                self.event_writers.append(writer)
+                await reader.read()  # 연결이 끊길 때까지 유지
+                return
+            if packet_type != PTPIP_INIT_COMMAND_REQUEST:
+                writer.write(_packet(PTPIP_INIT_FAIL, struct.pack('<I', 1)))
+                return
+            writer.write(_packet(PTPIP_INIT_COMMAND_ACK, struct.pack('<I', 1) + b'\0' * 16
+                                 + (self.name + '\0').encode('utf-16le') + struct.pack('<I', PTPIP_VERSION)))
+
+            while True:
+                packet_type, body = await _read_packet(reader)
+                if packet_type != PTPIP_OPERATION_REQUEST:
+                    continue
+                _, code, transaction_id = struct.unpack_from('<IHI', body)
+                params = _unpack_params(body, 10)
+                self.operations += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+                response = PTP_RESPONSE_OK
+                if code == PTP_GET_OBJECT_INFO and params and params[0] in self.objects:
+                    filename, data, capture_date = self.objects[params[0]]
+                    self._send_data(writer, transaction_id,
+                                          build_object_info(filename, len(data), capture_date))
+                elif code == PTP_GET_PARTIAL_OBJECT and len(params) >= 3 and params[0] in self.objects:
+                    data = self.objects[params[0]][1]
+                    self._send_data(writer, transaction_id, data[params[1]:params[1] + params[2]])
+                elif code not in (PTP_OPEN_SESSION, PTP_CLOSE_SESSION):
+                    response = PTP_RESPONSE_NOT_SUPPORTED
+                writer.write(_packet(PTPIP_OPERATION_RESPONSE, struct.pack('<HI', response, transaction_id)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, PTPIPError):
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard(task)
+
+
+async def simulate(geotagger_factory, shots: int, interval: float, delay: float,
+                   raw_size: int = 256 * 1024) -> Dict:
+    """로컬 응답기에 연결해 연사 shots장을 재현"""
+    import asyncio
+    responder = PTPIPResponder(delay=delay)
+    port = await responder.start()
+    client = PTPIPClient('127.0.0.1', port)
+    await client.connect()
+    print(f"🧪 로컬 응답기 127.0.0.1:{port} ({client.camera_name}) - {shots}장 연사, 간격 {interval * 1000:.0f}ms")
+
+    geotagger = geotagger_factory(client)
+    task = asyncio.ensure_future(geotagger.run(limit=shots))
+    await asyncio.sleep(0)  # 이벤트 읽기 시작
+    for i in range(shots):
+        stamp = time.localtime()
+        exif_time = time.strftime('%Y:%m:%d %H:%M:%S', stamp)
+        if i % 2:
+            data = build_exif_tiff(exif_time, padding=raw_size)
+            filename = f"B{i:07d}.3FR"
+        else:
+            data = build_exif_jpeg(exif_time, padding=raw_size // 8)
+            filename = f"B{i:07d}.JPG"
+        responder.add_object(filename, data, time.strftime('%Y%m%dT%H%M%S', stamp))
+        await asyncio.sleep(interval)
+    await task
+    await client.close()
+    await responder.stop()
+    return geotagger.summary()
+
+
+def _print_summary(summary: Dict):
+    print(f"\n📊 XMP 기록: {summary['tagged']}개")
+    if summary['skipped']:
+        print(f"  ⏭️ 이미 있음: {summary['skipped']}개")
+    if summary['no_fix']:
+        print(f"  ⚠️ 위치 없음: {summary['no_fix']}개")
+    if summary['quick']:
+        print(f"  ⏩ 밀려서 ObjectInfo 촬영 시간 사용: {summary['quick']}개")
+    if summary['latency_avg'] is not None:
+        print(f"  이벤트 → XMP 지연: 평균 {summary['latency_avg'] * 1000:.0f}ms, "
+              f"p95 {summary['latency_p95'] * 1000:.0f}ms, 최대 {summary['latency_max'] * 1000:.0f}ms")
+    print(f"  최대 대기열: {summary['max_backlog']}장")
+
+
+async def _run(args, position):
+    import asyncio
+    tz = None
+    if args.tz:
+        from timeline_merge import parse_tz
+        tz = parse_tz(args.tz)
+
+    def make_geotagger(client):
+        return LiveGeotagger(client, position, args.output, args.queue, args.header_bytes, tz)
+
+    gpsd_task = None
+    if isinstance(position, GpsdPosition):
+        await position.connect()
+        gpsd_task = asyncio.ensure_future(position.run())
+
+    try:
+        if args.simulate:
+            summary = await simulate(make_geotagger, args.simulate, args.interval, args.delay)
+        else:
+            client = PTPIPClient(args.ip, args.port)
+            await client.connect()
+            print(f"✅ {args.ip}:{args.port} 연결됨 ({client.camera_name or '이름 없음'}) - 촬영을 기다립니다 (Ctrl+C 종료)")
+            geotagger = make_geotagger(client)
+            try:
+                await geotagger.run()
+            finally:
+                await client.close()
+            summary = geotagger.summary()
+    finally:
+        if gpsd_task is not None:
+            gpsd_task.cancel()
+    _print_summary(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="PTP/IP 이벤트로 촬영 즉시 XMP 사이드카 기록 (실시간 지오태깅)",
+        epilog="예: python3 ptpip_live.py --gpsd -o ~/Pictures/xmp\n"
+               "    python3 ptpip_live.py --simulate 50 --interval 0.05 --position 37.5665,126.9780",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ip', default=DEFAULT_CAMERA_IP, help=f"카메라 IP (기본: {DEFAULT_CAMERA_IP})")
+    parser.add_argument('--port', type=int, default=PTPIP_PORT, help=f"PTP/IP 포트 (기본: {PTPIP_PORT})")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--position', metavar='LAT,LON', help="고정 위치")
+    source.add_argument('--gpx', action='append', help="GPX 트랙 (촬영 시간으로 조회, 여러 개 병합)")
+    source.add_argument('--gpsd', nargs='?', const='127.0.0.1:2947', metavar='HOST:PORT',
+                        help="gpsd 실시간 위치 (기본 127.0.0.1:2947)")
+    parser.add_argument('-o', '--output', default='xmp', help="XMP 저장 폴더 (기본: ./xmp)")
+    parser.add_argument('--queue', type=int, default=DEFAULT_QUEUE,
+                        help=f"이만큼 밀리면 파일 앞부분 받기를 생략 (사진은 건너뛰지 않음, 기본 {DEFAULT_QUEUE})")
+    parser.add_argument('--header-bytes', type=int, default=HEADER_BYTES,
+                        help=f"EXIF를 읽을 파일 앞부분 크기 (기본 {HEADER_BYTES})")
+    parser.add_argument('--tz', help="EXIF에 시간대가 없을 때 카메라 시간대 (예: +09:00)")
+    parser.add_argument('--simulate', type=int, metavar='N', help="로컬 응답기로 N장 연사 재현")
+    parser.add_argument('--interval', type=float, default=0.1, help="--simulate 촬영 간격 (초)")
+    parser.add_argument('--delay', type=float, default=0.0, help="--simulate 카메라 명령 응답 지연 (초)")
+    args = parser.parse_args()
+
+    try:
+        if args.position:
+            lat, lon = (float(v) for v in args.position.split(','))
+            position = FixedPosition(lat, lon)
+        elif args.gpx:
+            from gpx_track import TrackStore
+            position = TrackPosition(TrackStore.from_files(args.gpx))
+        else:
+            host, _, port = args.gpsd.rpartition(':')
+            position = GpsdPosition((host or '127.0.0.1', int(port)))
+    except FileNotFoundError as e:
+        print(f"❌ 파일을 찾을 수 없습니다: {e.filename}")
+        sys.exit(1)
+    except ValueError as e:
+        parser.error(f"위치 소스 오류: {e}")
+
+    # asyncio는 실제로 연결할 때만 import (--help 시작 시간 단축)
+    import asyncio
+    try:
+        asyncio.run(_run(args, position))
+    except (OSError, asyncio.TimeoutError) as e:
+        print(f"❌ 카메라 연결 실패: {e or '시간 초과'}")
+        print("   camera_discovery.py로 카메라 IP를 확인하세요")
+        sys.exit(1)
+    except PTPIPError as e:
+        print(f"❌ PTP/IP 오류: {e}")
+        sys.exit(1)
+    except GpsdError as e:
+        print(f"❌ gpsd 연결 실패: {e}")
+        print("   gpsd가 실행 중인지 확인하세요 (예: gpsd -N /dev/tty.usbserial)")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⏹️ 중단됨")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+분석 결과 캐시
+같은 캡처를 반복 분석할 때 파싱을 건너뛰도록, 파싱된 이벤트 스트림을 디스크에 저장합니다.
+
+  - 키: 파일 내용 해시(SHA-256) + 분석기 이름/버전 + 옵션
+  - 형식: 키 구성이 같은 레코드는 값만 모아 marshal로 직렬화하고 블록 단위로 zlib 압축
+  - 용량: 최대 크기를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+  - 동시 실행: 임시 파일에 기록한 뒤 os.replace로 교체, 정리 작업은 파일 잠금으로 직렬화
+
+캐시는 기본으로 꺼져 있습니다 (작은 캡처는 해시 계산이 파싱보다 느릴 수 있음).
+분석기에 --cache를 주거나 PHOTOPIN_CACHE=1을 설정하면 사용합니다 (--no-cache로 다시 끔).
+캐시 위치는 PHOTOPIN_CACHE_DIR (기본 ~/.cache/photopin),
+최대 크기는 PHOTOPIN_CACHE_SIZE (MB, 기본 512)로 바꿀 수 있습니다.
+"""
+
+import argparse
+import itertools
+import json
+import marshal
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# hashlib/tempfile은 캐시를 실제로 사용할 때만 import (--help 등 시작 시간 단축)
+
+try:
+    import fcntl
+except ImportError:  # Windows: 잠금 없이 정리 (임시 파일 + 교체는 그대로 안전)
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'photopin')
+DEFAULT_MAX_MB = 512
+
+MAGIC = b'PPRC'
+# marshal 형식은 Python 버전마다 다를 수 있으므로 형식 버전에 포함
+FORMAT_VERSION = 1 + (sys.version_info[0] * 100 + sys.version_info[1]) * 16
+ENTRY_SUFFIX = '.ppc'
+
+BLOCK_RECORDS = 8192           # 압축 블록당 레코드 수
+MARSHAL_VERSION = 4
+STALE_TMP_SECONDS = 3600       # 중단된 작업이 남긴 임시 파일 정리 기준
+
+_HEADER = struct.Struct('<4sI')
+_BLOCK = struct.Struct('<I')
+
+
+class CacheFormatError(Exception):
+    """캐시 항목이 손상되었거나 형식이 다름"""
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """파일 내용의 SHA-256 (압축 파일은 압축된 바이트 기준)"""
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Encoder:
+    """레코드 → 블록
+
+    같은 키 구성(shape)의 레코드는 키 목록을 한 번만 저장하고 값 tuple만 기록합니다.
+    블록은 marshal로 직렬화하므로 인코딩/디코딩 모두 C 속도로 처리됩니다.
+    """
+
+    def __init__(self):
+        self.shapes = {}
+        self.new_shapes = []
+        self.rows = []
+
+    def record(self, record: Dict):
+        keys = tuple(record)
+        shape = self.shapes.get(keys)
+        if shape is None:
+            shape = self.shapes[keys] = len(self.shapes)
+            self.new_shapes.append(keys)
+        self.rows.append((shape, tuple(record.values())))
+
+    def block(self) -> bytes:
+        try:
+            data = marshal.dumps((self.new_shapes, self.rows), MARSHAL_VERSION)
+        except ValueError as e:
+            raise TypeError(f"캐시에 저장할 수 없는 값이 있습니다: {e}")
+        self.new_shapes = []
+        self.rows = []
+        return zlib.compress(data, 6)
+
+
+class _Decoder:
+    """블록 → 레코드"""
+
+    def __init__(self):
+        self.shapes = []
+
+    def records(self, block: bytes) -> List[Dict]:
+        try:
+            new_shapes, rows = marshal.loads(zlib.decompress(block))
+        except (zlib.error, EOFError, ValueError, TypeError) as e:
+            raise CacheFormatError(f"블록 해석 실패: {e}")
+        shapes = self.shapes
+        shapes.extend(new_shapes)
+        return [dict(zip(shapes[shape], values)) for shape, values in rows]
+
+
+class CacheEntryWriter:
+    """캐시 항목 기록기 (commit 전까지는 임시 파일에만 기록)"""
+
+    def __init__(self, cache: 'ResultCache', path: str):
+        import tempfile
+        self.cache = cache
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=os.path.dirname(path))
+        self.f = os.fdopen(fd, 'wb')
+        self.f.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+        self.encoder = _Encoder()
+        self.records = 0
+
+    def write(self, record: Dict):
+        self.encoder.record(record)
+        self.records += 1
+        if len(self.encoder.rows) >= BLOCK_RECORDS:
+            self._flush()
+
+    def _flush(self):
+        data = self.encoder.block()
+        self.f.write(_BLOCK.pack(len(data)))
+        self.f.write(data)
+
+    def commit(self):
+        """완성된 항목을 캐시에 등록 (같은 키를 동시에 기록해도 마지막 하나가 온전히 남음)"""
+        if self.f is None:
+            return
+        if self.encoder.rows:
+            self._flush()
+        self.f.write(_BLOCK.pack(0))  # 끝 표시 (없으면 불완전한 항목)
+        self.f.close()
+        self.f = None
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict()
+
+    def discard(self):
+        """기록 중단 (임시 파일 삭제)"""
+        if self.f is None:
+            return
+        self.f.close()
+        self.f = None
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+
+def _read_blocks(f) -> Iterator[List[Dict]]:
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size or _HEADER.unpack(header) != (MAGIC, FORMAT_VERSION):
+        raise CacheFormatError("캐시 항목 헤더가 다릅니다")
+    decoder = _Decoder()
+    while True:
+        size_bytes = f.read(_BLOCK.size)
+        if len(size_bytes) != _BLOCK.size:
+            raise CacheFormatError("캐시 항목이 잘렸습니다")
+        size = _BLOCK.unpack(size_bytes)[0]
+        if size == 0:
+            return
+        data = f.read(size)
+        if len(data) != size:
+            raise CacheFormatError("캐시 항목이 잘렸습니다")
+        yield decoder.records(data)
+
+
+class ResultCache:
+    """내용 주소 기반 분석 결과 캐시"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or os.environ.get('PHOTOPIN_CACHE_DIR') or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('PHOTOPIN_CACHE_SIZE', DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+
+    def key(self, filepath: str, analyzer: str, version, options: Optional[Dict] = None) -> str:
+        """캐시 키 (파일 내용, 분석기 버전, 옵션 중 하나라도 바뀌면 달라짐)"""
+        import hashlib
+        material = json.dumps([FORMAT_VERSION, analyzer, version, options or {}, file_digest(filepath)],
+                              sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def load(self, key: str) -> Optional[Iterator[Dict]]:
+        """캐시된 레코드를 하나씩 읽는 iterator (없으면 None)
+
+        항목 전체를 메모리에 올리지 않습니다. 읽는 도중 손상이 발견되면 CacheFormatError가 발생합니다.
+        """
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # LRU 순서 갱신 (수정 시간을 마지막 사용 시간으로 사용)
+        except OSError:
+            pass
+
+        def blocks():
+            with f:
+                yield from _read_blocks(f)
+        return itertools.chain.from_iterable(blocks())
+
+    def store(self, key: str) -> CacheEntryWriter:
+        """새 항목 기록기 (with 블록이 정상 종료되면 등록, 예외가 나면 폐기)"""
+        return CacheEntryWriter(self, self._path(key))
+
+    def _remove(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        """(마지막 사용 시간, 크기, 경로) 목록과 오래된 임시 파일 목록"""
+        entries = []
+        stale = []
+        now = time.time()
+        try:
+            subdirs = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return entries, stale
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                elif entry.name.endswith('.tmp') and now - st.st_mtime > STALE_TMP_SECONDS:
+                    stale.append(entry.path)
+        return entries, stale
+
+    def _locked(self, func: Callable):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return func()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def evict(self) -> int:
+        """최대 크기를 넘으면 오래 사용하지 않은 항목부터 삭제 (삭제한 항목 수 반환)
+
+        읽는 중인 항목이 삭제되어도 이미 열린 파일은 끝까지 읽을 수 있습니다 (POSIX).
+        """
+        def run():
+            entries, stale = self._entries()
+            for path in stale:
+                self._remove(path)
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            return removed
+        return self._locked(run)
+
+    def stats(self) -> Dict:
+        entries, _ = self._entries()
+        return {
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+    def clear(self) -> int:
+        def run():
+            entries, stale = self._entries()
+            for _, _, path in entries:
+                self._remove(path)
+            for path in stale:
+                self._remove(path)
+            return len(entries)
+        return self._locked(run)
+
+
+def cached_records(cache: Optional[ResultCache], key: Optional[str],
+                   produce: Callable[[], Iterable[Dict]]) -> Iterator[Dict]:
+    """캐시에 있으면 저장된 레코드를, 없으면 produce()의 레코드를 반환하면서 캐시에 기록
+
+    produce()를 끝까지 읽은 경우에만 항목이 등록됩니다.
+    """
+    if cache is None:
+        yield from produce()
+        return
+    records = cache.load(key)
+    if records is not None:
+        try:
+            first = next(records, None)
+        except CacheFormatError:
+            cache._remove(cache._path(key))
+        else:
+            # 첫 블록이 정상이면 캐시 사용 (이후 블록이 손상되었으면 항목을 지우고 예외로 알림)
+            if first is not None:
+                yield first
+            try:
+                yield from records
+            except CacheFormatError:
+                cache._remove(cache._path(key))
+                raise
+            return
+    with cache.store(key) as entry:
+        for record in produce():
+            entry.write(record)
+            yield record
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """분석기 CLI 공통 캐시 옵션 (캐시는 --cache 또는 PHOTOPIN_CACHE=1일 때만 사용)"""
+    parser.add_argument('--cache', action='store_true',
+                        help="파싱 결과 캐시 사용 (같은 큰 캡처를 반복 분석할 때, 환경 변수 PHOTOPIN_CACHE=1과 같음)")
+    parser.add_argument('--no-cache', action='store_true', help="PHOTOPIN_CACHE가 설정되어 있어도 캐시를 사용하지 않음")
+    parser.add_argument('--cache-dir', help=f"캐시 위치 (기본: $PHOTOPIN_CACHE_DIR 또는 {DEFAULT_CACHE_DIR})")
+
+
+def cache_enabled_by_env() -> bool:
+    return os.environ.get('PHOTOPIN_CACHE', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def cache_from_args(args: argparse.Namespace) -> Optional[ResultCache]:
+    if args.no_cache or not (args.cache or cache_enabled_by_env()):
+        return None
+    return ResultCache(args.cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 결과 캐시 관리")
+    parser.add_argument('command', choices=['stats', 'clear', 'evict'], help="stats: 사용량, clear: 전체 삭제, evict: 용량 정리")
+    parser.add_argument('--cache-dir', help=f"캐시 위치 (기본: {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir)
+    if args.command == 'clear':
+        print(f"🗑️ 캐시 항목 {cache.clear()}개 삭제")
+    elif args.command == 'evict':
+        print(f"🗑️ 캐시 항목 {cache.evict()}개 삭제")
+    stats = cache.stats()
+    print(f"📦 캐시: {stats['directory']}")
+    print(f"  항목: {stats['entries']}개, {stats['bytes'] / 1024 / 1024:.1f}MB / {stats['max_bytes'] / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
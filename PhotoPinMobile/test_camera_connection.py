@@ -4,77 +4,40 @@ Hasselblad X2D II 카메라 연결 테스트
 간단한 연결 테스트와 포트 스캔
 """
 
-import socket
-import subprocess
-import sys
+import argparse
+import asyncio
 
-CAMERA_IP = "192.168.2.1"
+from camera_discovery import CAMERA_PORTS, is_reachable, resolve_camera_ip, scan_host
 
-def check_connection():
-    """카메라 연결 확인"""
+def check_connection(host):
+    """카메라 연결 확인 (TCP 프로브, ping 권한 불필요)"""
     print("📡 카메라 연결 확인...")
-    try:
-        result = subprocess.run(
-            ["ping", "-c", "1", "-t", "1", CAMERA_IP],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            print(f"✅ {CAMERA_IP} 연결됨")
-            return True
-        else:
-            print(f"❌ {CAMERA_IP} 연결 안됨")
-            print("💡 Phocus로 WiFi를 먼저 활성화하세요")
-            return False
-    except Exception as e:
-        print(f"⚠️ ping 실패: {e}")
-        return False
+    if asyncio.run(is_reachable(host)):
+        print(f"✅ {host} 연결됨")
+        return True
+    print(f"❌ {host} 연결 안됨")
+    print("💡 Phocus로 WiFi를 먼저 활성화하세요")
+    return False
 
-def quick_port_scan():
-    """주요 포트만 빠르게 스캔"""
+def quick_port_scan(host):
+    """주요 포트를 동시에 스캔"""
     print("\n🔍 포트 스캔 중...")
     
-    # 카메라가 사용할 가능성이 높은 포트
-    ports_to_check = [
-        (80, "HTTP"),
-        (443, "HTTPS"),
-        (8080, "Alternative HTTP"),
-        (8443, "Alternative HTTPS"),
-        (15740, "PTP/IP"),
-        (5353, "mDNS"),
-        (1900, "UPnP"),
-        (9000, "Camera Control"),
-        (554, "RTSP"),
-        (21, "FTP"),
-        (22, "SSH"),
-        (23, "Telnet"),
-        (8008, "HTTP Alt"),
-        (8888, "HTTP Alt2"),
-        (3000, "Dev Server"),
-        (5000, "Flask/Control"),
-    ]
-    
-    open_ports = []
-    
-    for port, description in ports_to_check:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(0.5)
-        result = sock.connect_ex((CAMERA_IP, port))
-        if result == 0:
+    open_ports = asyncio.run(scan_host(host, CAMERA_PORTS))
+    for port, description in CAMERA_PORTS:
+        if port in open_ports:
             print(f"  ✅ 포트 {port:5} 열림 - {description}")
-            open_ports.append(port)
-        sock.close()
     
-    return open_ports
+    return [port for port, _ in CAMERA_PORTS if port in open_ports]
 
-def test_http_port(port):
+def test_http_port(host, port):
     """HTTP GET 요청 테스트"""
     import http.client
     
     print(f"\n🌐 HTTP 테스트 (포트 {port})")
     
     try:
-        conn = http.client.HTTPConnection(CAMERA_IP, port, timeout=2)
+        conn = http.client.HTTPConnection(host, port, timeout=2)
         conn.request("GET", "/")
         response = conn.getresponse()
         
@@ -96,12 +59,19 @@ def test_http_port(port):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Hasselblad X2D II 연결 테스트")
+    parser.add_argument('--ip', help="카메라 IP (생략하면 기본 주소 확인 후 네트워크 탐색)")
+    parser.add_argument('--subnet', help="탐색할 서브넷 (예: 192.168.2.0/24)")
+    args = parser.parse_args()
+    
     print("="*60)
     print("🎯 Hasselblad X2D II 연결 테스트")
     print("="*60)
     
+    camera_ip = resolve_camera_ip(args.ip, args.subnet)
+    
     # 1. 연결 확인
-    if not check_connection():
+    if camera_ip is None or not check_connection(camera_ip):
         print("\n⚠️ 카메라 연결 후 다시 실행하세요")
         print("1. Phocus 2 앱으로 Bluetooth 연결")
         print("2. WiFi가 활성화될 때까지 대기")
@@ -109,7 +79,7 @@ def main():
         return
     
     # 2. 포트 스캔
-    open_ports = quick_port_scan()
+    open_ports = quick_port_scan(camera_ip)
     
     if not open_ports:
         print("\n❌ 열린 포트를 찾을 수 없습니다")
@@ -120,7 +90,7 @@ def main():
     # 3. HTTP 포트 테스트
     http_ports = [p for p in open_ports if p in [80, 443, 8080, 8443, 8008, 8888]]
     for port in http_ports:
-        test_http_port(port)
+        test_http_port(camera_ip, port)
     
     # 4. PTP/IP 포트 확인
     if 15740 in open_ports:
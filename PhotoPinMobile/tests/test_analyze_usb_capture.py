@@ -0,0 +1,125 @@
+"""analyze_usb_capture: PcapWriter로 만든 usbmon 캡처의 명령별 통계 확인"""
+
+import pytest
+
+from analyze_usb_capture import (
+    USB_TRANSFER_BULK, USB_TRANSFER_CONTROL, USB_TRANSFER_INTERRUPT, USBMON_HEADER,
+    analyze_capture,
+)
+from pcap_reader import LINKTYPE_USB_LINUX, PcapWriter
+from ptp_protocol import (
+    PTP_CONTAINER_COMMAND, PTP_CONTAINER_DATA, PTP_CONTAINER_EVENT, PTP_CONTAINER_HEADER,
+    PTP_CONTAINER_RESPONSE, PTP_OPEN_SESSION, PTP_RESPONSE_OK, operation_name,
+)
+
+DEVICE = (1, 5)     # (bus, device)
+BULK_OUT, BULK_IN, INTERRUPT_IN = 0x02, 0x81, 0x83
+STORAGE_IN = 0x84   # Still Image가 아닌 인터페이스의 엔드포인트
+PTP_GET_OBJECT = 0x1009
+PTP_EVENT_OBJECT_ADDED = 0x4002
+OBJECT_SIZE = 100000
+
+
+class UsbmonCapture:
+    """usbmon(linktype 189) 레코드를 pcap으로 기록"""
+
+    def __init__(self, f):
+        self.writer = PcapWriter(f, LINKTYPE_USB_LINUX)
+        self.urb_id = 0
+
+    def record(self, t: float, event: str, transfer_type: int, endpoint: int, length: int,
+               data: bytes = b'', setup: bytes = None, urb_id: int = None):
+        if urb_id is None:
+            self.urb_id += 1
+            urb_id = self.urb_id
+        header = USBMON_HEADER.pack(
+            urb_id, ord(event), transfer_type, endpoint, DEVICE[1], DEVICE[0],
+            0 if setup else 1, 0, int(t), int(t % 1 * 1e6), 0, length, len(data), setup or b'\0' * 8)
+        self.writer.write(t, header + data)
+        return urb_id
+
+    def bulk_out(self, t: float, data: bytes):
+        self.record(t, 'S', USB_TRANSFER_BULK, BULK_OUT, len(data), data)
+
+    def bulk_in(self, t: float, data: bytes, length: int = None, endpoint: int = BULK_IN,
+                transfer_type: int = USB_TRANSFER_BULK):
+        # 제출 이벤트는 데이터 없음, 완료 이벤트에 데이터가 실림
+        urb_id = self.record(t - 0.0001, 'S', transfer_type, endpoint, 0)
+        self.record(t, 'C', transfer_type, endpoint, len(data) if length is None else length, data,
+                    urb_id=urb_id)
+
+
+def container(c_type: int, code: int, transaction_id: int, payload: bytes = b'', length: int = None) -> bytes:
+    size = PTP_CONTAINER_HEADER.size + len(payload) if length is None else length
+    return PTP_CONTAINER_HEADER.pack(size, c_type, code, transaction_id) + payload
+
+
+def config_descriptor() -> bytes:
+    """Still Image 인터페이스(0x81/0x02/0x83) + 대용량 저장 인터페이스(0x84)"""
+    still_image = (bytes([9, 0x04, 0, 0, 3, 0x06, 1, 1, 0])
+                   + bytes([7, 0x05, BULK_IN, 2, 0, 2, 0])
+                   + bytes([7, 0x05, BULK_OUT, 2, 0, 2, 0])
+                   + bytes([7, 0x05, INTERRUPT_IN, 3, 8, 0, 4]))
+    storage = bytes([9, 0x04, 1, 0, 1, 0x08, 6, 0x50, 0]) + bytes([7, 0x05, STORAGE_IN, 2, 0, 2, 0])
+    body = still_image + storage
+    return bytes([9, 0x02, 9 + len(body), 0, 2, 1, 0, 0xC0, 0]) + body
+
+
+@pytest.fixture
+def capture_path(tmp_path):
+    path = tmp_path / 'usbmon.pcap'
+    with open(path, 'wb') as f:
+        capture = UsbmonCapture(f)
+        # GET_DESCRIPTOR(Configuration)
+        descriptor = config_descriptor()
+        urb_id = capture.record(0.0, 'S', USB_TRANSFER_CONTROL, 0x80, len(descriptor),
+                                setup=bytes([0x80, 0x06, 0x00, 0x02, 0, 0, len(descriptor), 0]))
+        capture.record(0.001, 'C', USB_TRANSFER_CONTROL, 0x80, len(descriptor), descriptor, urb_id=urb_id)
+
+        # OpenSession: 10ms
+        capture.bulk_out(1.000, container(PTP_CONTAINER_COMMAND, PTP_OPEN_SESSION, 0, b'\1\0\0\0'))
+        capture.bulk_in(1.010, container(PTP_CONTAINER_RESPONSE, PTP_RESPONSE_OK, 0))
+
+        # 다른 인터페이스의 PTP처럼 보이는 데이터는 무시해야 함
+        capture.bulk_in(1.500, container(PTP_CONTAINER_RESPONSE, PTP_RESPONSE_OK, 7), endpoint=STORAGE_IN)
+
+        # GetObject: 데이터 컨테이너가 bulk 전송 3개에 걸침 (앞 64바이트만 캡처), 500ms
+        capture.bulk_out(2.000, container(PTP_CONTAINER_COMMAND, PTP_GET_OBJECT, 1, b'\1\0\0\0'))
+        total = PTP_CONTAINER_HEADER.size + OBJECT_SIZE
+        first = container(PTP_CONTAINER_DATA, PTP_GET_OBJECT, 1, b'\xff' * 52, length=total)
+        capture.bulk_in(2.100, first, length=65536)
+        capture.bulk_in(2.300, b'\xff' * 64, length=32768)
+        capture.bulk_in(2.400, b'\xff' * 64, length=total - 65536 - 32768)
+        capture.bulk_in(2.500, container(PTP_CONTAINER_RESPONSE, PTP_RESPONSE_OK, 1))
+
+        # 인터럽트 엔드포인트의 ObjectAdded 이벤트
+        capture.bulk_in(3.000, container(PTP_CONTAINER_EVENT, PTP_EVENT_OBJECT_ADDED, 0, b'\1\0\0\0'),
+                        endpoint=INTERRUPT_IN, transfer_type=USB_TRANSFER_INTERRUPT)
+    return str(path)
+
+
+def test_usbmon_operations_and_latency(capture_path):
+    result = analyze_capture(capture_path)
+
+    assert result['still_image_endpoints'] == {'1.5': [BULK_OUT, BULK_IN, INTERRUPT_IN]}
+    assert result['containers'] == 6
+    assert result['responses'] == {'OK': 2}
+    assert result['events'] == {f'Event 0x{PTP_EVENT_OBJECT_ADDED:04X}': 1}
+
+    stats = result['stats']
+    assert set(stats) == {operation_name(PTP_OPEN_SESSION), operation_name(PTP_GET_OBJECT)}
+    open_session = stats[operation_name(PTP_OPEN_SESSION)]
+    assert open_session.count == 1
+    assert open_session.request_bytes == 0      # 명령 컨테이너는 데이터 단계가 아님
+    assert open_session.latency_min == pytest.approx(0.010, abs=1e-6)
+
+    get_object = stats[operation_name(PTP_GET_OBJECT)]
+    assert get_object.count == 1
+    assert get_object.response_bytes == PTP_CONTAINER_HEADER.size + OBJECT_SIZE
+    assert get_object.latency_min == pytest.approx(0.500, abs=1e-6)
+
+
+def test_device_filter(capture_path):
+    result = analyze_capture(capture_path, device=(2, 1))
+    assert result['stats'] == {}
+    assert result['packets'] > 0
@@ -0,0 +1,87 @@
+"""camera_discovery: 루프백 리스너로 DiscoveryService / probe_port 확인"""
+
+import asyncio
+import errno
+import socket
+
+import pytest
+
+import camera_discovery
+from camera_discovery import DiscoveryService, probe_port
+
+SILENT = '192.0.2.1'        # 응답 없는 호스트 (TEST-NET-1, 환경에 따라 거부 응답이 올 수 있어 흉내냄)
+
+
+def _free_port(kind: int = socket.SOCK_STREAM) -> int:
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_discovery_on_loopback(monkeypatch):
+    closed_port = _free_port()
+    real_probe = camera_discovery.probe_port
+
+    async def probe(host, port, timeout=camera_discovery.DEFAULT_TIMEOUT):
+        if host == SILENT:
+            await asyncio.sleep(timeout)
+            return None
+        return await real_probe(host, port, timeout)
+
+    monkeypatch.setattr(camera_discovery, 'probe_port', probe)
+    ssdp_port = _free_port(socket.SOCK_DGRAM)
+
+    async def scenario():
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+        open_port = server.sockets[0].getsockname()[1]
+        service = DiscoveryService(ports=[(open_port, "Test"), (closed_port, "Closed")],
+                                   timeout=0.3, concurrency=2, ssdp_group=('127.0.0.1', ssdp_port))
+        task = asyncio.ensure_future(
+            service.discover(['127.0.0.1', SILENT], listen=0.5, mdns=False, ssdp=True))
+        await asyncio.sleep(0.1)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b'NOTIFY * HTTP/1.1\r\nSERVER: Hasselblad X2D II\r\nUSN: uuid:x2d\r\n\r\n',
+                        ('127.0.0.1', ssdp_port))
+        devices = await task
+        server.close()
+        await server.wait_closed()
+        return open_port, devices
+
+    open_port, devices = asyncio.run(scenario())
+    assert [device.ip for device in devices] == ['127.0.0.1']
+    device = devices[0]
+    assert device.alive
+    assert device.open_ports == {open_port: "Test"}
+    assert device.found_by == {'tcp', 'ssdp'}
+    assert device.ssdp['SERVER'] == 'Hasselblad X2D II'
+    assert device.is_camera
+
+
+def test_probe_retries_when_out_of_descriptors(monkeypatch):
+    port = _free_port()
+    real_open = asyncio.open_connection
+    calls = []
+
+    async def exhausted_twice(*args, **kwargs):
+        calls.append(args)
+        if len(calls) <= 2:
+            raise OSError(errno.EMFILE, "Too many open files")
+        return await real_open(*args, **kwargs)
+
+    monkeypatch.setattr(camera_discovery, 'FD_BACKOFF', 0.01)
+    monkeypatch.setattr(asyncio, 'open_connection', exhausted_twice)
+    # 재시도 후 실제 결과 (닫힌 포트 → False), "응답 없음"(None)이 아님
+    assert asyncio.run(probe_port('127.0.0.1', port)) is False
+    assert len(calls) == 3
+
+
+def test_probe_raises_when_descriptors_stay_exhausted(monkeypatch):
+    async def exhausted(*args, **kwargs):
+        raise OSError(errno.ENFILE, "Too many open files in system")
+
+    monkeypatch.setattr(camera_discovery, 'FD_BACKOFF', 0.01)
+    monkeypatch.setattr(camera_discovery, 'FD_BACKOFF_MAX', 0.04)
+    monkeypatch.setattr(asyncio, 'open_connection', exhausted)
+    with pytest.raises(OSError) as excinfo:
+        asyncio.run(probe_port('127.0.0.1', 9))
+    assert excinfo.value.errno == errno.ENFILE
@@ -0,0 +1,116 @@
+"""ptpip_live: 로컬 PTPIPResponder로 연결/지오태깅/백프레셔 확인"""
+
+import asyncio
+import os
+import time
+import xml.etree.ElementTree as ET
+from datetime import timezone
+
+import pytest
+
+from photo_metadata import build_exif_jpeg
+from ptpip_live import FixedPosition, LiveGeotagger, PTPIPClient, PTPIPError, PTPIPResponder
+
+EXIF_NS = '{http://ns.adobe.com/exif/1.0/}'
+
+
+def _photo(exif_time: str = '2025:01:07 10:15:30') -> bytes:
+    return build_exif_jpeg(exif_time, padding=4096)
+
+
+async def _connected(delay: float = 0.0, timeout: float = 2.0):
+    responder = PTPIPResponder(delay=delay)
+    port = await responder.start()
+    client = PTPIPClient('127.0.0.1', port, timeout=timeout)
+    await client.connect()
+    return responder, client
+
+
+async def _shutdown(responder, client):
+    await client.close()
+    await responder.stop()
+
+
+def test_connect_opens_session():
+    async def scenario():
+        responder, client = await _connected()
+        try:
+            return client.camera_name, responder.operations, client.transaction_id
+        finally:
+            await _shutdown(responder, client)
+
+    name, operations, transaction_id = asyncio.run(scenario())
+    assert name == PTPIPResponder().name
+    assert operations == 1          # OpenSession
+    assert transaction_id == 1
+
+
+def test_object_added_writes_xmp(tmp_path):
+    async def scenario():
+        responder, client = await _connected()
+        geotagger = LiveGeotagger(client, FixedPosition(37.5, 127.25, 38.0), str(tmp_path),
+                                  tz=timezone.utc)
+        task = asyncio.ensure_future(geotagger.run(limit=1))
+        await asyncio.sleep(0.05)   # 이벤트 채널 읽기 시작
+        responder.add_object('B0000001.JPG', _photo(), '20250107T101530')
+        await asyncio.wait_for(task, 5)
+        await _shutdown(responder, client)
+        return geotagger.summary()
+
+    summary = asyncio.run(scenario())
+    assert summary['tagged'] == 1
+    assert summary['quick'] == 0
+    root = ET.parse(os.path.join(tmp_path, 'B0000001.xmp')).getroot()
+    description = root.find('.//{http://www.w3.org/1999/02/22-rdf-syntax-ns#}Description')
+    assert description.find(EXIF_NS + 'GPSLatitude').text == '37,30.000000N'
+    assert description.find(EXIF_NS + 'GPSLongitude').text == '127,15.000000E'
+    assert description.find(EXIF_NS + 'GPSAltitude').text == '380/10'
+    # 촬영 시간은 파일 앞부분의 EXIF에서 읽음
+    assert description.find(EXIF_NS + 'GPSTimeStamp').text == '2025-01-07T10:15:30Z'
+
+
+def test_late_reply_after_timeout_is_discarded():
+    async def scenario():
+        responder, client = await _connected()
+        first = responder.add_object('FIRST.JPG', _photo())
+        second = responder.add_object('SECOND.JPG', _photo())
+        try:
+            responder.delay = 0.3
+            client.timeout = 0.1
+            with pytest.raises(PTPIPError):
+                await client.get_object_info(first)
+            # 늦게 도착하는 FIRST 응답은 버리고 자기 트랜잭션 응답만 받아야 함
+            responder.delay = 0.0
+            client.timeout = 2.0
+            info = await client.get_object_info(second)
+            await asyncio.sleep(0.3)
+            again = await client.get_object_info(second)
+            return info, again
+        finally:
+            await _shutdown(responder, client)
+
+    info, again = asyncio.run(scenario())
+    assert info['filename'] == 'SECOND.JPG'
+    assert again['filename'] == 'SECOND.JPG'
+
+
+def test_backpressure_keeps_every_shot(tmp_path):
+    shots = 12
+
+    async def scenario():
+        responder, client = await _connected(delay=0.02)
+        geotagger = LiveGeotagger(client, FixedPosition(37.5, 127.0), str(tmp_path), queue_size=2)
+        task = asyncio.ensure_future(geotagger.run(limit=shots))
+        await asyncio.sleep(0.05)
+        for i in range(shots):
+            stamp = time.strftime('%Y%m%dT%H%M%S')
+            responder.add_object(f'B{i:07d}.JPG', _photo(), stamp)
+        await asyncio.wait_for(task, 10)
+        await _shutdown(responder, client)
+        return geotagger.summary()
+
+    summary = asyncio.run(scenario())
+    assert summary['tagged'] == shots
+    assert summary['quick'] > 0     # 밀린 사진은 ObjectInfo만 받아 처리
+    assert summary['max_backlog'] > 2
+    assert len(os.listdir(tmp_path)) == shots
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+디버깅 세션 통합 타임라인
+PacketLogger 텍스트 export, log stream NDJSON(Phocus 로그), tcpdump pcap을
+하나의 시간순 이벤트 스트림으로 합칩니다.
+
+각 소스는 스트리밍으로 읽어 UTC epoch 초로 시간을 맞추고(소스별 시계 오차 보정 가능),
+heap 기반 k-way 병합으로 NDJSON에 기록합니다. 어떤 소스도 메모리에 통째로 올리지 않습니다.
+--index 옵션을 주면 시간 → 파일 오프셋 인덱스를 함께 저장해 특정 구간만 바로 읽을 수 있습니다.
+"""
+
+import argparse
+import heapq
+import json
+import re
+import socket
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from analyze_camera_traffic import CAMERA_IP, decode_segment
+from analyze_packets import BLEAnalyzer
+from analyze_phocus_log import iter_phocus_events
+from capture_io import COMPRESSION_SUFFIXES, open_capture
+from ndjson_export import NDJSONWriter
+from pcap_reader import read_packets
+from ptp_protocol import PTPIP_HEADER, PTPIP_PORT, packet_type_name
+
+# 소스 안에서 시간이 조금씩 뒤섞여 있어도 바로잡을 수 있는 버퍼 크기
+REORDER_WINDOW = 1024
+
+# 인덱스 간격 (초)
+INDEX_INTERVAL = 1.0
+
+MONTHS = {m: i for i, m in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1)}
+
+_ISO_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2}):(\d{2})(\.\d+)?\s*(Z|[+-]\d{2}:?\d{2})?')
+_SYSLOG_PATTERN = re.compile(r'\b([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2})(\.\d+)?')
+_TIME_PATTERN = re.compile(r'\b(\d{2}):(\d{2}):(\d{2})(\.\d+)')
+
+
+def parse_tz(value: str) -> timezone:
+    """'+09:00', '-0530', 'Z' 형식을 timezone으로 변환"""
+    if value in ('Z', 'UTC'):
+        return timezone.utc
+    sign = -1 if value[0] == '-' else 1
+    digits = value.lstrip('+-').replace(':', '')
+    return timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:4] or 0)))
+
+
+class TimestampParser:
+    """로그 줄에서 시간을 찾아 epoch 초로 변환 (날짜/시간대가 없는 형식은 기본값 사용)"""
+
+    def __init__(self, tz: Optional[timezone] = None, day: Optional[date] = None):
+        self.tz = tz
+        self.day = day
+        self.last = None
+
+    def _epoch(self, year, month, day, hour, minute, second, fraction, tz) -> float:
+        dt = datetime(year, month, day, hour, minute, second, tzinfo=tz or self.tz)
+        if dt.tzinfo is None:
+            dt = dt.astimezone()  # 시스템 시간대로 해석
+        return dt.timestamp() + (float(fraction) if fraction else 0.0)
+
+    def parse(self, text: str) -> Optional[float]:
+        m = _ISO_PATTERN.search(text)
+        if m:
+            year, month, day, hour, minute, second = (int(g) for g in m.groups()[:6])
+            self.day = date(year, month, day)
+            tz = parse_tz(m.group(8)) if m.group(8) else None
+            return self._epoch(year, month, day, hour, minute, second, m.group(7), tz)
+        m = _SYSLOG_PATTERN.search(text)
+        if m and m.group(1) in MONTHS:
+            year = self.day.year if self.day else date.today().year
+            return self._epoch(year, MONTHS[m.group(1)], int(m.group(2)), int(m.group(3)),
+                               int(m.group(4)), int(m.group(5)), m.group(6), None)
+        m = _TIME_PATTERN.search(text)
+        if m and self.day:
+            ts = self._epoch(self.day.year, self.day.month, self.day.day, int(m.group(1)),
+                             int(m.group(2)), int(m.group(3)), m.group(4), None)
+            if self.last is not None and ts < self.last - 43200:
+                # 시간만 있는 로그가 자정을 넘긴 경우
+                self.day += timedelta(days=1)
+                ts += 86400
+            self.last = ts
+            return ts
+        return None
+
+
+def _reorder(events: Iterator[Dict], window: int = REORDER_WINDOW) -> Iterator[Dict]:
+    """약간 뒤섞인 이벤트를 고정 크기 heap으로 정렬 (window 이상 떨어진 역전은 보정하지 않음)"""
+    heap = []
+    seq = 0
+    for event in events:
+        heapq.heappush(heap, (event['ts'], seq, event))
+        seq += 1
+        if len(heap) > window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def ble_events(path: str, parser: TimestampParser) -> Iterator[Dict]:
+    """PacketLogger / Console 텍스트 로그의 write 이벤트"""
+    collected = []
+    analyzer = BLEAnalyzer(sink=collected.append, keep=0)
+    last_ts = None
+    with open_capture(path, 'r', errors='ignore') as f:
+        for line_num, line in enumerate(f, 1):
+            analyzer.parse_line(line_num, line)
+            if not collected:
+                continue
+            ts = parser.parse(line)
+            if ts is None:
+                ts = last_ts  # 시간이 없는 줄은 직전 시간을 이어받음
+            if ts is None:
+                collected.clear()
+                continue
+            last_ts = ts
+            for record in collected:
+                if record['type'] in ('write', 'data'):
+                    yield {
+                        'ts': ts,
+                        'type': record['type'],
+                        'uuid': record.get('uuid'),
+                        'value': record['value'].strip(),
+                        'line': line_num,
+                    }
+            collected.clear()
+
+
+def console_events(path: str, parser: TimestampParser) -> Iterator[Dict]:
+    """log stream NDJSON의 FFF 특성 이벤트"""
+    for event in iter_phocus_events(path):
+        ts = parser.parse(event['time'])
+        if ts is None:
+            continue
+        record = {'ts': ts, 'type': event['type'], 'message': event['message']}
+        if 'hex' in event:
+            record['hex'] = event['hex']
+        yield record
+
+
+def _summarize_payload(port: int, payload: bytes) -> Optional[str]:
+    if payload.startswith((b'GET ', b'POST ', b'PUT ', b'HEAD ', b'DELETE ', b'HTTP/')):
+        return payload.split(b'\r\n', 1)[0][:120].decode('latin-1')
+    if port == PTPIP_PORT and len(payload) >= PTPIP_HEADER.size:
+        length, packet_type = PTPIP_HEADER.unpack_from(payload)
+        if 8 <= length and packet_type in range(1, 15):
+            return f"PTP/IP {packet_type_name(packet_type)}"
+    return None
+
+
+def pcap_events(path: str, camera_ip: str = CAMERA_IP) -> Iterator[Dict]:
+    """카메라와 주고받은 TCP 세그먼트 (페이로드가 있는 것만)"""
+    camera = socket.inet_aton(camera_ip)
+    for packet in read_packets(path):
+        segment = decode_segment(packet, camera)
+        if segment is None or not segment[5]:
+            continue
+        ts, (client, client_port, server_port), direction, _, _, payload = segment
+        event = {
+            'ts': ts,
+            'type': 'tcp',
+            'direction': 'to_camera' if direction == 0 else 'from_camera',
+            'client': f"{socket.inet_ntoa(client)}:{client_port}",
+            'port': server_port,
+            'bytes': len(payload),
+        }
+        summary = _summarize_payload(server_port, payload)
+        if summary:
+            event['summary'] = summary
+        yield event
+
+
+def _tag(events: Iterator[Dict], source: str, offset: float) -> Iterator[Dict]:
+    for event in events:
+        event['ts'] += offset
+        event['source'] = source
+        yield event
+
+
+def merge_sources(sources: List[Iterator[Dict]]) -> Iterator[Dict]:
+    """정렬된 이벤트 스트림들을 시간순으로 k-way 병합"""
+    return heapq.merge(*sources, key=lambda event: event['ts'])
+
+
+def _index_path(path: str) -> str:
+    return path + '.idx'
+
+
+def write_timeline(events: Iterator[Dict], output: str, index: bool = False,
+                   summary: Optional[Dict] = None) -> Dict:
+    """병합된 이벤트를 NDJSON으로 기록 (index=True면 시간 → 바이트 오프셋 인덱스도 저장)"""
+    first = last = None
+    late = 0
+    per_source = {}
+    index_file = None
+    if index:
+        if COMPRESSION_SUFFIXES.get(output[output.rfind('.'):].lower()):
+            raise ValueError("인덱스는 압축하지 않은 출력 파일에서만 사용할 수 있습니다")
+        index_file = open(_index_path(output), 'w')
+    next_index = None
+
+    with NDJSONWriter(output) as writer:
+        for event in events:
+            ts = event['ts']
+            if first is None:
+                first = ts
+            if last is not None and ts < last:
+                late += 1  # 재정렬 버퍼를 넘어선 역전 (구간 읽기가 부정확해질 수 있음)
+            else:
+                last = ts
+            if index_file and (next_index is None or ts >= next_index):
+                index_file.write(json.dumps([ts, writer.tell()]) + '\n')
+                next_index = ts + INDEX_INTERVAL
+            event['time'] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+            per_source[event['source']] = per_source.get(event['source'], 0) + 1
+            writer.write(event)
+        result = {'start': first, 'end': last, 'sources': per_source, 'out_of_order': late}
+        writer.close(dict(summary or {}, **result))
+    if index_file:
+        index_file.close()
+    return result
+
+
+def iter_timeline(path: str, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict]:
+    """타임라인에서 [start, end) 구간 이벤트 읽기 (인덱스가 있으면 해당 위치로 바로 이동)"""
+    offset = 0
+    if start is not None:
+        try:
+            with open(_index_path(path)) as f:
+                for line in f:
+                    ts, pos = json.loads(line)
+                    if ts > start:
+                        break
+                    offset = pos
+        except FileNotFoundError:
+            pass
+
+    with open_capture(path, 'r') if not offset else open(path, 'r', encoding='utf-8') as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            event = json.loads(line)
+            if event.get('type') == 'summary':
+                return
+            ts = event['ts']
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts >= end:
+                return
+            yield event
+
+
+def _parse_offsets(values: List[str]) -> Dict[str, float]:
+    offsets = {}
+    for value in values or []:
+        source, _, seconds = value.partition('=')
+        offsets[source] = float(seconds)
+    return offsets
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="BLE/Console/네트워크 캡처를 하나의 시간순 타임라인으로 병합",
+        epilog="예: python3 timeline_merge.py --ble packetlogger.txt --console phocus.log "
+               "--pcap capture.pcap --offset pcap=-0.35 -o timeline.ndjson --index")
+    parser.add_argument('--ble', action='append', default=[], help="PacketLogger/Console 텍스트 로그")
+    parser.add_argument('--console', action='append', default=[], help="log stream NDJSON 로그")
+    parser.add_argument('--pcap', action='append', default=[], help="tcpdump pcap/pcapng")
+    parser.add_argument('--camera-ip', default=CAMERA_IP, help=f"카메라 IP (기본: {CAMERA_IP})")
+    parser.add_argument('--offset', action='append', metavar='SOURCE=SECONDS',
+                        help="소스별 시계 보정 (초, 예: pcap=-0.35, ble=1.2)")
+    parser.add_argument('--tz', help="시간대 정보가 없는 로그의 시간대 (예: +09:00, 기본: 시스템)")
+    parser.add_argument('--date', help="날짜가 없는 로그의 날짜 (YYYY-MM-DD)")
+    parser.add_argument('-o', '--output', default='timeline.ndjson', help="출력 NDJSON (.gz/.zst/.xz 가능)")
+    parser.add_argument('--index', action='store_true', help="시간 → 오프셋 인덱스(.idx) 함께 저장")
+    args = parser.parse_args()
+
+    if not (args.ble or args.console or args.pcap):
+        parser.error("--ble, --console, --pcap 중 하나 이상이 필요합니다")
+
+    tz = parse_tz(args.tz) if args.tz else None
+    day = date.fromisoformat(args.date) if args.date else None
+    offsets = _parse_offsets(args.offset)
+
+    sources = []
+    for path in args.ble:
+        events = ble_events(path, TimestampParser(tz, day))
+        sources.append(_tag(_reorder(events), 'ble', offsets.get('ble', 0.0)))
+    for path in args.console:
+        events = console_events(path, TimestampParser(tz, day))
+        sources.append(_tag(_reorder(events), 'console', offsets.get('console', 0.0)))
+    for path in args.pcap:
+        events = pcap_events(path, args.camera_ip)
+        sources.append(_tag(_reorder(events), 'pcap', offsets.get('pcap', 0.0)))
+
+    print(f"📖 소스 {len(sources)}개 병합 중...")
+    try:
+        result = write_timeline(merge_sources(sources), args.output, args.index,
+                                {'offsets': offsets})
+    except FileNotFoundError as e:
+        print(f"❌ 파일을 찾을 수 없습니다: {e.filename}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"\n🕐 타임라인: {sum(result['sources'].values())}개 이벤트")
+    for source, count in sorted(result['sources'].items()):
+        print(f"  • {source}: {count}개")
+    if result['out_of_order']:
+        print(f"  ⚠️ 시간 역전 {result['out_of_order']}개 (--offset 또는 로그 시간 확인)")
+    if result['start'] is not None:
+        print(f"  구간: {datetime.fromtimestamp(result['start']).isoformat()} ~ "
+              f"{datetime.fromtimestamp(result['end']).isoformat()}")
+    print(f"\n💾 저장: {args.output}" + (f" (인덱스: {_index_path(args.output)})" if args.index else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+BLE 트래픽 시계열 분석
+모든 BLE 이벤트를 특성(characteristic)·방향별로 고정 간격 구간에 모아
+구간별 전송률, 버스트(급증 구간), 유휴 구간을 계산합니다.
+
+이벤트는 (시간, 채널, 바이트 수) 배열로만 보관하고 집계는 NumPy 벡터 연산으로 처리하므로
+하루 종일 캡처한 수천만 개 이벤트도 몇 초 안에 집계됩니다.
+구간 집계는 이벤트가 있는 (채널, 구간)만 보관하므로 여러 날짜에 걸친 캡처나 잘못된 시간(epoch 0 등)이
+섞여 있어도 메모리는 이벤트 수에만 비례합니다.
+
+numpy가 필요합니다: pip3 install numpy
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from analyze_phocus_log import iter_phocus_events
+from capture_io import open_capture, strip_compression_suffix
+from timeline_merge import TimestampParser, parse_tz
+
+DEFAULT_INTERVAL = 1.0      # 구간 크기 (초)
+DEFAULT_IDLE = 5.0          # 이 시간 이상 이벤트가 없으면 유휴 구간
+DEFAULT_BURST_SIGMA = 3.0   # 평균 + N 표준편차를 넘으면 버스트
+REPORT_LIMIT = 5
+
+# PacketLogger ATT 이벤트 (Write는 앱 → 카메라, 나머지는 카메라 → 앱)
+_ATT_PATTERN = re.compile(
+    r'ATT (Write|Handle Value Notification|Handle Value Indication|Read Response)'
+    r'.*Handle:\s*0x([0-9A-Fa-f]+).*Value:\s*([0-9A-Fa-f\s]+)')
+_CHAR_PATTERN = re.compile(r'Characteristic.*UUID:\s*([0-9A-Fa-f]{4}).*Handle:\s*0x([0-9A-Fa-f]+)')
+_FFF_PATTERN = re.compile(r'FFF[0-9A-Fa-f]', re.I)
+
+
+class EventSeries:
+    """(시간, 채널, 바이트 수) 이벤트 버퍼
+
+    채널은 (특성, 방향) 쌍이며 정수 ID로 저장합니다. 파이썬 객체 대신 array를 사용하므로
+    이벤트 하나에 14바이트만 사용합니다.
+    """
+
+    def __init__(self):
+        self.channels: List[Tuple[str, str]] = []
+        self._channel_ids: Dict[Tuple[str, str], int] = {}
+        self.ts = array('d')
+        self.channel = array('H')
+        self.size = array('I')
+
+    def channel_id(self, characteristic: str, direction: str) -> int:
+        key = (characteristic, direction)
+        cid = self._channel_ids.get(key)
+        if cid is None:
+            cid = self._channel_ids[key] = len(self.channels)
+            self.channels.append(key)
+        return cid
+
+    def add(self, ts: float, characteristic: str, direction: str, size: int = 0):
+        self.ts.append(ts)
+        self.channel.append(self.channel_id(characteristic, direction))
+        self.size.append(size)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def arrays(self):
+        """NumPy 배열 (복사 없이 버퍼 공유)"""
+        return (np.frombuffer(self.ts, dtype=np.float64),
+                np.frombuffer(self.channel, dtype=np.uint16),
+                np.frombuffer(self.size, dtype=np.uint32))
+
+
+def read_packetlogger(path: str, series: EventSeries, parser: TimestampParser) -> int:
+    """PacketLogger 텍스트 export의 ATT Write / Notification / Indication / Read Response"""
+    characteristics = {}
+    last_ts = None
+    added = 0
+    with open_capture(path, 'r', errors='ignore') as f:
+        for line in f:
+            if 'Handle' not in line:
+                continue
+            match = _ATT_PATTERN.search(line)
+            if match is None:
+                match = _CHAR_PATTERN.search(line)
+                if match:
+                    characteristics[match.group(2)] = match.group(1)
+                continue
+            ts = parser.parse(line)
+            if ts is None:
+                ts = last_ts  # 시간이 없는 줄은 직전 시간을 이어받음
+                if ts is None:
+                    continue
+            last_ts = ts
+            kind, handle, value = match.groups()
+            characteristic = characteristics.get(handle, f'Handle_{handle}')
+            direction = 'tx' if kind == 'Write' else 'rx'
+            series.add(ts, characteristic, direction, len(value.replace(' ', '').strip()) // 2)
+            added += 1
+    return added
+
+
+def read_console(path: str, series: EventSeries, parser: TimestampParser) -> int:
+    """log stream NDJSON(Phocus 로그)의 FFF 특성 write/read/notify"""
+    added = 0
+    for event in iter_phocus_events(path):
+        ts = parser.parse(event['time'])
+        if ts is None:
+            continue
+        match = _FFF_PATTERN.search(event['message'])
+        characteristic = match.group(0).upper() if match else 'FFF?'
+        if event['type'] == 'write':
+            size = sum(max(len(h) - 2, 0) for h in event['hex']) // 2
+            series.add(ts, characteristic, 'tx', size)
+        else:
+            series.add(ts, characteristic, 'rx', 0)
+        added += 1
+    return added
+
+
+class BinnedSeries:
+    """이벤트가 있는 (채널, 구간)만 담은 집계 결과 (채널, 구간 순으로 정렬)
+
+    channel/bin/count/volume은 같은 길이의 배열이며 bin은 start부터 interval 단위의 구간 번호입니다.
+    """
+
+    def __init__(self, start: float, interval: float, n_channels: int, channel, bins, count, volume):
+        self.start = start
+        self.interval = interval
+        self.channel = channel
+        self.bin = bins
+        self.count = count
+        self.volume = volume
+        self._bounds = np.searchsorted(channel, np.arange(n_channels + 1))
+
+    @property
+    def n_bins(self) -> int:
+        """첫 구간부터 마지막 구간까지의 구간 수"""
+        return int(self.bin.max()) + 1 if self.bin.size else 0
+
+    def row(self, cid: int):
+        """채널 하나의 (구간 번호, 이벤트 수, 바이트 수) 배열"""
+        lo, hi = self._bounds[cid], self._bounds[cid + 1]
+        return self.bin[lo:hi], self.count[lo:hi], self.volume[lo:hi]
+
+
+def bin_events(ts, channel, size, n_channels: int, interval: float = DEFAULT_INTERVAL) -> BinnedSeries:
+    """이벤트를 (채널, 구간)별 이벤트 수/바이트 수로 집계 (이벤트가 없는 구간은 만들지 않음)"""
+    start = float(np.floor(ts.min() / interval) * interval)
+    order = np.lexsort((ts, channel))
+    sorted_channel = channel[order]
+    bins = ((ts[order] - start) // interval).astype(np.int64)
+    # 채널 안에서는 시간순이므로 (채널, 구간)이 바뀌는 위치가 그룹 경계
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = (sorted_channel[1:] != sorted_channel[:-1]) | (bins[1:] != bins[:-1])
+    idx = np.flatnonzero(first)
+    counts = np.diff(np.append(idx, order.size))
+    volume = np.add.reduceat(size[order].astype(np.float64), idx)
+    return BinnedSeries(start, interval, n_channels, sorted_channel[idx], bins[idx], counts, volume)
+
+
+def detect_bursts(bins, counts, interval: float, sigma: float = DEFAULT_BURST_SIGMA, min_rate: float = 0.0):
+    """평균 + sigma × 표준편차를 넘는 연속 구간 (bins/counts는 한 채널의 이벤트가 있는 구간)
+
+    평균/표준편차는 채널이 활동한 구간(첫 이벤트 ~ 마지막 이벤트, 빈 구간 포함)으로 계산합니다.
+    Returns: (시작 구간, 끝 구간, 이벤트 수, 최대 초당 이벤트) 배열 - 버스트가 많아도 배열로만 보관
+    """
+    empty = (bins[:0], bins[:0], counts[:0], np.zeros(0))
+    if counts.size == 0:
+        return empty
+    span = int(bins[-1] - bins[0]) + 1
+    mean = counts.sum() / span
+    variance = float((counts.astype(np.float64) ** 2).sum()) / span - mean * mean
+    threshold = max(mean + sigma * max(variance, 0.0) ** 0.5, min_rate * interval)
+    hot = np.flatnonzero(counts > threshold)
+    if hot.size == 0:
+        return empty
+    # 임계값은 0보다 크므로 버스트는 이벤트가 있는 구간끼리 번호가 이어진 구간
+    hot_bins, hot_counts = bins[hot], counts[hot]
+    breaks = np.flatnonzero(np.diff(hot_bins) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.append(breaks, hot.size)
+    totals = np.add.reduceat(hot_counts, starts)
+    peaks = np.maximum.reduceat(hot_counts, starts)
+    return hot_bins[starts], hot_bins[ends - 1] + 1, totals, peaks / interval
+
+
+def detect_idle_gaps(ts, min_gap: float = DEFAULT_IDLE):
+    """정렬된 시간 배열에서 min_gap 이상 비어 있는 구간
+
+    Returns: (gap 시작 시간 배열, gap 길이 배열)
+    """
+    if ts.size < 2:
+        return ts[:0], ts[:0]
+    gaps = np.diff(ts)
+    idx = np.flatnonzero(gaps >= min_gap)
+    return ts[idx], gaps[idx]
+
+
+def analyze_series(series: EventSeries, interval: float = DEFAULT_INTERVAL, idle: float = DEFAULT_IDLE,
+                   sigma: float = DEFAULT_BURST_SIGMA, min_rate: float = 0.0) -> Tuple[Dict, BinnedSeries]:
+    """채널별 전송률, 버스트, 유휴 구간 요약
+
+    Returns: (요약 dict, 구간 집계)
+    """
+    ts, channel, size = series.arrays()
+    binned = bin_events(ts, channel, size, len(series.channels), interval)
+    start = binned.start
+
+    # 채널별 시간순 정렬 (유휴 구간 계산용)
+    order = np.lexsort((ts, channel))
+    sorted_ts = ts[order]
+    boundaries = np.searchsorted(channel[order], np.arange(len(series.channels) + 1))
+
+    summary = {
+        'interval': interval,
+        'start': start,
+        'end': start + binned.n_bins * interval,
+        'events': int(ts.size),
+        'bytes': int(size.sum(dtype=np.uint64)),
+        'channels': [],
+    }
+    for cid, (characteristic, direction) in enumerate(series.channels):
+        bins, row, volume = binned.row(cid)
+        channel_ts = sorted_ts[boundaries[cid]:boundaries[cid + 1]]
+        gap_starts, gap_lengths = detect_idle_gaps(channel_ts, idle)
+        longest = np.argsort(gap_lengths)[::-1][:REPORT_LIMIT]
+        burst_starts, burst_ends, burst_totals, burst_peaks = detect_bursts(bins, row, interval, sigma, min_rate)
+        top = np.argsort(-burst_totals, kind='stable')[:REPORT_LIMIT]
+        duration = max(float(channel_ts[-1] - channel_ts[0]), interval)
+        summary['channels'].append({
+            'characteristic': characteristic,
+            'direction': direction,
+            'events': int(row.sum()),
+            'bytes': int(volume.sum()),
+            'first': float(channel_ts[0]),
+            'last': float(channel_ts[-1]),
+            'mean_rate': float(row.sum()) / duration,
+            'mean_throughput': float(volume.sum()) / duration,
+            'peak_rate': float(row.max()) / interval,
+            'peak_throughput': float(volume.max()) / interval,
+            'peak_time': start + int(bins[row.argmax()]) * interval,
+            'active_bins': int(row.size),
+            'bursts': int(burst_starts.size),
+            'top_bursts': [{'start': start + int(burst_starts[i]) * interval,
+                            'duration': int(burst_ends[i] - burst_starts[i]) * interval,
+                            'events': int(burst_totals[i]), 'peak_rate': float(burst_peaks[i])}
+                           for i in top],
+            'idle_gaps': int(gap_lengths.size),
+            'idle_time': float(gap_lengths.sum()),
+            'longest_gaps': [{'start': float(gap_starts[i]), 'duration': float(gap_lengths[i])}
+                             for i in longest],
+        })
+    return summary, binned
+
+
+def write_csv(path: str, series: EventSeries, binned: BinnedSeries):
+    """구간별 처리량 CSV (이벤트가 있는 구간만, 채널별 한 줄)"""
+    start, interval = binned.start, binned.interval
+    with open(path, 'w') as f:
+        f.write("time,characteristic,direction,events,bytes,events_per_sec,bytes_per_sec\n")
+        for cid, (characteristic, direction) in enumerate(series.channels):
+            bins, counts, volume = binned.row(cid)
+            if bins.size == 0:
+                continue
+            table = np.column_stack((start + bins * interval, counts, volume,
+                                     counts / interval, volume / interval))
+            np.savetxt(f, table, fmt=f'%.3f,{characteristic},{direction},%d,%d,%.3f,%.1f')
+
+
+def _fmt_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).astimezone().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+def print_report(summary: Dict):
+    print("\n" + "="*60)
+    print("📈 BLE 트래픽 시계열 분석")
+    print("="*60)
+    print(f"\n이벤트 {summary['events']:,}개, {summary['bytes']:,} bytes "
+          f"({_fmt_time(summary['start'])} ~ {_fmt_time(summary['end'])}, 구간 {summary['interval']:g}초)")
+
+    for ch in sorted(summary['channels'], key=lambda c: c['events'], reverse=True):
+        arrow = '→ 카메라' if ch['direction'] == 'tx' else '← 카메라'
+        print(f"\n🔷 {ch['characteristic']} {arrow}: {ch['events']:,}개, {ch['bytes']:,} bytes")
+        print(f"  평균: {ch['mean_rate']:.2f} 이벤트/초, {ch['mean_throughput']:.1f} B/s")
+        print(f"  최대: {ch['peak_rate']:.2f} 이벤트/초, {ch['peak_throughput']:.1f} B/s "
+              f"({_fmt_time(ch['peak_time'])})")
+        if ch['bursts']:
+            print(f"  ⚡ 버스트 {ch['bursts']}개:")
+            for burst in ch['top_bursts']:
+                print(f"    • {_fmt_time(burst['start'])} +{burst['duration']:g}초: "
+                      f"{burst['events']:,}개 (최대 {burst['peak_rate']:.1f}/초)")
+        if ch['idle_gaps']:
+            print(f"  💤 유휴 구간 {ch['idle_gaps']}개 (총 {ch['idle_time']:.1f}초):")
+            for gap in ch['longest_gaps']:
+                print(f"    • {_fmt_time(gap['start'])}부터 {gap['duration']:.1f}초")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="BLE 이벤트 전송률/버스트/유휴 구간 시계열 분석 (numpy 필요)",
+        epilog="예: python3 traffic_timeseries.py --ble packetlogger.txt --interval 0.5 --csv rate.csv")
+    parser.add_argument('--ble', action='append', default=[], help="PacketLogger 텍스트 로그")
+    parser.add_argument('--console', action='append', default=[], help="log stream NDJSON 로그")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"구간 크기 (초, 기본 {DEFAULT_INTERVAL:g})")
+    parser.add_argument('--idle', type=float, default=DEFAULT_IDLE,
+                        help=f"유휴 구간 기준 (초, 기본 {DEFAULT_IDLE:g})")
+    parser.add_argument('--burst-sigma', type=float, default=DEFAULT_BURST_SIGMA,
+                        help=f"버스트 기준: 평균 + N 표준편차 (기본 {DEFAULT_BURST_SIGMA:g})")
+    parser.add_argument('--burst-min', type=float, default=0.0, help="버스트 최소 초당 이벤트 수")
+    parser.add_argument('--tz', help="시간대 정보가 없는 로그의 시간대 (예: +09:00)")
+    parser.add_argument('--date', help="날짜가 없는 로그의 날짜 (YYYY-MM-DD)")
+    parser.add_argument('--csv', metavar='FILE', help="구간별 처리량 CSV 저장")
+    parser.add_argument('--json', metavar='FILE', help="요약 JSON 파일 (기본: <첫 입력>_traffic.json)")
+    args = parser.parse_args()
+
+    if np is None:
+        print("⚠️ numpy가 설치되지 않았습니다.")
+        print("실행: pip3 install numpy")
+        sys.exit(1)
+    if not (args.ble or args.console):
+        parser.error("--ble 또는 --console 로그가 필요합니다")
+    if args.interval <= 0:
+        parser.error("--interval은 0보다 커야 합니다")
+
+    tz = parse_tz(args.tz) if args.tz else None
+    day = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else None
+    series = EventSeries()
+    try:
+        for path in args.ble:
+            print(f"📖 PacketLogger 로그 읽는 중: {path}")
+            read_packetlogger(path, series, TimestampParser(tz, day))
+        for path in args.console:
+            print(f"📖 Console 로그 읽는 중: {path}")
+            read_console(path, series, TimestampParser(tz, day))
+    except FileNotFoundError as e:
+        print(f"❌ 파일을 찾을 수 없습니다: {e.filename}")
+        sys.exit(1)
+
+    if not len(series):
+        print("❌ 시간 정보가 있는 BLE 이벤트를 찾지 못했습니다 (--date / --tz 확인)")
+        sys.exit(1)
+
+    summary, binned = analyze_series(series, args.interval, args.idle,
+                                     args.burst_sigma, args.burst_min)
+    print_report(summary)
+
+    output_file = args.json or os.path.splitext(strip_compression_suffix((args.ble + args.console)[0]))[0] + '_traffic.json'
+    with open(output_file, 'w') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 요약 저장: {output_file}")
+    if args.csv:
+        write_csv(args.csv, series, binned)
+        print(f"💾 구간별 처리량 저장 (CSV): {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,23 @@ Hasselblad X2D II USB 연결 분석 도구
 USB를 통해 카메라와 통신하여 프로토콜 분석
 """
 
-import usb.core
-import usb.util
+import argparse
 import struct
+import sys
 import time
 from datetime import datetime
 
+from ptp_protocol import PTP_COMMANDS
+
 # Hasselblad USB ID (추정값 - 실제 값은 lsusb로 확인)
 VENDOR_ID = 0x0AA8  # Hasselblad 추정
 PRODUCT_ID = None   # 자동 검색
 
 def find_hasselblad_camera():
     """USB 연결된 Hasselblad 카메라 찾기"""
+    import usb.core
+    import usb.util
+    
     print("🔍 USB 장치 검색 중...")
     
     # 모든 USB 장치 나열
@@ -73,17 +78,6 @@ def analyze_ptp_commands(device, interface):
     """PTP 명령 분석"""
     print("\n🔧 PTP 명령 테스트...")
     
-    # PTP 명령 코드
-    PTP_COMMANDS = {
-        0x1001: "GetDeviceInfo",
-        0x1002: "OpenSession",
-        0x1003: "CloseSession",
-        0x1004: "GetStorageIDs",
-        0x9201: "GetObjectPropsSupported",  # 카메라 특정
-        0x9202: "GetObjectPropDesc",
-        0x9801: "GetDevicePropDesc",  # WiFi 설정 관련
-    }
-    
     # WiFi 관련 속성 코드 (추정)
     WIFI_PROPS = {
         0xD001: "WiFi_Enable",
@@ -93,6 +87,10 @@ def analyze_ptp_commands(device, interface):
         0xD005: "WiFi_Status",
     }
     
+    print("\n알려진 PTP 명령:")
+    for code, name in PTP_COMMANDS.items():
+        print(f"  {name} (0x{code:04x})")
+    
     print("\nWiFi 관련 속성 확인:")
     for prop_code, prop_name in WIFI_PROPS.items():
         print(f"  {prop_name} (0x{prop_code:04x})")
@@ -103,6 +101,8 @@ def monitor_usb_traffic():
     print("\n📡 USB 트래픽 모니터링...")
     print("USBPcap 또는 Wireshark 사용 권장")
     print("macOS: sudo tcpdump -i XHC20")
+    print("Linux: sudo modprobe usbmon && sudo tcpdump -i usbmon1 -w hasselblad_usb.pcap")
+    print("캡처 분석: python3 analyze_usb_capture.py hasselblad_usb.pcap")
     
     # USB 모니터링 명령
     commands = [
@@ -121,6 +121,24 @@ def monitor_usb_traffic():
         print(f"  {cmd}")
 
 def main():
+    # 캡처 파일 분석 모드: usb_camera_analyze.py capture <캡처파일> (pyusb 불필요)
+    if len(sys.argv) > 1 and sys.argv[1] == 'capture':
+        from analyze_usb_capture import main as capture_main
+        capture_main(sys.argv[2:])
+        return
+    
+    argparse.ArgumentParser(
+        description="USB로 연결된 Hasselblad 카메라 분석 (pyusb 필요)",
+        epilog="캡처 파일 분석: python3 usb_camera_analyze.py capture hasselblad_usb.pcap").parse_args()
+    
+    # pyusb 설치 확인 (실제로 장치에 접근할 때만 필요)
+    try:
+        import usb.core
+    except ImportError:
+        print("⚠️ pyusb가 설치되지 않았습니다.")
+        print("실행: pip3 install pyusb")
+        sys.exit(1)
+    
     print("=" * 50)
     print("Hasselblad X2D II USB 프로토콜 분석")
     print("=" * 50)
@@ -157,12 +175,4 @@ def main():
     print("3. WiFi 활성화 명령 시퀀스 파악")
 
 if __name__ == "__main__":
-    # pyusb 설치 확인
-    try:
-        import usb
-    except ImportError:
-        print("⚠️ pyusb가 설치되지 않았습니다.")
-        print("실행: pip3 install pyusb")
-        exit(1)
-    
     main()
\ No newline at end of file